@@ -1,76 +1,139 @@
+import concurrent.futures
+import contextlib
+import hashlib
 import flask
 import requests
-import re
 import json
 import os
-import datetime
-import xbrl
 import time
+import datetime
+import company_facts
+import compression
+import metrics_engine
+import value_parser
+import xbrl_facts
+from cache_backend import LRUCache, get_analysis_cache
+from company_facts import get_company_facts_store
+from filing_index import choose_instance_filename, get_filing_index
+from http_session import REQUEST_TIMEOUT, get_session, get_validator_cache
+from instrumentation import CONTENT_TYPE, Sample, TimedIterator, get_metrics
+from rate_limiter import get_rate_limiter
+from single_flight import SingleFlight
+from ticker_index import get_ticker_index
 
 app = flask.Flask(__name__)
 
-# Configure rate limiting: 5 requests per second, 10 requests per 10 seconds, and 1000 requests per day
-# Using a dictionary to store request timestamps.  Key is the URL, value is a list of timestamps.
-request_log = {}
-rate_limits = {
-    'second': 5,
-    'ten_seconds': 10,
-    'day': 1000
-}
-#Window size for rate limiting
-window_sizes = {
-    'second': 1,
-    'ten_seconds': 10,
-    'day': 24 * 60 * 60
-}
+# Maximum time a request will queue for a free rate limit slot
+RATE_LIMIT_TIMEOUT = 60
+# Answer /analyze from an imported bulk snapshot (see bulk_import.py) without any network access
+OFFLINE_MODE = os.environ.get('HAYSTACK_OFFLINE', '') == '1'
+# Error extract_financial_data returns for a 404, so the pipeline can re-resolve the document
+XBRL_NOT_FOUND_ERROR = "Error extracting financial data: XBRL document not found at {url}"
+
+# Latency histograms and event counters served on /metrics
+STAGE_SECONDS = 'haystack_stage_seconds'
+REQUEST_SECONDS = 'haystack_request_seconds'
+SEC_REQUESTS = 'haystack_sec_requests_total'
+get_metrics().describe(STAGE_SECONDS, 'histogram', 'Seconds spent in each analysis pipeline stage, including rate-limit waits.')
+get_metrics().describe(REQUEST_SECONDS, 'histogram', 'Seconds from receiving an HTTP request to returning its response headers.')
+get_metrics().describe(SEC_REQUESTS, 'counter', 'Requests sent to SEC by outcome: the HTTP status, error or rate_limited.')
 
 def check_rate_limit(url):
     """
     Checks if the request for the given URL exceeds the defined rate limits.
 
+    A request that fits is charged to both its host's and the global SEC budget.
+
     Args:
         url (str): The URL being requested.
 
     Returns:
         bool: True if the rate limit is exceeded, False otherwise.
     """
-    now = time.time()
-    if url not in request_log:
-        request_log[url] = []
+    return get_rate_limiter().try_acquire(url) > 0
 
-    for interval_name, limit in rate_limits.items():
-        window_size = window_sizes[interval_name]
-        # Remove requests that are outside the current window
-        request_log[url] = [ts for ts in request_log[url] if now - ts <= window_size]
-        # Check if the number of requests exceeds the limit
-        if len(request_log[url]) >= limit:
-            return True  # Rate limit exceeded
+def wait_for_rate_limit(url, timeout=RATE_LIMIT_TIMEOUT):
+    """
+    Blocks until a request for the given URL fits within the rate limits.
 
-    request_log[url].append(now)  # Log the current request
-    return False  # Rate limit not exceeded
+    Args:
+        url (str): The URL being requested.
+        timeout (float): Maximum number of seconds to wait.
+
+    Returns:
+        bool: True if the request may proceed, False if the timeout would expire first.
+    """
+    return get_rate_limiter().acquire(url, timeout=timeout)
 
 
 class EdgarScraper:
     BASE_URL = "https://www.sec.gov/Archives"
+    SUBMISSIONS_URL = "https://data.sec.gov/submissions/CIK{cik}.json"
     HEADERS = {"User-Agent": "Stock Analyzer App email@example.com"}
-
-    def __init__(self):
+    # The only concepts _calculate_metrics reads; every other fact is dropped while parsing
+    FACT_CONCEPTS = frozenset([
+        'dei:EntityRegistrantName', 'dei:EntityCommonStockSharesOutstanding',
+        'dei:DocumentPeriodEndDate', 'dei:DocumentFilingDate',
+        'us-gaap:RevenueFromContractWithCustomerExcludingAssessedTax', 'us-gaap:SalesRevenueNet',
+        'us-gaap:NetIncomeLoss', 'us-gaap:Assets', 'us-gaap:Liabilities',
+        'us-gaap:CashAndCashEquivalentsAtCarryingValue', 'us-gaap:LongTermDebt', 'us-gaap:OperatingIncomeLoss',
+        'us-gaap:CommonStockDividendsPerShare', 'us-gaap:FreeCashFlow', 'us-gaap:IntangibleAssetsNet'
+    ])
+    # Bytes read from the socket per parser feed when streaming an instance document
+    XBRL_CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, ticker_index=None, session=None, validator_cache=None, filing_index=None):
         self.base_url = EdgarScraper.BASE_URL
+        self.submissions_url = EdgarScraper.SUBMISSIONS_URL
         self.headers = EdgarScraper.HEADERS
+        self.ticker_index = ticker_index if ticker_index is not None else get_ticker_index()
+        # Pooled keep-alive session shared by every scraper in the process
+        self.session = session if session is not None else get_session()
+        self.validator_cache = validator_cache if validator_cache is not None else get_validator_cache()
+        self.filing_index = filing_index if filing_index is not None else get_filing_index()
 
-    def _fetch_json(self, url):
-        """Atomically fetches JSON data from a URL and returns the parsed JSON or None."""
+    def _fetch_response(self, url, headers=None, revalidate=False):
+        """
+        Fetches a URL under the rate limit and returns the response or None.
+
+        With revalidate=True the request is sent as a conditional GET using any
+        stored ETag/Last-Modified, and a 304 is answered from the stored body.
+        """
+        request_headers = dict(headers or self.headers)
+        if revalidate:
+            request_headers.update(self.validator_cache.conditional_headers(url))
         try:
-            # Apply rate limiting before making the request
-            if check_rate_limit(url):
+            # Apply rate limiting before making the request, queueing for a free slot
+            if not wait_for_rate_limit(url):
                 print(f"Rate limit exceeded for {url}")
-                return None  # Or raise an exception, or retry after a delay
+                get_metrics().increment(SEC_REQUESTS, {'outcome': 'rate_limited'})
+                return None
 
-            response = requests.get(url, headers=self.headers)
+            response = self.session.get(url, headers=request_headers, timeout=REQUEST_TIMEOUT)
+            get_metrics().increment(SEC_REQUESTS, {'outcome': str(response.status_code)})
             response.raise_for_status()
-            return response.json()
         except requests.exceptions.RequestException as e:
             print(f"Error fetching {url}: {e}")
+            # HTTP errors were already counted under their status code
+            if getattr(e, 'response', None) is None:
+                get_metrics().increment(SEC_REQUESTS, {'outcome': 'error'})
+            return None
+
+        if revalidate and response.status_code == 304:
+            return self.validator_cache.load_response(url) or response
+        if revalidate and response.status_code == 200:
+            self.validator_cache.store(url, response)
+        return response
+
+    def _fetch_json(self, url):
+        """Atomically fetches JSON data from a URL and returns the parsed JSON or None."""
+        response = self._fetch_response(url, revalidate=True)
+        if response is None:
+            return None
+        try:
+            return response.json()
+        except ValueError as e:
+            print(f"Error decoding JSON from {url}: {e}")
             return None
 
     def _extract_text(self, soup):
@@ -95,73 +158,91 @@ class EdgarScraper:
         return None
 
     def _parse_financial_value(self, value_text):
-        """Atomically parses a financial value string to a float."""
-        if not isinstance(value_text, str):
-            return None
-
-        try:
-            value_text = re.sub(r'[\$£€,]', '', value_text)
-            multiplier = 1
-            if 'billion' in value_text.lower() or 'b' in value_text.lower():
-                multiplier = 1_000_000_000
-                value_text = re.sub(r'billion|b', '', value_text, flags=re.IGNORECASE)
-            elif 'million' in value_text.lower() or 'm' in value_text.lower():
-                multiplier = 1_000_000
-                value_text = re.sub(r'million|m', '', value_text, flags=re.IGNORECASE)
-
-            numeric_match = re.search(r'\d+\.?\d*', value_text)
-            if numeric_match:
-                return float(numeric_match.group(0)) * multiplier
-            return None
-        except (ValueError, TypeError):
-            return None
+        """Atomically parses a financial value string such as "$1.5 billion" or "394328000000" to a float."""
+        return value_parser.parse_xbrl_value(value_text)
 
     def search_company(self, ticker):
         """Search for company by ticker and retrieve CIK number."""
-        companies = self._fetch_json("https://www.sec.gov/files/company_tickers.json")
-        if companies is None:
-            return None, "Error fetching company tickers"
-
-        cik = None
-        for _, company in companies.items():
-            if company['ticker'].upper() == ticker.upper():
-                cik = str(company['cik_str']).zfill(10)
-                break
-
+        with get_metrics().span(STAGE_SECONDS, stage='ticker_lookup'):
+            error = self.ticker_index.ensure_loaded(self._fetch_response, self.headers)
+            if error:
+                return None, error
+            cik = self.ticker_index.get_cik(ticker)
         if not cik:
             return None, f"Company with ticker {ticker} not found"
         return cik, None
 
-    def get_recent_10k_url(self, cik):
-        """Get the most recent 10-K filing URL for a company."""
-        url = f"https://data.sec.gov/submissions/CIK{cik}.json"
-        data = self._fetch_json(url)
-        if data is None:
-            return None, f"Error fetching submission data for CIK {cik}"
-
+    def _recent_10k_accessions(self, data):
+        """Atomically lists the accession numbers of the 10-K filings in a submissions document, newest first."""
         recent_filings = data.get('filings', {}).get('recent', {})
         if not recent_filings:
             return None, "No recent filings found"
 
         form_types = recent_filings.get('form', [])
-        filing_dates = recent_filings.get('filingDate', [])
         accession_numbers = recent_filings.get('accessionNumber', [])
+        return [accession_numbers[i].replace('-', '') for i, form_type in enumerate(form_types) if form_type == '10-K'], None
 
-        for i, form_type in enumerate(form_types):
-            if form_type == '10-K':
-                accession_number = accession_numbers[i].replace('-', '')
-                filing_date = filing_dates[i]
+    def _filing_url(self, cik, accession_number, filename):
+        """Atomically builds the archive URL of a file within a filing."""
+        return f"{self.base_url}/edgar/data/{cik.lstrip('0')}/{accession_number}/{filename}"
 
-                filing_details_url = f"https://www.sec.gov/Archives/edgar/data/{cik.lstrip('0')}/{accession_number}/index.json"
-                details_data = self._fetch_json(filing_details_url)
-                if details_data is None:
-                    return None, f"Error fetching filing details for {filing_details_url}"
+    def _find_xbrl_filename(self, details_data):
+        """Atomically returns the name of the XBRL instance document in a filing's index.json, or None."""
+        return choose_instance_filename(filing.get('name', '') for filing in details_data.get('directory', {}).get('item', []))
 
-                for filing in details_data.get('directory', {}).get('item', []):
-                    if filing.get('name', '').endswith('.xml'):  # Look for the XBRL file
-                        return f"{self.base_url}/edgar/data/{cik.lstrip('0')}/{accession_number}/{filing['name']}", None
+    def get_recent_10k_url(self, cik):
+        """Get the most recent 10-K filing URL for a company."""
+        with get_metrics().span(STAGE_SECONDS, stage='submissions'):
+            data = self._fetch_json(self.submissions_url.format(cik=cik))
+        if data is None:
+            return None, f"Error fetching submission data for CIK {cik}"
+
+        accession_numbers, error = self._recent_10k_accessions(data)
+        if error:
+            return None, error
+        # Inline XBRL filings name their instance after the primary document, so most need no index.json
+        self.filing_index.record_submissions(data)
+
+        for accession_number in accession_numbers:
+            filename = self.filing_index.get(accession_number)
+            if filename is None:
+                filename, error = self._index_instance_filename(cik, accession_number)
+                if error:
+                    return None, error
+            if filename:
+                return self._filing_url(cik, accession_number, filename), None
         return None, "No 10-K XBRL filing found"
 
+    def _index_instance_filename(self, cik, accession_number):
+        """Chooses a filing's instance document from its index.json and records it in the filing index."""
+        filing_details_url = self._filing_url(cik, accession_number, 'index.json')
+        with get_metrics().span(STAGE_SECONDS, stage='filing_index'):
+            details_data = self._fetch_json(filing_details_url)
+        if details_data is None:
+            return None, f"Error fetching filing details for {filing_details_url}"
+        filename = self._find_xbrl_filename(details_data)
+        if filename:
+            self.filing_index.put(accession_number, '10-K', filename)
+        return filename, None
+
+    def resolve_missing_10k_url(self, xbrl_url):
+        """
+        Re-resolves a filing's instance document from its index.json after its indexed URL was not found.
+
+        Names derived from submissions are a convention, not a listing; index.json lists
+        the files the filing actually has, and its choice replaces the filing index entry.
+
+        Returns:
+            tuple: (url, error); url is None if index.json names no other instance document.
+        """
+        cik, accession_number, filename = xbrl_url.rstrip('/').split('/')[-3:]
+        resolved, error = self._index_instance_filename(cik, accession_number)
+        if error:
+            return None, error
+        if not resolved or resolved == filename:
+            return None, f"No other XBRL instance document in filing {accession_number}"
+        return self._filing_url(cik, accession_number, resolved), None
+
     def extract_company_name(self, soup):
         """Atomically extracts the company name from the BeautifulSoup object."""
         company_name_tag = self._find_in_soup(soup, 'company-name')
@@ -176,84 +257,91 @@ class EdgarScraper:
     def extract_financial_data(self, xbrl_url):
         """Extract financial data from 10-K XBRL document."""
         try:
+            started = time.perf_counter()
             # Apply rate limiting
-            if check_rate_limit(xbrl_url):
+            if not wait_for_rate_limit(xbrl_url):
+                get_metrics().increment(SEC_REQUESTS, {'outcome': 'rate_limited'})
                 return None, "Rate limit exceeded"
 
-            # Fetch the XBRL data
-            response = requests.get(xbrl_url, headers=self.headers)
-            response.raise_for_status()  # Ensure we got a valid response
-
-            # Parse the XBRL document
-            xbrl_doc = xbrl.parse(response.content)
-
-            # Get the GAAP context
-            gapp_context = None
-
-            # Create a dictionary to hold the extracted data
-            metrics = {
-                'company_name': self._get_xbrl_value(xbrl_doc, 'dei:EntityRegistrantName', gapp_context) or "Unknown",
-                'revenue': self._get_xbrl_value(xbrl_doc, 'us-gaap:RevenueFromContractsWithCustomersExcludingAssessedTax', gapp_context) or self._get_xbrl_value(xbrl_doc, 'us-gaap:SalesRevenueNet', gapp_context),
-                'net_income': self._get_xbrl_value(xbrl_doc, 'us-gaap:NetIncomeLoss', gapp_context),
-                'total_assets': self._get_xbrl_value(xbrl_doc, 'us-gaap:Assets', gapp_context),
-                'total_liabilities': self._get_xbrl_value(xbrl_doc, 'us-gaap:Liabilities', gapp_context),
-                'cash_and_equivalents': self._get_xbrl_value(xbrl_doc, 'us-gaap:CashAndCashEquivalentsAtCarryingValue', gapp_context),
-                'long_term_debt': self._get_xbrl_value(xbrl_doc, 'us-gaap:LongTermDebt', gapp_context),
-                'operating_income': self._get_xbrl_value(xbrl_doc, 'us-gaap:OperatingIncomeLoss', gapp_context),
-                'shares_outstanding': self._get_xbrl_value(xbrl_doc, 'dei:EntityCommonStockSharesOutstanding', gapp_context),
-                'fiscal_year_end': self._get_xbrl_value(xbrl_doc, 'dei:DocumentPeriodEndDate', gapp_context),
-                'filing_date': self._get_xbrl_value(xbrl_doc, 'dei:DocumentFilingDate', gapp_context)
-            }
-
-            # Calculate additional metrics
-            metrics['equity'] = metrics['total_assets'] - metrics['total_liabilities'] if metrics['total_assets'] and metrics['total_liabilities'] else None
-            metrics['profit_margin'] = round((metrics['net_income'] / metrics['revenue']) * 100, 2) if metrics['revenue'] and metrics['net_income'] else None
-            metrics['return_on_assets'] = round((metrics['net_income'] / metrics['total_assets']) * 100, 2) if metrics['total_assets'] and metrics['net_income'] else None
-            metrics['return_on_equity'] = round((metrics['net_income'] / metrics['equity']) * 100, 2) if metrics['equity'] and metrics['net_income'] else None
-            metrics['debt_to_assets_ratio'] = round(metrics['total_liabilities'] / metrics['total_assets'], 2) if metrics['total_assets'] and metrics['total_liabilities'] else None
-            metrics['dividends_per_share'] = self._get_xbrl_value(xbrl_doc, 'us-gaap:CommonStockDividendsPerShare', gapp_context)
-            metrics['fcf'] = self._get_xbrl_value(xbrl_doc, 'us-gaap:FreeCashFlow', gapp_context)  # Corrected tag
-            # Per-share metrics
-            shares_outstanding = metrics.get('shares_outstanding')
-            if shares_outstanding:
-                for key in ['net_income', 'equity', 'total_assets', 'revenue', 'cash_and_equivalents', 'total_liabilities',
-                            'long_term_debt']:
-                    if metrics.get(key) is not None:
-                        metrics[f'{key}_per_share'] = round(metrics[key] / shares_outstanding, 2)
-                if metrics.get('fcf') is not None:
-                    metrics['fcf_per_share'] = round(metrics['fcf'] / shares_outstanding, 2)
-            # net tangible assets per share
-            tangible_assets = metrics.get('total_assets') - self._get_xbrl_value(xbrl_doc, 'us-gaap:IntangibleAssetsNet', gapp_context) if metrics.get(
-                'total_assets') is not None else None
-            if tangible_assets is not None and shares_outstanding is not None:
-                metrics['net_tangible_assets_per_share'] = round(
-                    (tangible_assets - metrics.get('total_liabilities', 0)) / shares_outstanding,
-                    2) if metrics.get('total_liabilities') is not None else None
-            else:
-                metrics['net_tangible_assets_per_share'] = None
-            return metrics, None
+            # Stream the XBRL data into the parser so the whole document is never held in memory
+            response = self.session.get(xbrl_url, headers=self.headers, timeout=REQUEST_TIMEOUT, stream=True)
+            get_metrics().increment(SEC_REQUESTS, {'outcome': str(response.status_code)})
+            try:
+                if response.status_code == 404:
+                    return None, XBRL_NOT_FOUND_ERROR.format(url=xbrl_url)
+                response.raise_for_status()  # Ensure we got a valid response
+                headers_received = time.perf_counter()
+                # Reads and parsing interleave; time blocked on the socket is download, the rest is parse
+                chunks = TimedIterator(response.iter_content(chunk_size=self.XBRL_CHUNK_SIZE))
+                xbrl_doc = xbrl_facts.parse_fact_index_stream(chunks, self.FACT_CONCEPTS)
+                parsed = time.perf_counter()
+            finally:
+                response.close()
+            get_metrics().observe(STAGE_SECONDS, headers_received - started + chunks.seconds, {'stage': 'xbrl_download'})
+            get_metrics().observe(STAGE_SECONDS, parsed - headers_received - chunks.seconds, {'stage': 'xbrl_parse'})
+            return self._calculate_metrics(xbrl_doc), None
 
         except Exception as e:
             return None, f"Error extracting financial data: {str(e)}"
 
+    def _parse_financial_data(self, content):
+        """Parses a 10-K XBRL document held in memory and calculates the financial metrics."""
+        return self._calculate_metrics(xbrl_facts.parse_fact_index(content, self.FACT_CONCEPTS))
+
+    def _calculate_metrics(self, xbrl_doc):
+        """Calculates the financial metrics from a FactIndex of a 10-K XBRL document."""
+        # Resolve the current fiscal period once; flows are reported over a duration, balances at an instant
+        period = xbrl_facts.resolve_reporting_period(xbrl_doc)
+        duration_context = period.duration
+        instant_context = period.instant
+
+        # Create a dictionary to hold the extracted data
+        metrics = {
+            'company_name': self._get_xbrl_text(xbrl_doc, 'dei:EntityRegistrantName', None) or "Unknown",
+            'revenue': self._get_xbrl_value(xbrl_doc, 'us-gaap:RevenueFromContractWithCustomerExcludingAssessedTax', duration_context) or self._get_xbrl_value(xbrl_doc, 'us-gaap:SalesRevenueNet', duration_context),
+            'net_income': self._get_xbrl_value(xbrl_doc, 'us-gaap:NetIncomeLoss', duration_context),
+            'total_assets': self._get_xbrl_value(xbrl_doc, 'us-gaap:Assets', instant_context),
+            'total_liabilities': self._get_xbrl_value(xbrl_doc, 'us-gaap:Liabilities', instant_context),
+            'cash_and_equivalents': self._get_xbrl_value(xbrl_doc, 'us-gaap:CashAndCashEquivalentsAtCarryingValue', instant_context),
+            'long_term_debt': self._get_xbrl_value(xbrl_doc, 'us-gaap:LongTermDebt', instant_context),
+            'operating_income': self._get_xbrl_value(xbrl_doc, 'us-gaap:OperatingIncomeLoss', duration_context),
+            'shares_outstanding': self._get_xbrl_value(xbrl_doc, 'dei:EntityCommonStockSharesOutstanding', None),
+            'fiscal_year_end': self._get_xbrl_text(xbrl_doc, 'dei:DocumentPeriodEndDate', None) or period.end_date,
+            'filing_date': self._get_xbrl_text(xbrl_doc, 'dei:DocumentFilingDate', None)
+        }
+
+        metrics['dividends_per_share'] = self._get_xbrl_value(xbrl_doc, 'us-gaap:CommonStockDividendsPerShare', duration_context)
+        metrics['fcf'] = self._get_xbrl_value(xbrl_doc, 'us-gaap:FreeCashFlow', duration_context)  # Corrected tag
+        metrics['intangible_assets'] = self._get_xbrl_value(xbrl_doc, 'us-gaap:IntangibleAssetsNet', instant_context)
+
+        # Ratios and per-share values come from the shared metric registry
+        with get_metrics().span(STAGE_SECONDS, stage='ratios'):
+            return metrics_engine.evaluate(metrics)
+
+    def _get_xbrl_fact(self, xbrl_doc, tag_name, context_id):
+        """
+        Helper method to find the fact for a concept in a FactIndex, given a tag name and context.
+        If context_id is None, the first non-dimensional fact in any context is accepted.
+        """
+        if context_id is not None:
+            return xbrl_doc.find(tag_name, context_id)
+        facts = xbrl_doc.get(tag_name)
+        return next((fact for fact in facts if not fact.context.dimensions), facts[0] if facts else None)
+
     def _get_xbrl_value(self, xbrl_doc, tag_name, context_id):
         """
-        Helper method to safely extract a value from an XBRL document, given a tag name and context.
+        Helper method to safely extract a numeric value from a FactIndex, given a tag name and context.
         Returns the first non-null value found.
         """
-        elements = xbrl_doc.find_all(tag_name)  # Find all elements with the tag_name
-        if not elements:
+        fact = self._get_xbrl_fact(xbrl_doc, tag_name, context_id)
+        if fact is None:
             return None
+        return value_parser.parse_xbrl_value(fact.value, fact.decimals)
 
-        for element in elements:
-            # Check if the context matches.  If context_id is None, we'll accept any context.
-            if context_id is None or element.context_id == context_id:
-                text_content = element.text_content()
-                try:
-                    return self._parse_financial_value(text_content)
-                except ValueError:
-                    return None  # Handle non-numeric content
-        return None
+    def _get_xbrl_text(self, xbrl_doc, tag_name, context_id):
+        """Helper method to extract a text value such as a name or date from a FactIndex."""
+        fact = self._get_xbrl_fact(xbrl_doc, tag_name, context_id)
+        return fact.value if fact is not None and fact.value else None
 
     def _extract_fiscal_year(self, soup):
         """Extract fiscal year from document - Not needed with XBRL"""
@@ -264,62 +352,349 @@ class EdgarScraper:
         return None
 
 # Caching Functions
-def _get_cache_dir():
-    """Atomically gets the cache directory, creating it if it doesn't exist."""
-    cache_dir = 'cache'
-    if not os.path.exists(cache_dir):
-        os.makedirs(cache_dir)
-    return cache_dir
-
-def save_to_cache(ticker, data):
-    """Atomically saves data to a cache file."""
-    cache_file = os.path.join(_get_cache_dir(), f"{ticker.upper()}.json")
-    with open(cache_file, 'w') as f:
-        json.dump(data, f)
+def save_to_cache(ticker, data, accession_number=None):
+    """Atomically saves an analysis of a ticker's 10-K to the tiered cache."""
+    get_analysis_cache().put(ticker, accession_number, data)
 
 def load_from_cache(ticker):
-    """Atomically loads data from a cache file if it exists, otherwise returns None."""
-    cache_file = os.path.join(_get_cache_dir(), f"{ticker.upper()}.json")
-    if os.path.exists(cache_file):
-        with open(cache_file, 'r') as f:
-            return json.load(f)
-    return None
-
-# Flask Routes
-@app.route('/')
-def index():
-    """Atomically renders the index page."""
-    return flask.render_template('index.html')
+    """Atomically loads an unexpired analysis from the tiered cache, otherwise returns None."""
+    return get_analysis_cache().get(ticker)
+
+def load_filing_from_cache(ticker, accession_number):
+    """Atomically loads the analysis of a specific filing, renewing its expiry, otherwise returns None."""
+    return get_analysis_cache().get_filing(ticker, accession_number)
+
+def _accession_number(xbrl_url):
+    """Atomically returns the accession number folder of a filing document URL."""
+    return xbrl_url.rstrip('/').split('/')[-2]
+
+# Analysis Functions
+# Upper bound on concurrent tickers in a batch; the global rate limit is the real throttle
+BATCH_MAX_WORKERS = 8
+BATCH_MAX_TICKERS = 1000
+_analysis_flight = SingleFlight()
+# Fiscal years of history returned by /analyze/history
+TREND_YEARS = 5
+MAX_TREND_YEARS = 20
+# Part of every analysis ETag; bump it when the fields or formulas of an analysis change
+ANALYSIS_ETAG_VERSION = 1
+# Serialized /analyze bodies kept by ETag, so cache hits are not re-encoded on every request
+_analysis_json = LRUCache(maxsize=256)
+
+def analyze_ticker(ticker, scraper=None):
+    """
+    Runs the full lookup, filing and extraction pipeline for one ticker.
 
-@app.route('/analyze', methods=['POST'])
-def analyze():
-    """Atomically analyzes a stock ticker and returns financial data."""
-    ticker = flask.request.form.get('ticker', '').strip()
-    if not ticker:
-        return flask.jsonify({"error": "Please enter a valid ticker symbol"})
+    Args:
+        ticker (str): The stock ticker symbol.
+        scraper (EdgarScraper): Optional scraper to reuse across calls.
 
+    Returns:
+        tuple: (metrics, error) where exactly one of the two is None.
+    """
     cached_data = load_from_cache(ticker)
     if cached_data:
-        return flask.jsonify(cached_data)
+        return cached_data, None
+
+    # Concurrent requests for the same uncached ticker share one pipeline run
+    return _analysis_flight.do(ticker.upper(), _analyze_uncached, ticker, scraper)
+
+def refresh_ticker(ticker, scraper=None):
+    """
+    Re-checks a ticker's newest 10-K even if its analysis has not expired, re-analyzing only if it changed.
 
-    scraper = EdgarScraper()
+    Shares the single-flight slot with analyze_ticker, so a user request arriving
+    mid-refresh waits for the refresh instead of starting its own.
+
+    Returns:
+        tuple: (metrics, error) where exactly one of the two is None.
+    """
+    return _analysis_flight.do(ticker.upper(), _analyze_uncached, ticker, scraper, True)
+
+def _analyze_uncached(ticker, scraper=None, revalidate=False):
+    """Runs the pipeline for a ticker that missed the cache; called at most once at a time per ticker."""
+    # A run that finished just before this one started has already cached the result
+    cached_data = None if revalidate else load_from_cache(ticker)
+    if cached_data:
+        return cached_data, None
+    if OFFLINE_MODE:
+        return analyze_ticker_offline(ticker)
+
+    scraper = scraper or EdgarScraper()
     cik, error = scraper.search_company(ticker)
     if error:
-        return flask.jsonify({"error": error})
+        return None, error
 
     xbrl_url, error = scraper.get_recent_10k_url(cik)  # Changed to get XBRL URL
     if error:
-        return flask.jsonify({"error": error})
+        return None, error
+
+    # An expired entry is still good if no newer 10-K has been filed since
+    accession_number = _accession_number(xbrl_url)
+    cached_data = load_filing_from_cache(ticker, accession_number)
+    if cached_data:
+        return cached_data, None
 
     metrics, error = scraper.extract_financial_data(xbrl_url)  # Pass XBRL URL
+    if error == XBRL_NOT_FOUND_ERROR.format(url=xbrl_url):
+        # The indexed name may have been derived wrongly; index.json has the real one
+        retry_url, _ = scraper.resolve_missing_10k_url(xbrl_url)
+        if retry_url:
+            xbrl_url = retry_url
+            metrics, error = scraper.extract_financial_data(xbrl_url)
     if error:
-        return flask.jsonify({"error": error})
+        return None, error
 
     metrics['source_url'] = xbrl_url  # changed to xbrl_url
     metrics['ticker'] = ticker.upper()
+    metrics['accession_number'] = accession_number
+
+    save_to_cache(ticker, metrics, accession_number)
+    return metrics, None
+
+def analyze_ticker_offline(ticker, ticker_index=None, store=None):
+    """
+    Computes the same metrics as analyze_ticker from an imported bulk snapshot, with no network access.
+
+    Uses the ticker index and companyfacts store written by bulk_import, and the
+    latest annual report found in the stored facts.
+
+    Returns:
+        tuple: (metrics, error) where exactly one of the two is None.
+    """
+    ticker_index = ticker_index if ticker_index is not None else get_ticker_index()
+    store = store if store is not None else get_company_facts_store()
+    # A fetcher that never fetches: load the index from disk and keep it however old it is
+    error = ticker_index.ensure_loaded(lambda url, headers: None)
+    if error:
+        return None, error
+    cik = ticker_index.get_cik(ticker)
+    if not cik:
+        return None, f"Company with ticker {ticker} not found"
+
+    facts = store.load(cik)
+    if facts is None:
+        return None, f"No offline company facts for {ticker.upper()}"
+    xbrl_doc, accession_number = facts.filing_fact_index()
+    if xbrl_doc is None:
+        return None, "No 10-K XBRL filing found"
+
+    metrics = EdgarScraper(ticker_index=ticker_index)._calculate_metrics(xbrl_doc)
+    metrics['source_url'] = company_facts.COMPANY_FACTS_URL.format(cik=cik)
+    metrics['ticker'] = ticker.upper()
+    metrics['accession_number'] = accession_number
+
+    save_to_cache(ticker, metrics, accession_number)
+    return metrics, None
+
+def analyze_trends(ticker, years=TREND_YEARS, scraper=None, store=None):
+    """
+    Computes multi-year revenue, income and margin trends from the company's EDGAR companyfacts.
+
+    The companyfacts document is downloaded at most once per day per company and
+    kept as NumPy columns, so repeat and multi-year queries need no XBRL downloads.
+
+    Returns:
+        tuple: (trends, error) where exactly one of the two is None.
+    """
+    scraper = scraper or EdgarScraper()
+    store = store if store is not None else get_company_facts_store()
+    cik, error = scraper.search_company(ticker)
+    if error:
+        return None, error
+
+    facts, error = store.get(cik, scraper._fetch_json)
+    if error:
+        return None, error
+
+    trends = company_facts.trend_metrics(facts, years=years)
+    trends['ticker'] = ticker.upper()
+    trends['cik'] = cik
+    return trends, None
+
+def _normalize_tickers(tickers):
+    """Atomically upper-cases, strips and de-duplicates tickers, preserving order."""
+    normalized = []
+    seen = set()
+    for ticker in tickers:
+        ticker = str(ticker).strip().upper()
+        if ticker and ticker not in seen:
+            seen.add(ticker)
+            normalized.append(ticker)
+    return normalized
+
+def analyze_tickers(tickers, max_workers=BATCH_MAX_WORKERS, scraper=None):
+    """
+    Analyzes many tickers concurrently on a bounded worker pool.
 
-    save_to_cache(ticker, metrics)
-    return flask.jsonify(metrics)
+    All workers share the process-wide rate limit, so the batch never exceeds
+    the SEC budget no matter how many workers are running.
+
+    Args:
+        tickers (iterable): Ticker symbols to analyze.
+        max_workers (int): Maximum number of tickers in flight at once.
+        scraper (EdgarScraper): Optional scraper shared by all workers.
+
+    Yields:
+        tuple: (ticker, metrics, error) for each ticker, in completion order.
+    """
+    tickers = _normalize_tickers(tickers)
+    if not tickers:
+        return
+    scraper = scraper or EdgarScraper()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(tickers)))
+    try:
+        futures = {executor.submit(analyze_ticker, ticker, scraper): ticker for ticker in tickers}
+        for future in concurrent.futures.as_completed(futures):
+            ticker = futures[future]
+            try:
+                metrics, error = future.result()
+            except Exception as e:
+                metrics, error = None, f"Error analyzing {ticker}: {str(e)}"
+            yield ticker, metrics, error
+    finally:
+        # A consumer that stops early, e.g. a disconnected client, must not leave the queued tickers hitting EDGAR
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def _get_batch_tickers(request):
+    """Atomically reads the ticker list from a JSON body or a comma-separated form field."""
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict):
+        tickers = payload.get('tickers', [])
+        if isinstance(tickers, str):
+            tickers = tickers.split(',')
+        return tickers if isinstance(tickers, list) else []
+    return request.form.get('tickers', '').split(',')
+
+def _component_samples():
+    """Reports the counters kept by the analysis cache, rate limiter and single-flight group."""
+    for event, count in get_analysis_cache().stats().items():
+        yield Sample('haystack_analysis_cache_events_total', 'counter', 'Analysis cache lookups by tier hit, revalidation, staleness or miss.', {'event': event}, count)
+    limiter_stats = get_rate_limiter().stats()
+    yield Sample('haystack_rate_limit_waits_total', 'counter', 'SEC requests that queued for a rate limit slot.', None, limiter_stats['waits'])
+    yield Sample('haystack_rate_limit_wait_seconds_total', 'counter', 'Total seconds SEC requests spent queued for a rate limit slot.', None, limiter_stats['wait_seconds'])
+    yield Sample('haystack_rate_limit_timeouts_total', 'counter', 'SEC requests abandoned because no slot freed up in time.', None, limiter_stats['timeouts'])
+    yield Sample('haystack_coalesced_analyses_total', 'counter', 'Analyses answered by joining an identical run already in flight.', None, _analysis_flight.coalesced)
+
+get_metrics().register_collector(_component_samples)
+
+def analysis_etag(metrics):
+    """
+    Atomically derives a strong ETag for an analysis from its ticker and 10-K accession number.
+
+    An analysis is a pure function of the filing, so the tag changes exactly when
+    a new 10-K replaces it. Returns None for analyses cached without an accession number.
+    """
+    if not metrics.get('ticker') or not metrics.get('accession_number'):
+        return None
+    key = f"{metrics['ticker']}:{metrics['accession_number']}:{ANALYSIS_ETAG_VERSION}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+def _analysis_response(metrics):
+    """Atomically builds the JSON response for an analysis, with its ETag, reusing the serialized body."""
+    etag = analysis_etag(metrics)
+    body = _analysis_json.get(etag) if etag else None
+    if body is None:
+        body = flask.json.dumps(metrics) + '\n'
+        if etag:
+            _analysis_json.put(etag, body)
+    response = flask.Response(body, mimetype='application/json')
+    if etag:
+        response.set_etag(etag)
+    return response
+
+# Flask Routes
+@app.before_request
+def _start_request_timer():
+    """Atomically notes when the request arrived."""
+    flask.g.request_started = time.perf_counter()
+
+@app.after_request
+def _observe_request_time(response):
+    """Atomically records the request's latency under its route."""
+    started = getattr(flask.g, 'request_started', None)
+    if started is not None:
+        endpoint = flask.request.url_rule.rule if flask.request.url_rule else 'unmatched'
+        get_metrics().observe(REQUEST_SECONDS, time.perf_counter() - started, {'endpoint': endpoint})
+    return response
+
+@app.after_request
+def _compress_response(response):
+    """Atomically gzip- or brotli-encodes large and streamed responses for clients that accept it."""
+    return compression.compress_response(response, flask.request.accept_encodings)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Atomically returns the latency histograms and counters in the Prometheus text format."""
+    return flask.Response(get_metrics().render(), content_type=CONTENT_TYPE)
+
+@app.route('/')
+def index():
+    """Atomically renders the index page."""
+    return flask.render_template('index.html')
+
+@app.route('/analyze', methods=['GET', 'POST'])
+def analyze():
+    """
+    Analyzes a stock ticker and returns financial data.
+
+    GET /analyze?ticker=AAPL honors If-None-Match, answering 304 while the
+    client's copy is from the same 10-K.
+    """
+    ticker = flask.request.values.get('ticker', '').strip()
+    if not ticker:
+        return flask.jsonify({"error": "Please enter a valid ticker symbol"})
+
+    metrics, error = analyze_ticker(ticker)
+    if error:
+        return flask.jsonify({"error": error})
+
+    etag = analysis_etag(metrics)
+    matched = compression.matching_etag(flask.request.if_none_match, etag) if etag and flask.request.method == 'GET' else None
+    if matched:
+        # Echo the client's tag, coding suffix included, so it validates the representation it stored
+        response = flask.Response(status=304)
+        response.set_etag(matched)
+        return response
+    return _analysis_response(metrics)
+
+@app.route('/analyze/history', methods=['POST'])
+def analyze_history():
+    """Atomically returns multi-year financial trends for a stock ticker."""
+    ticker = flask.request.form.get('ticker', '').strip()
+    if not ticker:
+        return flask.jsonify({"error": "Please enter a valid ticker symbol"})
+    try:
+        years = min(max(int(flask.request.form.get('years', TREND_YEARS)), 2), MAX_TREND_YEARS)
+    except ValueError:
+        return flask.jsonify({"error": "years must be a whole number"}), 400
+
+    trends, error = analyze_trends(ticker, years=years)
+    if error:
+        return flask.jsonify({"error": error})
+    return flask.jsonify(trends)
+
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """Analyzes a list of tickers and streams one JSON result per line as each finishes."""
+    tickers = _normalize_tickers(_get_batch_tickers(flask.request))
+    if not tickers:
+        return flask.jsonify({"error": "Please enter at least one valid ticker symbol"}), 400
+    if len(tickers) > BATCH_MAX_TICKERS:
+        return flask.jsonify({"error": f"A batch may contain at most {BATCH_MAX_TICKERS} tickers"}), 400
+
+    def generate():
+        # Closing the batch as soon as the response is closed cancels the tickers not yet started
+        with contextlib.closing(analyze_tickers(tickers)) as results:
+            for ticker, metrics, error in results:
+                result = {"ticker": ticker, "error": error} if error else metrics
+                yield json.dumps(result) + '\n'
+
+    return flask.Response(flask.stream_with_context(generate()), mimetype='application/x-ndjson')
 
 if __name__ == '__main__':
+    # The debug reloader runs this module in a watcher and a server process; only the server prefetches
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        import prefetch
+        prefetch.start_from_environment()
     app.run(debug=True)
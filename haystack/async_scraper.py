@@ -0,0 +1,286 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import time
+import aiohttp
+import app
+import xbrl_facts
+from filing_index import get_filing_index
+from http_session import get_validator_cache
+from instrumentation import get_metrics
+from rate_limiter import get_rate_limiter
+from ticker_index import get_ticker_index
+
+# Connection pool limits; the shared rate limiter, not the pool, bounds request rate
+MAX_CONNECTIONS = 64
+MAX_CONNECTIONS_PER_HOST = 32
+DEFAULT_CONCURRENCY = 32
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=120, connect=5)
+
+
+class AsyncEdgarScraper(app.EdgarScraper):
+    """
+    asyncio variant of EdgarScraper.
+
+    search_company, get_recent_10k_url and extract_financial_data are coroutines with
+    the same arguments and (result, error) return values as the blocking scraper.
+    Requests share one keep-alive aiohttp session and the process-wide rate limiter.
+
+    Usage:
+        async with AsyncEdgarScraper() as scraper:
+            cik, error = await scraper.search_company("AAPL")
+    """
+
+    def __init__(self, ticker_index=None, validator_cache=None, rate_limiter=None, session=None, filing_index=None):
+        self.base_url = app.EdgarScraper.BASE_URL
+        self.submissions_url = app.EdgarScraper.SUBMISSIONS_URL
+        self.headers = app.EdgarScraper.HEADERS
+        self.ticker_index = ticker_index if ticker_index is not None else get_ticker_index()
+        self.validator_cache = validator_cache if validator_cache is not None else get_validator_cache()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else get_rate_limiter()
+        self.filing_index = filing_index if filing_index is not None else get_filing_index()
+        self.session = session
+        self._owns_session = session is None
+
+    async def __aenter__(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS, limit_per_host=MAX_CONNECTIONS_PER_HOST)
+            self.session = aiohttp.ClientSession(connector=connector, headers=self.headers, timeout=REQUEST_TIMEOUT)
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _fetch_body(self, url, revalidate=False):
+        """
+        Fetches a URL under the shared rate limit and returns the decoded body, or None.
+
+        With revalidate=True the request is a conditional GET and a 304 is answered
+        from the validator cache shared with the blocking scraper.
+        """
+        headers = dict(self.headers)
+        if revalidate:
+            headers.update(self.validator_cache.conditional_headers(url))
+        try:
+            if not await self.rate_limiter.acquire_async(url, timeout=app.RATE_LIMIT_TIMEOUT):
+                print(f"Rate limit exceeded for {url}")
+                get_metrics().increment(app.SEC_REQUESTS, {'outcome': 'rate_limited'})
+                return None
+
+            async with self.session.get(url, headers=headers) as response:
+                get_metrics().increment(app.SEC_REQUESTS, {'outcome': str(response.status)})
+                if revalidate and response.status == 304:
+                    body, _ = self.validator_cache.load_body(url)
+                    if body is not None:
+                        return body
+                response.raise_for_status()
+                body = await response.read()
+                if revalidate and response.status == 200:
+                    self.validator_cache.store_body(url, response.headers, body)
+                return body
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error fetching {url}: {e}")
+            # HTTP errors were already counted under their status code
+            if not isinstance(e, aiohttp.ClientResponseError):
+                get_metrics().increment(app.SEC_REQUESTS, {'outcome': 'error'})
+            return None
+
+    async def _fetch_json(self, url):
+        """Fetches JSON data from a URL and returns the parsed JSON or None."""
+        body = await self._fetch_body(url, revalidate=True)
+        if body is None:
+            return None
+        try:
+            return json.loads(body)
+        except ValueError as e:
+            print(f"Error decoding JSON from {url}: {e}")
+            return None
+
+    async def search_company(self, ticker):
+        """Search for company by ticker and retrieve CIK number."""
+        with get_metrics().span(app.STAGE_SECONDS, stage='ticker_lookup'):
+            if not self.ticker_index.is_fresh():
+                # The ticker list is refreshed at most daily, so load it with the blocking client off the loop
+                loader = app.EdgarScraper(ticker_index=self.ticker_index, validator_cache=self.validator_cache)
+                error = await asyncio.to_thread(self.ticker_index.ensure_loaded, loader._fetch_response, self.headers)
+                if error:
+                    return None, error
+            cik = self.ticker_index.get_cik(ticker)
+        if not cik:
+            return None, f"Company with ticker {ticker} not found"
+        return cik, None
+
+    async def get_recent_10k_url(self, cik):
+        """Get the most recent 10-K filing URL for a company."""
+        with get_metrics().span(app.STAGE_SECONDS, stage='submissions'):
+            data = await self._fetch_json(self.submissions_url.format(cik=cik))
+        if data is None:
+            return None, f"Error fetching submission data for CIK {cik}"
+
+        accession_numbers, error = self._recent_10k_accessions(data)
+        if error:
+            return None, error
+        self.filing_index.record_submissions(data)
+
+        for accession_number in accession_numbers:
+            filename = self.filing_index.get(accession_number)
+            if filename is None:
+                filename, error = await self._index_instance_filename(cik, accession_number)
+                if error:
+                    return None, error
+            if filename:
+                return self._filing_url(cik, accession_number, filename), None
+        return None, "No 10-K XBRL filing found"
+
+    async def _index_instance_filename(self, cik, accession_number):
+        """Chooses a filing's instance document from its index.json and records it in the filing index."""
+        filing_details_url = self._filing_url(cik, accession_number, 'index.json')
+        with get_metrics().span(app.STAGE_SECONDS, stage='filing_index'):
+            details_data = await self._fetch_json(filing_details_url)
+        if details_data is None:
+            return None, f"Error fetching filing details for {filing_details_url}"
+        filename = self._find_xbrl_filename(details_data)
+        if filename:
+            self.filing_index.put(accession_number, '10-K', filename)
+        return filename, None
+
+    async def resolve_missing_10k_url(self, xbrl_url):
+        """Re-resolves a filing's instance document from its index.json after its indexed URL was not found."""
+        cik, accession_number, filename = xbrl_url.rstrip('/').split('/')[-3:]
+        resolved, error = await self._index_instance_filename(cik, accession_number)
+        if error:
+            return None, error
+        if not resolved or resolved == filename:
+            return None, f"No other XBRL instance document in filing {accession_number}"
+        return self._filing_url(cik, accession_number, resolved), None
+
+    async def extract_financial_data(self, xbrl_url):
+        """Extract financial data from 10-K XBRL document."""
+        try:
+            started = time.perf_counter()
+            if not await self.rate_limiter.acquire_async(xbrl_url, timeout=app.RATE_LIMIT_TIMEOUT):
+                get_metrics().increment(app.SEC_REQUESTS, {'outcome': 'rate_limited'})
+                return None, "Rate limit exceeded"
+
+            parser = xbrl_facts.FactIndexParser(self.FACT_CONCEPTS)
+            parse_seconds = 0.0
+            async with self.session.get(xbrl_url, headers=self.headers) as response:
+                get_metrics().increment(app.SEC_REQUESTS, {'outcome': str(response.status)})
+                if response.status == 404:
+                    return None, app.XBRL_NOT_FOUND_ERROR.format(url=xbrl_url)
+                response.raise_for_status()
+                # Parsing is CPU-bound, so feed each chunk off the event loop as it arrives
+                async for chunk in response.content.iter_chunked(self.XBRL_CHUNK_SIZE):
+                    feed_started = time.perf_counter()
+                    await asyncio.to_thread(parser.feed, chunk)
+                    parse_seconds += time.perf_counter() - feed_started
+            feed_started = time.perf_counter()
+            xbrl_doc = await asyncio.to_thread(parser.close)
+            parse_seconds += time.perf_counter() - feed_started
+            get_metrics().observe(app.STAGE_SECONDS, time.perf_counter() - started - parse_seconds, {'stage': 'xbrl_download'})
+            get_metrics().observe(app.STAGE_SECONDS, parse_seconds, {'stage': 'xbrl_parse'})
+            return self._calculate_metrics(xbrl_doc), None
+        except Exception as e:
+            return None, f"Error extracting financial data: {str(e)}"
+
+
+async def analyze_ticker(ticker, scraper):
+    """
+    Coroutine counterpart of app.analyze_ticker, sharing its on-disk cache.
+
+    Cache misses share app.analyze_ticker's single-flight slots, so concurrent requests
+    for one ticker run the pipeline once whether they come from threads or coroutines.
+
+    Returns:
+        tuple: (metrics, error) where exactly one of the two is None.
+    """
+    # The analysis cache is SQLite-backed, so its calls run off the event loop
+    cached_data = await asyncio.to_thread(app.load_from_cache, ticker)
+    if cached_data:
+        return cached_data, None
+    return await app._analysis_flight.do_async(ticker.upper(), _analyze_uncached, ticker, scraper)
+
+async def _analyze_uncached(ticker, scraper):
+    """Runs the pipeline for a ticker that missed the cache; called at most once at a time per ticker."""
+    # A run that finished just before this one started has already cached the result
+    cached_data = await asyncio.to_thread(app.load_from_cache, ticker)
+    if cached_data:
+        return cached_data, None
+
+    cik, error = await scraper.search_company(ticker)
+    if error:
+        return None, error
+
+    xbrl_url, error = await scraper.get_recent_10k_url(cik)
+    if error:
+        return None, error
+
+    accession_number = app._accession_number(xbrl_url)
+    cached_data = await asyncio.to_thread(app.load_filing_from_cache, ticker, accession_number)
+    if cached_data:
+        return cached_data, None
+
+    metrics, error = await scraper.extract_financial_data(xbrl_url)
+    if error == app.XBRL_NOT_FOUND_ERROR.format(url=xbrl_url):
+        retry_url, _ = await scraper.resolve_missing_10k_url(xbrl_url)
+        if retry_url:
+            xbrl_url = retry_url
+            metrics, error = await scraper.extract_financial_data(xbrl_url)
+    if error:
+        return None, error
+
+    metrics['source_url'] = xbrl_url
+    metrics['ticker'] = ticker.upper()
+    metrics['accession_number'] = accession_number
+
+    await asyncio.to_thread(app.save_to_cache, ticker, metrics, accession_number)
+    return metrics, None
+
+async def analyze_tickers(tickers, concurrency=DEFAULT_CONCURRENCY, scraper=None):
+    """
+    Analyzes many tickers with at most `concurrency` of them in flight at once.
+
+    Yields:
+        tuple: (ticker, metrics, error) for each ticker, in completion order.
+    """
+    tickers = app._normalize_tickers(tickers)
+    if not tickers:
+        return
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with contextlib.AsyncExitStack() as stack:
+        if scraper is None:
+            scraper = await stack.enter_async_context(AsyncEdgarScraper())
+
+        async def run(ticker):
+            async with semaphore:
+                try:
+                    metrics, error = await analyze_ticker(ticker, scraper)
+                except Exception as e:
+                    metrics, error = None, f"Error analyzing {ticker}: {str(e)}"
+                return ticker, metrics, error
+
+        for result in asyncio.as_completed([run(ticker) for ticker in tickers]):
+            yield await result
+
+
+async def _print_results(tickers, concurrency):
+    """Prints one JSON line per ticker as results arrive."""
+    async for ticker, metrics, error in analyze_tickers(tickers, concurrency):
+        print(json.dumps({"ticker": ticker, "error": error} if error else metrics), flush=True)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Analyze 10-K filings for many tickers concurrently")
+    parser.add_argument("tickers", nargs="+", help="Ticker symbols to analyze")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help=f"Tickers in flight at once (default: {DEFAULT_CONCURRENCY})")
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    asyncio.run(_print_results(args.tickers, args.concurrency))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,396 @@
+import argparse
+import contextlib
+import datetime
+import http.server
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+import app
+import cache_backend
+import filing_index
+import http_session
+import instrumentation
+import rate_limiter
+import ticker_index
+import xbrl_facts
+
+# Recorded 10-K instance replayed for every synthetic company
+FIXTURE_XBRL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tests', 'fixtures', 'aapl-20220924_htm.xml')
+DEFAULT_TICKERS = 50
+DEFAULT_WORKERS = app.BATCH_MAX_WORKERS
+# Extra facts appended to the fixture for the large-filing parse; a real 10-K instance has tens of thousands
+DEFAULT_LARGE_FACTS = 50000
+DEFAULT_REPEATS = 3
+DEFAULT_OUTPUT = os.path.join('cache', 'benchmark_results.json')
+# Relative change reported by --baseline comparisons
+COMPARE_THRESHOLD = 0.05
+
+
+class FixtureHandler(http.server.BaseHTTPRequestHandler):
+    """Serves recorded responses from the server's `routes`, keyed by path, with ETags and 304s like EDGAR."""
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes; with Nagle on, delayed ACKs would add ~40 ms to every response
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = self.server.routes.get(self.path.split('?')[0])
+        if body is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        etag = f'"{len(body)}-{hash(body)}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json' if self.path.endswith('.json') else 'application/xml')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    """
+    Local HTTP server replaying EDGAR responses on an ephemeral port.
+
+    Usage:
+        with FixtureServer(routes) as server:
+            scraper.base_url = server.root + "/Archives"
+    """
+
+    def __init__(self, routes):
+        self.routes = routes
+        self._server = None
+        self._thread = None
+        self.root = None
+
+    def __enter__(self):
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+        self._server.routes = self.routes
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self.root = f"http://127.0.0.1:{self._server.server_address[1]}"
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def synthetic_recordings(count, xbrl=None):
+    """
+    Builds EDGAR responses for `count` companies that each filed the fixture 10-K.
+
+    Returns:
+        tuple: (routes, companies) where routes maps URL paths to bodies and
+            companies is a company_tickers.json-style payload.
+    """
+    if xbrl is None:
+        with open(FIXTURE_XBRL, 'rb') as f:
+            xbrl = f.read()
+    routes, companies = {}, {}
+    for i in range(count):
+        cik = 1000000 + i
+        accession = f"{cik:010d}-22-{i:06d}"
+        folder = f"/Archives/edgar/data/{cik}/{accession.replace('-', '')}"
+        companies[str(i)] = {'cik_str': cik, 'ticker': f"BM{i:04d}"}
+        routes[f"/submissions/CIK{cik:010d}.json"] = json.dumps({'filings': {'recent': {
+            'form': ['8-K', '10-K'], 'accessionNumber': [f"{cik:010d}-22-{i + 500000:06d}", accession],
+            'primaryDocument': [f"bm{i:04d}-20221027.htm", f"bm{i:04d}-20220924.htm"], 'isInlineXBRL': [1, 1]
+        }}}).encode('utf-8')
+        routes[f"{folder}/index.json"] = json.dumps({'directory': {'item': [
+            {'name': f"bm{i:04d}-20220924.htm"}, {'name': f"bm{i:04d}-20220924_htm.xml"}
+        ]}}).encode('utf-8')
+        routes[f"{folder}/bm{i:04d}-20220924_htm.xml"] = xbrl
+    return routes, companies
+
+
+def load_recordings(directory):
+    """
+    Loads recorded EDGAR responses from a directory that mirrors URL paths.
+
+    Expects company_tickers.json at the top, submissions/CIK##########.json and
+    Archives/edgar/data/<cik>/<accession>/... below it, as saved from sec.gov.
+
+    Returns:
+        tuple: (routes, companies) as for synthetic_recordings.
+    """
+    routes = {}
+    for parent, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(parent, name)
+            with open(path, 'rb') as f:
+                routes['/' + os.path.relpath(path, directory).replace(os.sep, '/')] = f.read()
+    companies = json.loads(routes.pop('/company_tickers.json'))
+    return routes, companies
+
+
+def large_filing(extra_facts, xbrl=None):
+    """Atomically returns the fixture instance padded with `extra_facts` facts the pipeline does not read."""
+    if xbrl is None:
+        with open(FIXTURE_XBRL, 'rb') as f:
+            xbrl = f.read()
+    filler = ''.join(
+        f'  <us-gaap:BenchmarkFiller{j % 1000} contextRef="c-{j % 4 + 1}" unitRef="usd" decimals="-6">{j * 1000000}</us-gaap:BenchmarkFiller{j % 1000}>\n'
+        for j in range(extra_facts)
+    ).encode('utf-8')
+    closing = xbrl.rindex(b'</xbrli:xbrl>')
+    return xbrl[:closing] + filler + xbrl[closing:]
+
+
+@contextlib.contextmanager
+def isolated_pipeline(server, companies, rate=None):
+    """
+    Runs the analysis pipeline against the fixture server with cold, private state.
+
+    Swaps the process-wide analysis cache, rate limiter and metrics registry for
+    fresh ones, so each scenario starts cold and its stage timings are its own.
+    The default rate is unlimited: the SEC budget would otherwise be all that is measured.
+
+    Yields:
+        EdgarScraper: A scraper whose URLs point at the fixture server.
+    """
+    temp_dir = tempfile.mkdtemp()
+    saved = (cache_backend._default_cache, rate_limiter._default_limiter, instrumentation._default_registry)
+    store = cache_backend.SQLiteStore(os.path.join(temp_dir, 'analyses.sqlite3'))
+    session = http_session.create_session()
+    filings = filing_index.FilingIndex(os.path.join(temp_dir, 'filings.sqlite3'))
+    try:
+        cache_backend._default_cache = cache_backend.TieredCache(store=store)
+        rate_limiter._default_limiter = rate_limiter.RateLimiter(global_rate=rate or 1e9)
+        instrumentation._default_registry = instrumentation.MetricsRegistry()
+
+        index = ticker_index.TickerIndex(cache_file=os.path.join(temp_dir, 'company_tickers.json'))
+        index.replace(companies)
+        scraper = app.EdgarScraper(
+            ticker_index=index,
+            session=session,
+            validator_cache=http_session.ValidatorCache(cache_dir=os.path.join(temp_dir, 'http')),
+            filing_index=filings
+        )
+        scraper.base_url = f"{server.root}/Archives"
+        scraper.submissions_url = f"{server.root}/submissions/CIK{{cik}}.json"
+        yield scraper
+    finally:
+        cache_backend._default_cache, rate_limiter._default_limiter, instrumentation._default_registry = saved
+        session.close()
+        filings.close()
+        store.close()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def stage_summary():
+    """Atomically summarizes the current metrics registry's stage histograms as {stage: {count, total_ms, mean_ms}}."""
+    summary = {}
+    for labels, (count, total) in instrumentation.get_metrics().histogram_totals(app.STAGE_SECONDS).items():
+        stage = dict(labels).get('stage')
+        summary[stage] = {'count': count, 'total_ms': round(total * 1000, 3), 'mean_ms': round(total * 1000 / count, 3) if count else None}
+    return dict(sorted(summary.items()))
+
+
+def latency_summary(seconds):
+    """Atomically summarizes per-ticker latencies in milliseconds."""
+    ordered = sorted(seconds)
+    return {
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'p50_ms': round(ordered[len(ordered) // 2] * 1000, 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+def bench_single(server, companies, tickers, rate=None):
+    """Analyzes tickers one after another, cold and then from the cache, timing each call."""
+    with isolated_pipeline(server, companies, rate) as scraper:
+        results = {}
+        for phase in ('cold', 'warm'):
+            latencies, errors = [], 0
+            started = time.perf_counter()
+            for ticker in tickers:
+                call_started = time.perf_counter()
+                _, error = app.analyze_ticker(ticker, scraper=scraper)
+                latencies.append(time.perf_counter() - call_started)
+                errors += 1 if error else 0
+            elapsed = time.perf_counter() - started
+            results[phase] = {
+                'tickers': len(tickers), 'errors': errors, 'seconds': round(elapsed, 4),
+                'tickers_per_second': round(len(tickers) / elapsed, 2), 'latency': latency_summary(latencies)
+            }
+            if phase == 'cold':
+                results['cold']['stages'] = stage_summary()
+        return results
+
+
+def bench_batch(server, companies, tickers, workers, rate=None):
+    """Analyzes every ticker through the concurrent batch path, cold."""
+    with isolated_pipeline(server, companies, rate) as scraper:
+        started = time.perf_counter()
+        errors = sum(1 for _, _, error in app.analyze_tickers(tickers, max_workers=workers, scraper=scraper) if error)
+        elapsed = time.perf_counter() - started
+        return {
+            'tickers': len(tickers), 'workers': workers, 'errors': errors, 'seconds': round(elapsed, 4),
+            'tickers_per_second': round(len(tickers) / elapsed, 2), 'stages': stage_summary()
+        }
+
+
+def bench_parse(document, repeats=DEFAULT_REPEATS):
+    """
+    Times and measures the streaming parse of one instance document as the pipeline runs it.
+
+    Time is the best of `repeats` untraced runs; peak memory comes from a separate
+    tracemalloc run and excludes the document itself.
+    """
+    chunk_size = app.EdgarScraper.XBRL_CHUNK_SIZE
+
+    def parse():
+        chunks = (document[i:i + chunk_size] for i in range(0, len(document), chunk_size))
+        return xbrl_facts.parse_fact_index_stream(chunks, app.EdgarScraper.FACT_CONCEPTS)
+
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        index = parse()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        parse()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    best = min(timings)
+    return {
+        'document_kib': round(len(document) / 1024, 1), 'facts_kept': len(index),
+        'seconds': round(best, 5), 'mib_per_second': round(len(document) / 1048576 / best, 2),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def _git_commit():
+    """Atomically returns the current git commit of the working tree, or None outside a checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(tickers=DEFAULT_TICKERS, workers=DEFAULT_WORKERS, large_facts=DEFAULT_LARGE_FACTS, repeats=DEFAULT_REPEATS, recordings=None, rate=None):
+    """
+    Runs every benchmark and returns the results as a JSON-serializable dict.
+
+    Args:
+        tickers (int): Synthetic companies to analyze; ignored with recordings.
+        workers (int): Batch worker threads.
+        large_facts (int): Extra facts in the large parse document.
+        repeats (int): Timed runs per parse benchmark.
+        recordings (str): Directory of recorded EDGAR responses to replay instead of synthetic ones.
+        rate (float): Requests per second to allow, None for unlimited.
+    """
+    routes, companies = load_recordings(recordings) if recordings else synthetic_recordings(tickers)
+    symbols = [row['ticker'] for row in companies.values()]
+    with open(FIXTURE_XBRL, 'rb') as f:
+        small = f.read()
+
+    with FixtureServer(routes) as server:
+        single = bench_single(server, companies, symbols, rate)
+        batch = bench_batch(server, companies, symbols, workers, rate)
+    return {
+        'commit': _git_commit(),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'config': {'tickers': len(symbols), 'workers': workers, 'large_facts': large_facts, 'repeats': repeats,
+                   'recordings': recordings, 'rate': rate},
+        'analyze_single': single,
+        'analyze_batch': batch,
+        'parse': {'small': bench_parse(small, repeats), 'large': bench_parse(large_filing(large_facts, small), repeats)},
+    }
+
+
+def _numeric_leaves(value, prefix=''):
+    """Atomically flattens nested dicts to {'a.b.c': number}."""
+    if isinstance(value, dict):
+        leaves = {}
+        for key, child in value.items():
+            leaves.update(_numeric_leaves(child, f"{prefix}.{key}" if prefix else key))
+        return leaves
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: value}
+    return {}
+
+
+def compare(baseline, current, threshold=COMPARE_THRESHOLD):
+    """
+    Lists the measurements that moved by more than `threshold` between two result sets.
+
+    Returns:
+        list: (name, baseline value, current value, relative change) tuples, largest change first.
+    """
+    before, after = _numeric_leaves(baseline), _numeric_leaves(current)
+    changes = []
+    for name in sorted(before.keys() & after.keys()):
+        if name.startswith('config.') or not before[name]:
+            continue
+        change = (after[name] - before[name]) / abs(before[name])
+        if abs(change) > threshold:
+            changes.append((name, before[name], after[name], change))
+    return sorted(changes, key=lambda row: -abs(row[3]))
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline against replayed EDGAR responses")
+    parser.add_argument("--tickers", type=int, default=DEFAULT_TICKERS, help=f"Synthetic companies to analyze (default: {DEFAULT_TICKERS})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help=f"Batch worker threads (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--large-facts", type=int, default=DEFAULT_LARGE_FACTS, help=f"Facts added for the large parse (default: {DEFAULT_LARGE_FACTS})")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help=f"Timed runs per parse benchmark (default: {DEFAULT_REPEATS})")
+    parser.add_argument("--recordings", help="Directory of recorded EDGAR responses mirroring URL paths")
+    parser.add_argument("--rate", type=float, default=None, help="Requests per second to allow (default: unlimited)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help=f"JSON results file (default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    results = run(args.tickers, args.workers, args.large_facts, args.repeats, args.recordings, args.rate)
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+    single, batch, parse = results['analyze_single'], results['analyze_batch'], results['parse']
+    print(f"single cold: {single['cold']['tickers_per_second']} tickers/s, p95 {single['cold']['latency']['p95_ms']} ms")
+    print(f"single warm: {single['warm']['tickers_per_second']} tickers/s")
+    print(f"batch x{batch['workers']}: {batch['tickers_per_second']} tickers/s")
+    for stage, summary in single['cold']['stages'].items():
+        print(f"  {stage}: {summary['mean_ms']} ms")
+    for size, summary in parse.items():
+        print(f"parse {size}: {summary['document_kib']} KiB in {summary['seconds']} s, peak {summary['peak_kib']} KiB")
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            changes = compare(json.load(f), results)
+        print(f"{len(changes)} measurements changed by more than {COMPARE_THRESHOLD:.0%} since {args.baseline}")
+        for name, before, after, change in changes:
+            print(f"  {name}: {before} -> {after} ({change:+.1%})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+import argparse
+import concurrent.futures
+import json
+import os
+import re
+import zipfile
+from company_facts import CompanyFactsStore, DEFAULT_STORE_DIR
+from filing_index import FilingIndex, DEFAULT_DB_PATH as DEFAULT_FILING_INDEX_PATH, instance_filenames
+from ticker_index import TickerIndex, DEFAULT_CACHE_FILE
+
+# Members per task handed to a worker; amortizes process round-trips over many small files
+DEFAULT_CHUNK_SIZE = 64
+# One document per company in both archives; submissions' CIK##########-submissions-###.json pages only extend the filing list
+CIK_MEMBER = re.compile(r'^CIK(\d{10})\.json$')
+
+# Archives opened by this worker process, reused across tasks
+_open_archives = {}
+
+
+def _archive(zip_path):
+    """Atomically returns this process's open ZipFile for a path."""
+    archive = _open_archives.get(zip_path)
+    if archive is None:
+        archive = _open_archives[zip_path] = zipfile.ZipFile(zip_path)
+    return archive
+
+
+def _read_member(zip_path, name):
+    """Atomically decompresses and parses one JSON member straight from the archive, without extracting it."""
+    with _archive(zip_path).open(name) as f:
+        return json.load(f)
+
+
+def _matching_members(zip_path, pattern):
+    """Atomically lists the archive members whose names match a pattern."""
+    with zipfile.ZipFile(zip_path) as archive:
+        return [name for name in archive.namelist() if pattern.match(os.path.basename(name))]
+
+
+def _parse_submissions(zip_path, names):
+    """
+    Worker task: reads submissions documents and returns their (cik, tickers, instance filenames) triples.
+
+    Unreadable members are reported and skipped so one bad file does not abort the import.
+    """
+    companies = []
+    for name in names:
+        try:
+            data = _read_member(zip_path, name)
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            print(f"Error reading {name} from {zip_path}: {e}")
+            continue
+        cik = CIK_MEMBER.match(os.path.basename(name)).group(1)
+        companies.append((cik, [ticker for ticker in data.get('tickers') or [] if ticker], instance_filenames(data)))
+    return companies
+
+
+def _store_company_facts(zip_path, names, store_dir):
+    """Worker task: converts companyfacts documents to the columnar store and returns the CIKs written."""
+    store = CompanyFactsStore(store_dir=store_dir, maxsize=1)
+    written = []
+    for name in names:
+        cik = CIK_MEMBER.match(os.path.basename(name)).group(1)
+        try:
+            store.save(cik, _read_member(zip_path, name))
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            print(f"Error importing {name} from {zip_path}: {e}")
+            continue
+        written.append(cik)
+    return written
+
+
+def _chunks(items, size):
+    """Atomically splits a list into consecutive chunks of at most `size` items."""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _run_parallel(task, zip_path, names, extra_args=(), workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Runs task(zip_path, chunk, *extra_args) for every chunk of member names on a process pool and yields each result."""
+    chunks = _chunks(names, chunk_size)
+    if not chunks:
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(task, zip_path, chunk, *extra_args) for chunk in chunks]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+
+def import_submissions(zip_path, index=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, filings=None):
+    """
+    Builds the ticker index and the 10-K filing index from SEC's bulk submissions.zip and saves them.
+
+    Args:
+        zip_path (str): Path to submissions.zip.
+        index (TickerIndex): Index to replace; defaults to one on the standard cache file.
+        workers (int): Worker processes; defaults to the number of CPUs.
+        chunk_size (int): Archive members per worker task.
+        filings (FilingIndex): Filing index to add each 10-K's instance filename to; defaults to the standard one.
+
+    Returns:
+        int: Number of tickers indexed.
+    """
+    index = index if index is not None else TickerIndex(cache_file=DEFAULT_CACHE_FILE)
+    filings = filings if filings is not None else FilingIndex(DEFAULT_FILING_INDEX_PATH)
+    names = _matching_members(zip_path, CIK_MEMBER)
+    companies = []
+    for chunk_result in _run_parallel(_parse_submissions, zip_path, names, workers=workers, chunk_size=chunk_size):
+        companies.extend(chunk_result)
+        filings.put_many((row for _, _, instances in chunk_result for row in instances), replace=False)
+
+    # Sort so the index is identical however the work was split across processes
+    rows = [(cik, ticker) for cik, tickers, _ in sorted(companies) for ticker in tickers]
+    index.replace({str(i): {'cik_str': int(cik), 'ticker': ticker} for i, (cik, ticker) in enumerate(rows)})
+    return len(rows)
+
+
+def import_company_facts(zip_path, store_dir=DEFAULT_STORE_DIR, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Converts every company in SEC's bulk companyfacts.zip into the columnar fact store.
+
+    Args:
+        zip_path (str): Path to companyfacts.zip.
+        store_dir (str): Directory of the CompanyFactsStore to populate.
+        workers (int): Worker processes; defaults to the number of CPUs.
+        chunk_size (int): Archive members per worker task.
+
+    Returns:
+        int: Number of companies written.
+    """
+    names = _matching_members(zip_path, CIK_MEMBER)
+    return sum(len(written) for written in _run_parallel(_store_company_facts, zip_path, names, (store_dir,), workers, chunk_size))
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Import SEC bulk EDGAR archives for offline analysis")
+    parser.add_argument("--submissions", help="Path to submissions.zip; builds the ticker index")
+    parser.add_argument("--companyfacts", help="Path to companyfacts.zip; builds the fact store")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: number of CPUs)")
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    if not args.submissions and not args.companyfacts:
+        print("Nothing to import: pass --submissions and/or --companyfacts")
+        return
+    if args.submissions:
+        print(f"Indexed {import_submissions(args.submissions, workers=args.workers)} tickers from {args.submissions}")
+    if args.companyfacts:
+        print(f"Stored facts for {import_company_facts(args.companyfacts, workers=args.workers)} companies from {args.companyfacts}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+import collections
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_DB_PATH = os.path.join('cache', 'analyses.sqlite3')
+# Analyses kept in process memory in front of the SQLite store
+DEFAULT_MAXSIZE = 256
+# After this long an entry is only served again once its 10-K is confirmed to still be the newest
+DEFAULT_TTL = 24 * 60 * 60
+
+# One cached analysis: the metrics computed from a ticker's 10-K with the given accession number
+CacheEntry = collections.namedtuple('CacheEntry', ['ticker', 'accession_number', 'metrics', 'stored_at'])
+
+
+class SQLiteStore:
+    """
+    Durable store of analyses in a single SQLite file, keyed by ticker and accession number.
+
+    Each write is one transaction, so readers in other threads or processes see
+    either the previous analysis or the new one, never a partial row.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._connection = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """Atomically opens the database, reopening it in a forked child, and creates the schema on first use."""
+        # A connection inherited across fork must not be used, or closed, by the child
+        if self._connection is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            # Readers in other worker processes proceed while one process writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS analyses ("
+                    " ticker TEXT NOT NULL,"
+                    " accession_number TEXT NOT NULL,"
+                    " metrics TEXT NOT NULL,"
+                    " stored_at REAL NOT NULL,"
+                    " PRIMARY KEY (ticker, accession_number))"
+                )
+                connection.execute("CREATE INDEX IF NOT EXISTS analyses_stored_at ON analyses (stored_at)")
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def _row_to_entry(self, row):
+        """Atomically converts a database row into a CacheEntry."""
+        if row is None:
+            return None
+        ticker, accession_number, metrics, stored_at = row
+        return CacheEntry(ticker, accession_number, json.loads(metrics), stored_at)
+
+    def get(self, ticker):
+        """Atomically returns the most recently stored entry for a ticker, or None."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT ticker, accession_number, metrics, stored_at FROM analyses"
+                " WHERE ticker = ? ORDER BY stored_at DESC LIMIT 1", (ticker,)
+            ).fetchone()
+        return self._row_to_entry(row)
+
+    def get_filing(self, ticker, accession_number):
+        """Atomically returns the entry for one filing of a ticker, or None."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT ticker, accession_number, metrics, stored_at FROM analyses"
+                " WHERE ticker = ? AND accession_number = ?", (ticker, accession_number)
+            ).fetchone()
+        return self._row_to_entry(row)
+
+    def put(self, entry):
+        """Atomically stores an entry, replacing every older filing's entry for the same ticker."""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM analyses WHERE ticker = ? AND accession_number != ?", (entry.ticker, entry.accession_number))
+                connection.execute(
+                    "INSERT OR REPLACE INTO analyses (ticker, accession_number, metrics, stored_at) VALUES (?, ?, ?, ?)",
+                    (entry.ticker, entry.accession_number, json.dumps(entry.metrics), entry.stored_at)
+                )
+
+    def touch(self, ticker, accession_number, stored_at):
+        """Atomically restarts the TTL of a filing's entry."""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("UPDATE analyses SET stored_at = ? WHERE ticker = ? AND accession_number = ?", (stored_at, ticker, accession_number))
+
+    def delete(self, ticker):
+        """Atomically removes every entry for a ticker."""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM analyses WHERE ticker = ?", (ticker,))
+
+    def tickers(self):
+        """Atomically returns every ticker with a stored analysis, sorted."""
+        with self._lock:
+            rows = self._connect().execute("SELECT DISTINCT ticker FROM analyses ORDER BY ticker").fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        """Atomically closes the database connection."""
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+
+
+class LRUCache:
+    """Thread-safe in-process mapping that evicts the least recently used key beyond `maxsize`."""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Atomically returns the value for a key and marks it recently used, or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """Atomically stores a value, evicting the least recently used keys if full."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        """Atomically removes a key if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class TieredCache:
+    """
+    Analysis cache with an in-process LRU in front of a durable store.
+
+    An entry is served directly for `ttl` seconds. After that the caller must
+    look up the ticker's newest 10-K and call get_filing(); if the accession
+    number is unchanged the entry is renewed, otherwise the new analysis is
+    put() and replaces only that ticker's entries.
+
+    Any store with SQLiteStore's get/get_filing/put/touch/delete methods can be
+    plugged in.
+    """
+
+    def __init__(self, store=None, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+        self.store = store if store is not None else SQLiteStore()
+        self.memory = LRUCache(maxsize)
+        self.ttl = ttl
+        self._stats = collections.Counter()
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name):
+        """Atomically increments a hit/miss counter."""
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        """Atomically returns the hit and miss counters as a dict."""
+        with self._stats_lock:
+            return {name: self._stats[name] for name in ('memory_hits', 'store_hits', 'revalidated', 'stale', 'misses')}
+
+    def _lookup(self, ticker):
+        """Atomically returns the newest entry for a ticker from memory or the store, and which tier held it."""
+        entry = self.memory.get(ticker)
+        if entry is not None:
+            return entry, 'memory_hits'
+        entry = self.store.get(ticker)
+        if entry is not None:
+            self.memory.put(ticker, entry)
+        return entry, 'store_hits'
+
+    def get(self, ticker):
+        """
+        Returns the cached metrics for a ticker if they are younger than the TTL.
+
+        Returns:
+            dict: The metrics, or None on a miss or an expired entry.
+        """
+        ticker = ticker.upper()
+        entry, tier = self._lookup(ticker)
+        if entry is None:
+            self._count('misses')
+            return None
+        if time.time() - entry.stored_at >= self.ttl:
+            self._count('stale')
+            return None
+        self._count(tier)
+        return entry.metrics
+
+    def get_filing(self, ticker, accession_number):
+        """
+        Returns the cached metrics for a specific filing regardless of age, renewing its TTL.
+
+        Returns:
+            dict: The metrics, or None if that filing has not been analyzed.
+        """
+        ticker = ticker.upper()
+        entry, _ = self._lookup(ticker)
+        if entry is None or entry.accession_number != accession_number:
+            entry = self.store.get_filing(ticker, accession_number)
+        if entry is None:
+            self._count('misses')
+            return None
+        entry = entry._replace(stored_at=time.time())
+        self.store.touch(ticker, accession_number, entry.stored_at)
+        self.memory.put(ticker, entry)
+        self._count('revalidated')
+        return entry.metrics
+
+    def put(self, ticker, accession_number, metrics):
+        """Atomically stores the metrics for a ticker's filing, replacing its older filings."""
+        entry = CacheEntry(ticker.upper(), accession_number or '', metrics, time.time())
+        self.store.put(entry)
+        self.memory.put(entry.ticker, entry)
+
+    def invalidate(self, ticker):
+        """Atomically drops every cached analysis for a ticker."""
+        ticker = ticker.upper()
+        self.store.delete(ticker)
+        self.memory.pop(ticker)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_analysis_cache():
+    """Atomically returns the process-wide TieredCache, creating it on first use."""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = TieredCache()
+    return _default_cache
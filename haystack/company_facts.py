@@ -0,0 +1,372 @@
+import os
+import threading
+import time
+import numpy as np
+import xbrl_facts
+from cache_backend import LRUCache
+
+COMPANY_FACTS_URL = "https://data.sec.gov/api/xbrl/companyfacts/CIK{cik}.json"
+DEFAULT_STORE_DIR = os.path.join('cache', 'companyfacts')
+# SEC rebuilds companyfacts as filings arrive; a day old is recent enough for trends
+DEFAULT_TTL = 24 * 60 * 60
+# Companies whose columns are kept decoded in memory
+DEFAULT_MAXSIZE = 64
+# Days a duration must span to count as a full fiscal year (52/53-week years included)
+ANNUAL_MIN_DAYS = 350
+ANNUAL_MAX_DAYS = 380
+
+# Concepts tried in order; filers moved between them over the years
+REVENUE_CONCEPTS = (
+    'us-gaap:RevenueFromContractWithCustomerExcludingAssessedTax',
+    'us-gaap:Revenues',
+    'us-gaap:SalesRevenueNet',
+)
+NET_INCOME_CONCEPTS = ('us-gaap:NetIncomeLoss',)
+OPERATING_INCOME_CONCEPTS = ('us-gaap:OperatingIncomeLoss',)
+
+_NOT_A_DATE = np.datetime64('NaT', 'D')
+
+
+def _to_date(value):
+    """Atomically converts an ISO date string to a datetime64[D], or NaT."""
+    try:
+        return np.datetime64(value, 'D') if value else _NOT_A_DATE
+    except ValueError:
+        return _NOT_A_DATE
+
+
+def build_columns(company_facts):
+    """
+    Flattens an EDGAR companyfacts document into parallel NumPy columns.
+
+    Args:
+        company_facts (dict): The parsed CIK##########.json document.
+
+    Returns:
+        dict: Arrays of equal length ('concept', 'unit', 'form', 'start', 'end',
+        'filed', 'value', 'fy', 'fp', 'accn') plus the lookup tables
+        'concept_names', 'unit_names' and 'form_names' the integer codes index into.
+    """
+    concept_names = []
+    unit_codes, form_codes = {}, {}
+    rows = {name: [] for name in ('concept', 'unit', 'form', 'start', 'end', 'filed', 'value', 'fy', 'fp', 'accn')}
+
+    for taxonomy, concepts in (company_facts.get('facts') or {}).items():
+        for concept, details in concepts.items():
+            concept_code = len(concept_names)
+            concept_names.append(f"{taxonomy}:{concept}")
+            for unit, entries in (details.get('units') or {}).items():
+                unit_code = unit_codes.setdefault(unit, len(unit_codes))
+                for entry in entries:
+                    value = entry.get('val')
+                    if not isinstance(value, (int, float)):
+                        continue
+                    form = entry.get('form') or ''
+                    rows['concept'].append(concept_code)
+                    rows['unit'].append(unit_code)
+                    rows['form'].append(form_codes.setdefault(form, len(form_codes)))
+                    rows['start'].append(_to_date(entry.get('start')))
+                    rows['end'].append(_to_date(entry.get('end')))
+                    rows['filed'].append(_to_date(entry.get('filed')))
+                    rows['value'].append(value)
+                    rows['fy'].append(entry.get('fy') or 0)
+                    rows['fp'].append(entry.get('fp') or '')
+                    rows['accn'].append(entry.get('accn') or '')
+    unit_names = sorted(unit_codes, key=unit_codes.get)
+    form_names = sorted(form_codes, key=form_codes.get)
+
+    return {
+        'concept': np.array(rows['concept'], dtype=np.int32),
+        'unit': np.array(rows['unit'], dtype=np.int16),
+        'form': np.array(rows['form'], dtype=np.int16),
+        'start': np.array(rows['start'], dtype='datetime64[D]'),
+        'end': np.array(rows['end'], dtype='datetime64[D]'),
+        'filed': np.array(rows['filed'], dtype='datetime64[D]'),
+        'value': np.array(rows['value'], dtype=np.float64),
+        'fy': np.array(rows['fy'], dtype=np.int16),
+        'fp': np.array(rows['fp'], dtype='U2'),
+        'accn': np.array(rows['accn'], dtype='U20'),
+        'concept_names': np.array(concept_names, dtype=str),
+        'unit_names': np.array(unit_names, dtype=str),
+        'form_names': np.array(form_names, dtype=str),
+        'entity_name': np.array(company_facts.get('entityName') or ''),
+    }
+
+
+class CompanyFacts:
+    """
+    Every reported XBRL value of one company, held as NumPy columns.
+
+    Series are selected with vectorized masks over the columns, so a multi-year
+    history costs a few array operations rather than one filing download per year.
+    """
+
+    def __init__(self, cik, columns):
+        self.cik = cik
+        self.columns = columns
+        self.entity_name = str(columns['entity_name'])
+        self._concept_codes = {name: code for code, name in enumerate(columns['concept_names'].tolist())}
+        self._annual_forms = np.isin(columns['form_names'], ['10-K', '10-K/A', '20-F', '40-F'])
+
+    def __len__(self):
+        return len(self.columns['value'])
+
+    def annual_series(self, concepts, unit='USD'):
+        """
+        Returns one value per fiscal year for the first of `concepts` reported that year.
+
+        Only full-year durations (or, for balances, instants) from annual reports
+        are used; when a period was reported more than once, the latest filing wins.
+
+        Args:
+            concepts (Iterable[str]): Prefixed concept names in order of preference.
+            unit (str): Unit of measure, e.g. 'USD'.
+
+        Returns:
+            tuple: (period ends as datetime64[D] array, values as float64 array), oldest first.
+        """
+        columns = self.columns
+        unit_codes = np.flatnonzero(columns['unit_names'] == unit)
+        if not len(unit_codes) or not len(self):
+            return np.array([], dtype='datetime64[D]'), np.array([], dtype=np.float64)
+
+        days = (columns['end'] - columns['start']).astype('timedelta64[D]').astype(np.float64)
+        full_year = np.isnat(columns['start']) | ((days >= ANNUAL_MIN_DAYS) & (days <= ANNUAL_MAX_DAYS))
+        base = (columns['unit'] == unit_codes[0]) & self._annual_forms[columns['form']] & full_year & ~np.isnat(columns['end'])
+
+        ends, values = [], []
+        for priority, concept in enumerate(concepts):
+            code = self._concept_codes.get(concept)
+            if code is None:
+                continue
+            rows = np.flatnonzero(base & (columns['concept'] == code))
+            if not len(rows):
+                continue
+            # Latest filing last, so the last row of each period end is the one to keep
+            rows = rows[np.lexsort((columns['filed'][rows], columns['end'][rows]))]
+            period_ends = columns['end'][rows]
+            last = np.append(period_ends[1:] != period_ends[:-1], True)
+            ends.append(period_ends[last])
+            values.append(np.column_stack((columns['value'][rows][last], np.full(last.sum(), priority))))
+
+        if not ends:
+            return np.array([], dtype='datetime64[D]'), np.array([], dtype=np.float64)
+        ends = np.concatenate(ends)
+        values = np.concatenate(values)
+        # Per period end keep the most preferred concept
+        order = np.lexsort((values[:, 1], ends))
+        ends, values = ends[order], values[order, 0]
+        first = np.insert(ends[1:] != ends[:-1], 0, True)
+        return ends[first], values[first]
+
+
+    def latest_annual_accession(self):
+        """Atomically returns the accession number of the most recently filed annual report, or None."""
+        columns = self.columns
+        rows = np.flatnonzero(self._annual_forms[columns['form']] & (columns['accn'] != '') & ~np.isnat(columns['filed']))
+        if not len(rows):
+            return None
+        return str(columns['accn'][rows[np.argmax(columns['filed'][rows])]])
+
+    def filing_fact_index(self, accession_number=None):
+        """
+        Rebuilds the FactIndex of one filing from the stored columns, so metrics
+        can be computed exactly as for a downloaded XBRL document.
+
+        Args:
+            accession_number (str): The filing; defaults to the latest annual report.
+
+        Returns:
+            tuple: (FactIndex, accession number), or (None, None) if the filing is not stored.
+        """
+        accession_number = accession_number or self.latest_annual_accession()
+        if accession_number is None:
+            return None, None
+        columns = self.columns
+        rows = np.flatnonzero(columns['accn'] == accession_number)
+        if not len(rows):
+            return None, None
+
+        index = xbrl_facts.FactIndex()
+        period_end = None
+        for row in rows:
+            start, end = columns['start'][row], columns['end'][row]
+            if np.isnat(end):
+                continue
+            concept = str(columns['concept_names'][columns['concept'][row]])
+            if np.isnat(start):
+                context = xbrl_facts.Context(str(end), None, None, str(end), ())
+            else:
+                context = xbrl_facts.Context(f"{start}--{end}", str(start), str(end), None, ())
+            index.contexts.setdefault(context.id, context)
+            value = np.format_float_positional(columns['value'][row], trim='-')
+            index.add(xbrl_facts.Fact(concept, value, context, str(columns['unit_names'][columns['unit'][row]]), None))
+            # Cover page facts such as shares outstanding are dated after the fiscal year
+            if not concept.startswith('dei:') and (period_end is None or end > period_end):
+                period_end = end
+
+        # companyfacts omits the text cover page facts the metrics read
+        cover = xbrl_facts.Context('cover', None, None, None, ())
+        if period_end is not None:
+            index.add(xbrl_facts.Fact('dei:DocumentPeriodEndDate', str(period_end), cover, None, None))
+        if self.entity_name:
+            index.add(xbrl_facts.Fact('dei:EntityRegistrantName', self.entity_name, cover, None, None))
+        return index, accession_number
+
+
+class CompanyFactsStore:
+    """
+    On-disk store of CompanyFacts as one compressed .npz file per CIK, with an LRU of decoded companies.
+    """
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR, ttl=DEFAULT_TTL, maxsize=DEFAULT_MAXSIZE):
+        self.store_dir = store_dir
+        self.ttl = ttl
+        self.memory = LRUCache(maxsize)
+
+    def _path(self, cik):
+        """Atomically returns the .npz path for a CIK."""
+        return os.path.join(self.store_dir, f"CIK{cik}.npz")
+
+    def is_fresh(self, cik):
+        """Atomically reports whether a CIK is stored and younger than the TTL."""
+        try:
+            return time.time() - os.path.getmtime(self._path(cik)) < self.ttl
+        except OSError:
+            return False
+
+    def save(self, cik, company_facts):
+        """
+        Converts a companyfacts document to columns and writes them atomically.
+
+        Returns:
+            CompanyFacts: The stored company.
+        """
+        columns = build_columns(company_facts)
+        os.makedirs(self.store_dir, exist_ok=True)
+        path = self._path(cik)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.savez_compressed(f, **columns)
+        os.replace(temp_path, path)
+        facts = CompanyFacts(cik, columns)
+        self.memory.put(cik, facts)
+        return facts
+
+    def load(self, cik):
+        """Atomically returns the stored CompanyFacts for a CIK regardless of age, or None."""
+        facts = self.memory.get(cik)
+        if facts is not None:
+            return facts
+        try:
+            with np.load(self._path(cik), allow_pickle=False) as data:
+                columns = {name: data[name] for name in data.files}
+        except (OSError, ValueError) as e:
+            if os.path.exists(self._path(cik)):
+                print(f"Error loading company facts for CIK {cik}: {e}")
+            return None
+        facts = CompanyFacts(cik, columns)
+        self.memory.put(cik, facts)
+        return facts
+
+    def get(self, cik, fetch_json):
+        """
+        Returns a company's facts, downloading companyfacts only if the stored copy is missing or stale.
+
+        Args:
+            cik (str): The zero-padded CIK.
+            fetch_json (callable): fetch_json(url) -> parsed JSON or None, e.g. EdgarScraper._fetch_json.
+
+        Returns:
+            tuple: (CompanyFacts, error) where exactly one of the two is None.
+        """
+        if self.is_fresh(cik):
+            facts = self.load(cik)
+            if facts is not None:
+                return facts, None
+
+        data = fetch_json(COMPANY_FACTS_URL.format(cik=cik))
+        if data is None:
+            # A stale copy beats no answer
+            facts = self.load(cik)
+            if facts is not None:
+                return facts, None
+            return None, f"Error fetching company facts for CIK {cik}"
+        return self.save(cik, data), None
+
+
+def _growth_rate(first, last, years):
+    """Atomically returns the compound annual growth rate in percent, or None if undefined."""
+    if years <= 0 or first is None or last is None or first <= 0 or last <= 0:
+        return None
+    return round(((last / first) ** (1 / years) - 1) * 100, 2)
+
+
+def trend_metrics(facts, years=5):
+    """
+    Computes multi-year revenue, income and margin history for a company.
+
+    Args:
+        facts (CompanyFacts): The company's stored facts.
+        years (int): Number of most recent fiscal years to include.
+
+    Returns:
+        dict: Per-year 'history' rows (oldest first) plus 'revenue_cagr' and
+        'net_income_cagr' in percent over the years covered.
+    """
+    revenue_ends, revenue = facts.annual_series(REVENUE_CONCEPTS)
+    net_income_ends, net_income = facts.annual_series(NET_INCOME_CONCEPTS)
+    operating_ends, operating_income = facts.annual_series(OPERATING_INCOME_CONCEPTS)
+
+    period_ends = np.union1d(revenue_ends, net_income_ends)[-years:]
+
+    def aligned(ends, values):
+        # Values for each selected period end, NaN where the company did not report one
+        result = np.full(len(period_ends), np.nan)
+        if len(ends):
+            positions = np.minimum(np.searchsorted(ends, period_ends), len(ends) - 1)
+            found = ends[positions] == period_ends
+            result[found] = values[positions[found]]
+        return result
+
+    revenue = aligned(revenue_ends, revenue)
+    net_income = aligned(net_income_ends, net_income)
+    operating_income = aligned(operating_ends, operating_income)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        profit_margin = np.round(net_income / revenue * 100, 2)
+        operating_margin = np.round(operating_income / revenue * 100, 2)
+
+    def optional(value):
+        return None if np.isnan(value) or np.isinf(value) else float(value)
+
+    history = [
+        {
+            'fiscal_year_end': str(period_ends[i]),
+            'revenue': optional(revenue[i]),
+            'net_income': optional(net_income[i]),
+            'operating_income': optional(operating_income[i]),
+            'profit_margin': optional(profit_margin[i]),
+            'operating_margin': optional(operating_margin[i]),
+        }
+        for i in range(len(period_ends))
+    ]
+    span = len(period_ends) - 1
+    return {
+        'company_name': facts.entity_name,
+        'history': history,
+        'revenue_cagr': _growth_rate(optional(revenue[0]), optional(revenue[-1]), span) if span > 0 else None,
+        'net_income_cagr': _growth_rate(optional(net_income[0]), optional(net_income[-1]), span) if span > 0 else None,
+    }
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+def get_company_facts_store():
+    """Atomically returns the process-wide CompanyFactsStore, creating it on first use."""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = CompanyFactsStore()
+    return _default_store
@@ -0,0 +1,142 @@
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Smaller bodies fit in a packet either way; compressing them only costs CPU
+MIN_SIZE = 1024
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/html', 'text/plain', 'text/css', 'application/javascript')
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def available_encodings():
+    """Atomically lists the encodings this process can produce, most preferred first."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encodings):
+    """
+    Picks the content coding for a response.
+
+    Args:
+        accept_encodings (werkzeug.datastructures.Accept): The request's parsed Accept-Encoding header.
+
+    Returns:
+        str: 'br', 'gzip', or None to send the body uncompressed.
+    """
+    best, best_quality = None, 0
+    for encoding in available_encodings():
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def strip_encoding(etag):
+    """Atomically splits an entity tag into the tag of the uncompressed body and the coding compress_response appended, or None."""
+    for encoding in ('br', 'gzip'):
+        if etag.endswith(f"-{encoding}"):
+            return etag[:-len(encoding) - 1], encoding
+    return etag, None
+
+
+def matching_etag(if_none_match, etag):
+    """
+    Finds the If-None-Match tag that names a representation of `etag`.
+
+    Codings are stripped before comparing, and the tag is returned as the client sent
+    it, so a 304 can carry the same validator as the representation the client stored.
+
+    Args:
+        if_none_match (werkzeug.datastructures.ETags): The request's parsed If-None-Match header.
+        etag (str): The current tag of the uncompressed body.
+
+    Returns:
+        str: The matching tag, or None if the client holds no current representation.
+    """
+    if if_none_match.star_tag:
+        return etag
+    return next((tag for tag in if_none_match.as_set(include_weak=True) if strip_encoding(tag)[0] == etag), None)
+
+
+def compress(data, encoding):
+    """Atomically compresses a whole body with the given content coding."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def _compressor(encoding):
+    """Atomically returns (process, flush, finish) callables of an incremental compressor."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return compressor.process, compressor.flush, compressor.finish
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def compress_stream(chunks, encoding):
+    """
+    Compresses a streamed body chunk by chunk.
+
+    Each chunk is flushed as soon as it is compressed, so a client reading an
+    NDJSON stream still receives every line as it is produced.
+
+    Yields:
+        bytes: Compressed output.
+    """
+    process, flush, finish = _compressor(encoding)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            output = process(chunk) + flush()
+            if output:
+                yield output
+        yield finish()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def compress_response(response, accept_encodings, min_size=MIN_SIZE):
+    """
+    Compresses a Flask response in place when the client accepts gzip or br.
+
+    Streamed responses are compressed incrementally; buffered ones only above
+    `min_size` bytes. A strong ETag gets the coding appended, because the
+    compressed bytes are a different representation.
+
+    Returns:
+        flask.Response: The same response object.
+    """
+    # Files sent straight from disk may be served as byte ranges; leave them alone
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES or response.direct_passthrough:
+        return response
+    response.vary.add('Accept-Encoding')
+    if response.status_code < 200 or response.status_code in (204, 304) or 'Content-Encoding' in response.headers:
+        return response
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{encoding}")
+    return response
@@ -0,0 +1,158 @@
+import os
+import sqlite3
+import threading
+
+DEFAULT_DB_PATH = os.path.join('cache', 'filings.sqlite3')
+# Files in a filing folder that end in .xml but are not the instance document
+LINKBASE_SUFFIXES = ('_cal.xml', '_def.xml', '_lab.xml', '_pre.xml')
+NON_INSTANCE_FILES = ('FilingSummary.xml',)
+# Inline XBRL filings since 2019 ship the extracted instance as <primary document stem>_htm.xml
+INLINE_INSTANCE_SUFFIX = '_htm.xml'
+
+
+def choose_instance_filename(names):
+    """
+    Picks the XBRL instance document among the files of a filing.
+
+    Schemas, linkbases and the filing summary are skipped; an extracted inline
+    instance (*_htm.xml) is preferred over any other remaining .xml file.
+
+    Args:
+        names (Iterable[str]): File names from the filing's index.json.
+
+    Returns:
+        str: The instance file name, or None if the filing has none.
+    """
+    candidates = [
+        name for name in names
+        if name.lower().endswith('.xml') and not name.lower().endswith(LINKBASE_SUFFIXES) and name not in NON_INSTANCE_FILES
+    ]
+    inline = [name for name in candidates if name.lower().endswith(INLINE_INSTANCE_SUFFIX)]
+    return (inline or candidates or [None])[0]
+
+
+def instance_filenames(submissions, forms=('10-K',)):
+    """
+    Derives instance filenames from a submissions document without fetching any filing index.
+
+    Only inline XBRL filings can be resolved this way; their instance name follows
+    from the primary document. Other filings are left out.
+
+    Args:
+        submissions (dict): A data.sec.gov submissions document.
+        forms (tuple): Form types to include.
+
+    Returns:
+        list: (accession number without dashes, form, filename) tuples.
+    """
+    recent = submissions.get('filings', {}).get('recent', {})
+    accession_numbers = recent.get('accessionNumber', [])
+    form_types = recent.get('form', [])
+    primary_documents = recent.get('primaryDocument', [])
+    inline_flags = recent.get('isInlineXBRL', [])
+    rows = []
+    for accession_number, form_type, primary_document, is_inline in zip(accession_numbers, form_types, primary_documents, inline_flags):
+        if form_type not in forms or not is_inline or not primary_document.lower().endswith('.htm'):
+            continue
+        rows.append((accession_number.replace('-', ''), form_type, primary_document[:-len('.htm')] + INLINE_INSTANCE_SUFFIX))
+    return rows
+
+
+class FilingIndex:
+    """
+    Persistent map of filing accession number to the filename of its XBRL instance document.
+
+    Filled from submissions documents as they are fetched, from bulk submissions
+    imports, and from a filing's index.json only when neither could resolve it.
+    Filings never change once accepted, so entries never expire; a derived name is
+    only replaced when its document turns out to be missing and index.json says otherwise.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._connection = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """Atomically opens the database, reopening it in a forked child, and creates the schema on first use."""
+        # A connection inherited across fork must not be used, or closed, by the child
+        if self._connection is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            # Readers in other worker processes proceed while one process writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS filings ("
+                    " accession_number TEXT PRIMARY KEY,"
+                    " form TEXT NOT NULL,"
+                    " filename TEXT NOT NULL)"
+                )
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def get(self, accession_number):
+        """Atomically returns the instance filename of a filing, or None if it is not indexed."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT filename FROM filings WHERE accession_number = ?", (accession_number.replace('-', ''),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_many(self, rows, replace=True):
+        """
+        Atomically stores (accession number, form, filename) rows in one transaction.
+
+        Args:
+            rows (Iterable[tuple]): (accession number, form, filename) rows.
+            replace (bool): Overwrite existing entries; pass False for names derived from
+                submissions, so they never undo a correction made from a filing's index.json.
+
+        Returns:
+            int: Number of rows given.
+        """
+        rows = [(accession_number.replace('-', ''), form, filename) for accession_number, form, filename in rows]
+        if not rows:
+            return 0
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany(f"{verb} INTO filings (accession_number, form, filename) VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def put(self, accession_number, form, filename):
+        """Atomically stores one filing's instance filename, replacing any earlier entry."""
+        self.put_many([(accession_number, form, filename)])
+
+    def record_submissions(self, submissions, forms=('10-K',)):
+        """Atomically indexes every filing of a submissions document whose instance can be derived from it."""
+        return self.put_many(instance_filenames(submissions, forms), replace=False)
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM filings").fetchone()[0]
+
+    def close(self):
+        """Atomically closes the database connection."""
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+def get_filing_index():
+    """Atomically returns the process-wide FilingIndex, creating it on first use."""
+    global _default_index
+    if _default_index is None:
+        with _default_index_lock:
+            if _default_index is None:
+                _default_index = FilingIndex()
+    return _default_index
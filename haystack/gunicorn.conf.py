@@ -0,0 +1,20 @@
+import multiprocessing
+import os
+
+# Serve wsgi.application; run from the haystack directory so cache/ is shared by every worker
+wsgi_app = 'wsgi:application'
+bind = os.environ.get('HAYSTACK_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('HAYSTACK_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+# Threads per worker, so streamed batches and requests queued on the rate limit do not block a whole process
+worker_class = 'gthread'
+threads = int(os.environ.get('HAYSTACK_THREADS', 4))
+# Import the app, and warm the ticker index, once in the master before forking
+preload_app = True
+# A cold analysis may queue up to RATE_LIMIT_TIMEOUT seconds for the shared SEC budget
+timeout = 120
+graceful_timeout = 30
+
+
+def post_fork(server, worker):
+    import wsgi
+    wsgi.start_background_tasks()
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import threading
+import requests
+import requests.adapters
+import requests.structures
+import urllib3.util.retry
+
+DEFAULT_CACHE_DIR = os.path.join('cache', 'http')
+# Enough connections per host for every batch worker plus headroom for the prefetcher
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 16
+# Connect and read timeouts in seconds
+REQUEST_TIMEOUT = (5, 30)
+
+
+def create_session(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=3):
+    """
+    Creates a requests.Session with keep-alive connection pools and connect retries.
+
+    Only failed connection attempts are retried: they never reach the server, so they
+    cost no rate limit tokens. Responses such as 429s are returned to the caller, whose
+    next attempt goes through the rate limiter like any other request.
+
+    Args:
+        pool_connections (int): Number of host pools to keep.
+        pool_maxsize (int): Connections kept alive per host.
+        max_retries (int): Retries for connection errors.
+
+    Returns:
+        requests.Session: The configured session.
+    """
+    retry = urllib3.util.retry.Retry(total=max_retries, connect=max_retries, read=0, status=0, other=0, backoff_factor=0.5)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    # requests decodes gzip/deflate bodies transparently; ask for them explicitly
+    session.headers['Accept-Encoding'] = 'gzip, deflate'
+    return session
+
+
+class ValidatorCache:
+    """
+    On-disk store of response bodies and their ETag/Last-Modified validators, keyed by URL.
+
+    Used to turn repeat requests into conditional GETs whose 304 responses are
+    answered from the stored body.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _path(self, url, suffix):
+        """Atomically returns the file path for a URL's metadata or body."""
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.{suffix}")
+
+    def conditional_headers(self, url):
+        """Atomically returns If-None-Match/If-Modified-Since headers for a cached URL, or {}."""
+        meta = self._load_meta(url)
+        if meta is None or not os.path.exists(self._path(url, 'body')):
+            return {}
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def _load_meta(self, url):
+        """Atomically loads the stored validators for a URL, or None."""
+        try:
+            with open(self._path(url, 'json'), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load_body(self, url):
+        """Atomically returns the stored body and headers for a URL as (bytes, dict), or (None, None)."""
+        meta = self._load_meta(url)
+        if meta is None:
+            return None, None
+        try:
+            with open(self._path(url, 'body'), 'rb') as f:
+                return f.read(), meta.get('headers', {})
+        except OSError:
+            return None, None
+
+    def load_response(self, url):
+        """Atomically rebuilds a 200 response from the stored body, or returns None."""
+        body, headers = self.load_body(url)
+        if body is None:
+            return None
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers = requests.structures.CaseInsensitiveDict(headers)
+        response._content = body
+        return response
+
+    def store(self, url, response):
+        """Atomically saves a requests response if it carries an ETag or Last-Modified validator."""
+        self.store_body(url, response.headers, response.content)
+
+    def store_body(self, url, headers, body):
+        """
+        Saves a response body if its headers carry an ETag or Last-Modified validator.
+
+        Args:
+            url (str): The requested URL.
+            headers (Mapping): Case-insensitive response headers.
+            body (bytes): The decoded response body.
+        """
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        meta = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'headers': {'Content-Type': headers.get('Content-Type', '')}
+        }
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._write_atomic(self._path(url, 'body'), body, 'wb')
+            self._write_atomic(self._path(url, 'json'), json.dumps(meta), 'w')
+        except OSError as e:
+            print(f"Error caching response for {url}: {e}")
+
+    def _write_atomic(self, path, data, mode):
+        """Atomically writes a file via a uniquely named temporary file."""
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, mode) as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+
+_default_session = None
+_default_validator_cache = None
+_defaults_lock = threading.Lock()
+
+def _forget_session_after_fork():
+    """Drops the parent's session in a forked child, whose pooled sockets it must not share."""
+    global _default_session, _defaults_lock
+    _default_session = None
+    _defaults_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_forget_session_after_fork)
+
+def get_session():
+    """Atomically returns the process-wide pooled session, creating it on first use."""
+    global _default_session
+    if _default_session is None:
+        with _defaults_lock:
+            if _default_session is None:
+                _default_session = create_session()
+    return _default_session
+
+def get_validator_cache():
+    """Atomically returns the process-wide ValidatorCache, creating it on first use."""
+    global _default_validator_cache
+    if _default_validator_cache is None:
+        with _defaults_lock:
+            if _default_validator_cache is None:
+                _default_validator_cache = ValidatorCache()
+    return _default_validator_cache
@@ -0,0 +1,191 @@
+import bisect
+import collections
+import contextlib
+import threading
+import time
+
+# Upper bounds in seconds; SEC round trips are tens of milliseconds, a large XBRL instance several seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# A value read from elsewhere (e.g. cache statistics) when the metrics are rendered
+Sample = collections.namedtuple('Sample', ['name', 'kind', 'help', 'labels', 'value'])
+
+
+def _format_labels(labels):
+    """Atomically formats a sorted label tuple as {name="value",...}, or '' without labels."""
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def _format_value(value):
+    """Atomically formats a sample value the way Prometheus expects."""
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values for one label set."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """Atomically adds one observation; callers hold the registry lock."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Atomically returns (upper bound, cumulative count) pairs ending with +Inf."""
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+
+class MetricsRegistry:
+    """
+    Thread-safe counters and latency histograms rendered in the Prometheus text format.
+
+    Metrics are declared once with describe() and then updated by name with a
+    dict of labels. Collectors contribute values owned by other components,
+    such as cache hit counts, at render time.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._descriptions = collections.OrderedDict()
+        self._counters = collections.defaultdict(dict)
+        self._histograms = collections.defaultdict(dict)
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def describe(self, name, kind, help_text):
+        """Atomically declares a metric; kind is 'counter' or 'histogram'."""
+        self._descriptions[name] = (kind, help_text)
+
+    def register_collector(self, collector):
+        """Atomically adds a callable returning Samples to include in every render."""
+        self._collectors.append(collector)
+
+    def increment(self, name, labels=None, amount=1):
+        """Atomically adds to a counter."""
+        key = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name, value, labels=None):
+        """Atomically records one observation in a histogram."""
+        key = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            histogram = self._histograms[name].get(key)
+            if histogram is None:
+                histogram = self._histograms[name][key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def counter_value(self, name, labels=None):
+        """Atomically returns a counter's current value, 0 if never incremented."""
+        with self._lock:
+            return self._counters[name].get(tuple(sorted((labels or {}).items())), 0)
+
+    def histogram_count(self, name, labels=None):
+        """Atomically returns the number of observations in a histogram."""
+        with self._lock:
+            histogram = self._histograms[name].get(tuple(sorted((labels or {}).items())))
+            return histogram.count if histogram is not None else 0
+
+    def histogram_totals(self, name):
+        """Atomically returns {label tuple: (count, sum)} for every series of a histogram."""
+        with self._lock:
+            return {key: (histogram.count, histogram.sum) for key, histogram in self._histograms[name].items()}
+
+    @contextlib.contextmanager
+    def span(self, name, **labels):
+        """Times the enclosed block, including when it raises, into the named histogram."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, labels)
+
+    def _collected(self):
+        """Groups the collectors' samples by metric name, skipping collectors that fail."""
+        grouped = collections.OrderedDict()
+        for collector in self._collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                print(f"Error collecting metrics from {collector}: {e}")
+                continue
+            for sample in samples:
+                grouped.setdefault(sample.name, []).append(sample)
+        return grouped
+
+    def render(self):
+        """
+        Renders every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition text, ending with a newline.
+        """
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in self._descriptions.items():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                if kind == 'histogram':
+                    for key, histogram in sorted(self._histograms[name].items()):
+                        for bound, count in histogram.cumulative():
+                            lines.append(f'{name}_bucket{_format_labels(key + (("le", _format_value(bound)),))} {count}')
+                        lines.append(f'{name}_sum{_format_labels(key)} {_format_value(histogram.sum)}')
+                        lines.append(f'{name}_count{_format_labels(key)} {histogram.count}')
+                else:
+                    for key, value in sorted(self._counters[name].items()):
+                        lines.append(f'{name}{_format_labels(key)} {_format_value(value)}')
+        for name, samples in self._collected().items():
+            lines.append(f'# HELP {name} {samples[0].help}')
+            lines.append(f'# TYPE {name} {samples[0].kind}')
+            for sample in samples:
+                lines.append(f'{name}{_format_labels(tuple(sorted((sample.labels or {}).items())))} {_format_value(sample.value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class TimedIterator:
+    """Wraps an iterator and accumulates the seconds spent waiting for its items, e.g. network reads."""
+
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self.seconds = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            return next(self._iterator)
+        finally:
+            self.seconds += time.perf_counter() - started
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+def get_metrics():
+    """Atomically returns the process-wide MetricsRegistry, creating it on first use."""
+    global _default_registry
+    if _default_registry is None:
+        with _default_registry_lock:
+            if _default_registry is None:
+                _default_registry = MetricsRegistry()
+    return _default_registry
@@ -0,0 +1,145 @@
+import collections
+import numpy as np
+import pandas as pd
+
+# A derived metric: `formula` maps the columns computed so far to the metric's values. It gets a DataFrame
+# when many companies are evaluated and a dict of one company's values otherwise, and reads either via column()
+Metric = collections.namedtuple('Metric', ['name', 'formula', 'digits'])
+
+
+class MetricRegistry:
+    """
+    Ordered set of derived metrics evaluated as column operations over a table of companies.
+
+    Missing inputs are NaN, so a metric whose inputs are missing is missing too;
+    division by zero also yields a missing value. Metrics may use any metric
+    registered before them.
+    """
+
+    def __init__(self):
+        self._metrics = collections.OrderedDict()
+
+    def __iter__(self):
+        return iter(self._metrics.values())
+
+    def __contains__(self, name):
+        return name in self._metrics
+
+    def names(self):
+        """Atomically returns the metric names in evaluation order."""
+        return list(self._metrics)
+
+    def register(self, name, formula, digits=2):
+        """
+        Adds a metric, replacing any metric of the same name.
+
+        Args:
+            name (str): Output column name.
+            formula (callable): formula(frame) -> pandas.Series, or a NumPy scalar for a single-company row.
+            digits (int): Decimal places to round to, or None to leave unrounded.
+        """
+        self._metrics[name] = Metric(name, formula, digits)
+
+    def evaluate_frame(self, frame):
+        """
+        Computes every metric for every row of a table.
+
+        Args:
+            frame (pandas.DataFrame): One row per company; input columns may hold None.
+
+        Returns:
+            pandas.DataFrame: A copy of the input with one float column added per metric.
+        """
+        frame = frame.copy()
+        for metric in self:
+            values = pd.to_numeric(metric.formula(frame), errors='coerce').astype(np.float64)
+            values = values.replace([np.inf, -np.inf], np.nan)
+            frame[metric.name] = values.round(metric.digits) if metric.digits is not None else values
+        return frame
+
+    def evaluate(self, inputs):
+        """
+        Computes every metric for a single company.
+
+        Args:
+            inputs (dict): Input values, None where unknown.
+
+        Returns:
+            dict: The inputs plus every metric, with None for missing values.
+        """
+        # One company is evaluated on NumPy scalars; a DataFrame costs milliseconds to build per call
+        row = dict(inputs)
+        result = dict(inputs)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for metric in self:
+                value = np.float64(metric.formula(row))
+                if np.isinf(value):
+                    value = np.float64(np.nan)
+                row[metric.name] = value.round(metric.digits) if metric.digits is not None else value
+                result[metric.name] = None if np.isnan(row[metric.name]) else float(row[metric.name])
+        return result
+
+
+def column(frame, name, missing=np.nan):
+    """
+    Atomically returns a column as floats, with `missing` wherever a value is absent or not numeric.
+
+    For a single-company row (a dict) the column is a NumPy float scalar.
+    """
+    if isinstance(frame, dict):
+        value = frame.get(name)
+        try:
+            value = np.float64(np.nan if value is None else value)
+        except (TypeError, ValueError):
+            value = np.float64(np.nan)
+        return np.float64(missing) if np.isnan(value) else value
+    if name not in frame:
+        return pd.Series(missing, index=frame.index, dtype=np.float64)
+    values = pd.to_numeric(frame[name], errors='coerce').astype(np.float64)
+    return values if np.isnan(missing) else values.fillna(missing)
+
+
+def ratio(numerator, denominator, scale=1):
+    """Atomically builds a formula for column ratio numerator / denominator * scale."""
+    return lambda frame: column(frame, numerator) / column(frame, denominator) * scale
+
+
+def per_share(name, shares='shares_outstanding'):
+    """Atomically builds a formula for a column divided by shares outstanding."""
+    return ratio(name, shares)
+
+
+# Columns every 10-K analysis reports a per-share value for
+PER_SHARE_INPUTS = ('net_income', 'equity', 'total_assets', 'revenue', 'cash_and_equivalents',
+                    'total_liabilities', 'long_term_debt', 'fcf')
+
+FINANCIAL_METRICS = MetricRegistry()
+FINANCIAL_METRICS.register('equity', lambda frame: column(frame, 'total_assets') - column(frame, 'total_liabilities'), digits=None)
+FINANCIAL_METRICS.register('profit_margin', ratio('net_income', 'revenue', scale=100))
+FINANCIAL_METRICS.register('return_on_assets', ratio('net_income', 'total_assets', scale=100))
+FINANCIAL_METRICS.register('return_on_equity', ratio('net_income', 'equity', scale=100))
+FINANCIAL_METRICS.register('debt_to_assets_ratio', ratio('total_liabilities', 'total_assets'))
+for _name in PER_SHARE_INPUTS:
+    FINANCIAL_METRICS.register(f'{_name}_per_share', per_share(_name))
+# Filers without intangibles simply omit the tag, so a missing value counts as zero
+FINANCIAL_METRICS.register('net_tangible_assets_per_share', lambda frame: (
+    column(frame, 'total_assets') - column(frame, 'intangible_assets', missing=0) - column(frame, 'total_liabilities')
+) / column(frame, 'shares_outstanding'))
+
+
+def evaluate(inputs, registry=FINANCIAL_METRICS):
+    """Atomically computes the derived metrics for one company's extracted values."""
+    return registry.evaluate(inputs)
+
+
+def screen(companies, registry=FINANCIAL_METRICS):
+    """
+    Computes the derived metrics for many companies in one vectorized pass.
+
+    Args:
+        companies (Iterable[dict]): Extracted values per company, e.g. cached analyses.
+
+    Returns:
+        pandas.DataFrame: One row per company with every metric column.
+    """
+    return registry.evaluate_frame(pd.DataFrame.from_records(list(companies)))
@@ -0,0 +1,142 @@
+import argparse
+import collections
+import os
+import threading
+import app
+from rate_limiter import TokenBucket
+
+# Comma-separated tickers to keep warm, e.g. HAYSTACK_WATCHLIST=AAPL,MSFT,GOOG
+WATCHLIST_ENV = 'HAYSTACK_WATCHLIST'
+# Seconds between polls of the watchlist's submissions feeds
+DEFAULT_INTERVAL = 15 * 60
+# Each ticker costs up to three SEC requests; one ticker a second leaves most of the budget to users
+DEFAULT_TICKERS_PER_SECOND = 1
+
+
+def parse_watchlist(text):
+    """Atomically splits a comma- or whitespace-separated ticker list into normalized tickers."""
+    return app._normalize_tickers((text or '').replace(',', ' ').split())
+
+
+class Prefetcher:
+    """
+    Background worker that keeps the analyses of a watchlist cached.
+
+    Every `interval` seconds each ticker's submissions feed is revalidated (a 304
+    when nothing changed) and the ticker is re-analyzed only if a new 10-K has
+    appeared, so user requests for watched tickers are cache hits. Tickers are
+    paced by a private token bucket on top of the shared SEC rate limiter.
+
+    Usage:
+        prefetcher = Prefetcher(["AAPL", "MSFT"])
+        prefetcher.start()
+    """
+
+    def __init__(self, tickers, interval=DEFAULT_INTERVAL, tickers_per_second=DEFAULT_TICKERS_PER_SECOND, scraper=None):
+        self.tickers = app._normalize_tickers(tickers)
+        self.interval = interval
+        self.scraper = scraper
+        self._pace = TokenBucket(tickers_per_second, capacity=1)
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = collections.Counter()
+        self.errors = {}
+
+    def is_running(self):
+        """Atomically reports whether the background thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def run_once(self):
+        """
+        Refreshes every watched ticker once, in order.
+
+        Returns:
+            int: Number of tickers refreshed without error; stops early if stop() is called.
+        """
+        scraper = self.scraper or app.EdgarScraper()
+        refreshed = 0
+        for ticker in self.tickers:
+            wait = self._pace.wait_time()
+            if wait and self._stop.wait(wait):
+                break
+            self._pace.consume()
+            try:
+                metrics, error = app.refresh_ticker(ticker, scraper=scraper)
+            except Exception as e:
+                metrics, error = None, f"Error refreshing {ticker}: {str(e)}"
+            if error:
+                print(f"Prefetch of {ticker} failed: {error}")
+                self.errors[ticker] = error
+                self.stats['errors'] += 1
+            else:
+                self.errors.pop(ticker, None)
+                self.stats['refreshed'] += 1
+                refreshed += 1
+        self.stats['passes'] += 1
+        return refreshed
+
+    def _run(self):
+        """Polls the watchlist until stopped."""
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Atomically starts the background thread if it is not already running."""
+        if self.is_running() or not self.tickers:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='haystack-prefetch', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Atomically signals the background thread to stop and waits for it."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+_default_prefetcher = None
+
+def start_from_environment(interval=DEFAULT_INTERVAL):
+    """
+    Starts a background Prefetcher for the tickers in $HAYSTACK_WATCHLIST.
+
+    Returns:
+        Prefetcher: The running prefetcher, or None if no watchlist is configured.
+    """
+    global _default_prefetcher
+    tickers = parse_watchlist(os.environ.get(WATCHLIST_ENV))
+    if not tickers:
+        return None
+    if _default_prefetcher is None:
+        _default_prefetcher = Prefetcher(tickers, interval=interval)
+        _default_prefetcher.start()
+    return _default_prefetcher
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Keep cached 10-K analyses of a watchlist up to date")
+    parser.add_argument("tickers", nargs="*", help=f"Ticker symbols to watch (default: ${WATCHLIST_ENV})")
+    parser.add_argument("--interval", type=int, default=DEFAULT_INTERVAL, help=f"Seconds between polls (default: {DEFAULT_INTERVAL})")
+    parser.add_argument("--once", action="store_true", help="Refresh every ticker once and exit")
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    tickers = args.tickers or parse_watchlist(os.environ.get(WATCHLIST_ENV))
+    if not tickers:
+        print(f"No tickers to watch: pass them as arguments or set ${WATCHLIST_ENV}")
+        return
+    prefetcher = Prefetcher(tickers, interval=args.interval)
+    if args.once:
+        print(f"Refreshed {prefetcher.run_once()} of {len(prefetcher.tickers)} tickers")
+        return
+    try:
+        prefetcher._run()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
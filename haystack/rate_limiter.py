@@ -0,0 +1,254 @@
+import asyncio
+import collections
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+
+# SEC fair-use policy: no more than 10 requests per second across all of its hosts
+SEC_REQUESTS_PER_SECOND = 10
+# Shortfalls smaller than this are float residue from refilling, not a real wait
+TOKEN_EPSILON = 1e-9
+# Set to a database path to share one budget between every process on the host, e.g. preforked workers
+SHARED_DB_ENV = 'HAYSTACK_RATE_LIMIT_DB'
+DEFAULT_SHARED_DB_PATH = os.path.join('cache', 'rate_limit.sqlite3')
+
+
+class TokenBucket:
+    """
+    Token bucket holding up to `capacity` tokens, refilled continuously at `rate` tokens per second.
+
+    Not thread-safe on its own; RateLimiter serializes access to its buckets.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+        self.rate = float(rate)
+        # By default a bucket bursts one second's worth of requests, and always at least one
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        if self.capacity < 1:
+            raise ValueError("Capacity must allow at least one token")
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now):
+        """Atomically adds the tokens accrued since the last update."""
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+
+    def wait_time(self, tokens=1, now=None):
+        """Atomically returns the seconds until `tokens` are available, 0.0 if they are now."""
+        self._refill(time.monotonic() if now is None else now)
+        if self.tokens + TOKEN_EPSILON >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    def consume(self, tokens=1):
+        """Atomically removes tokens; callers check wait_time first."""
+        self.tokens -= tokens
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter that charges every request to a global bucket and to its host's bucket.
+
+    Each check is O(1): buckets store a token count and a timestamp, never a request log.
+    """
+
+    def __init__(self, global_rate=SEC_REQUESTS_PER_SECOND, global_capacity=None, host_rates=None, default_host_rate=None):
+        """
+        Args:
+            global_rate (float): Requests per second allowed across all hosts.
+            global_capacity (float): Burst size of the global bucket, defaults to global_rate.
+            host_rates (dict): Requests per second for specific hosts.
+            default_host_rate (float): Requests per second for any other host, defaults to global_rate.
+        """
+        self.global_bucket = TokenBucket(global_rate, global_capacity)
+        self.host_rates = dict(host_rates or {})
+        self.default_host_rate = default_host_rate or global_rate
+        self.host_buckets = {}
+        self._lock = threading.Lock()
+        self._stats = collections.Counter()
+
+    def _host_bucket(self, host):
+        """Atomically returns the bucket for a host, creating it on first use."""
+        bucket = self.host_buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(self.host_rates.get(host, self.default_host_rate))
+            self.host_buckets[host] = bucket
+        return bucket
+
+    def try_acquire(self, url, tokens=1):
+        """
+        Takes tokens for a request if both the global and the host bucket can afford it.
+
+        Args:
+            url (str): The URL being requested.
+            tokens (int): Number of tokens the request costs.
+
+        Returns:
+            float: 0.0 if the request may proceed, otherwise the seconds to wait before retrying.
+        """
+        host = urllib.parse.urlsplit(url).hostname or ''
+        with self._lock:
+            now = time.monotonic()
+            buckets = (self.global_bucket, self._host_bucket(host))
+            wait = max(bucket.wait_time(tokens, now) for bucket in buckets)
+            if wait == 0:
+                for bucket in buckets:
+                    bucket.consume(tokens)
+            return wait
+
+    def _record(self, waited, acquired):
+        """Atomically counts one acquire() call that had to wait or gave up."""
+        with self._lock:
+            if waited:
+                self._stats['waits'] += 1
+                self._stats['wait_seconds'] += waited
+            if not acquired:
+                self._stats['timeouts'] += 1
+
+    def stats(self):
+        """Atomically returns how many acquires waited, for how long in total, and how many timed out."""
+        with self._lock:
+            return {'waits': self._stats['waits'], 'wait_seconds': float(self._stats['wait_seconds']), 'timeouts': self._stats['timeouts']}
+
+    def acquire(self, url, timeout=None, tokens=1):
+        """
+        Blocks until a request for the URL fits within the rate limits.
+
+        Args:
+            url (str): The URL being requested.
+            timeout (float): Maximum seconds to wait, or None to wait indefinitely.
+            tokens (int): Number of tokens the request costs.
+
+        Returns:
+            bool: True if the request may proceed, False if it would exceed the timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(url, tokens)
+            if wait == 0:
+                self._record(waited, True)
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                self._record(waited, False)
+                return False
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, url, timeout=None, tokens=1):
+        """
+        Waits without blocking the event loop until a request for the URL fits within the rate limits.
+
+        Shares its buckets with acquire(), so threads and coroutines draw from one budget.
+
+        Returns:
+            bool: True if the request may proceed, False if it would exceed the timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(url, tokens)
+            if wait == 0:
+                self._record(waited, True)
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                self._record(waited, False)
+                return False
+            await asyncio.sleep(wait)
+            waited += wait
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    RateLimiter whose bucket levels live in a SQLite file, so every process using the file shares one budget.
+
+    Each check is one short write transaction; the buckets in memory only hold
+    rates and capacities and are reloaded from the file under its lock.
+    """
+
+    def __init__(self, db_path=DEFAULT_SHARED_DB_PATH, **kwargs):
+        super().__init__(**kwargs)
+        self.db_path = db_path
+        self._connection = None
+        self._pid = None
+
+    def _connect(self):
+        """Atomically opens the database, reopening it in a forked child, and creates the schema on first use."""
+        if self._connection is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Autocommit mode: try_acquire issues its own BEGIN IMMEDIATE
+            connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)")
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def try_acquire(self, url, tokens=1):
+        """
+        Takes tokens for a request if both the shared global and host bucket can afford it.
+
+        Returns:
+            float: 0.0 if the request may proceed, otherwise the seconds to wait before retrying.
+        """
+        host = urllib.parse.urlsplit(url).hostname or ''
+        with self._lock:
+            connection = self._connect()
+            buckets = {'global': self.global_bucket, f'host:{host}': self._host_bucket(host)}
+            # Wall-clock time, since monotonic clocks are not comparable between processes
+            now = time.time()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = dict((key, (level, updated_at)) for key, level, updated_at in connection.execute(
+                    "SELECT key, tokens, updated_at FROM buckets WHERE key IN (?, ?)", tuple(buckets)
+                ))
+                for key, bucket in buckets.items():
+                    bucket.tokens, bucket.updated_at = rows.get(key, (bucket.capacity, now))
+                wait = max(bucket.wait_time(tokens, now) for bucket in buckets.values())
+                if wait == 0:
+                    for bucket in buckets.values():
+                        bucket.consume(tokens)
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                        [(key, bucket.tokens, bucket.updated_at) for key, bucket in buckets.items()]
+                    )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            return wait
+
+    def close(self):
+        """Atomically closes the database connection."""
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+
+
+_default_limiter = None
+_default_limiter_lock = threading.Lock()
+
+def get_rate_limiter():
+    """
+    Atomically returns the process-wide RateLimiter, creating it on first use.
+
+    If $HAYSTACK_RATE_LIMIT_DB names a database file, the limiter is a SharedRateLimiter
+    on that file, so all processes configured the same way stay within one SEC budget.
+    """
+    global _default_limiter
+    if _default_limiter is None:
+        with _default_limiter_lock:
+            if _default_limiter is None:
+                db_path = os.environ.get(SHARED_DB_ENV)
+                _default_limiter = SharedRateLimiter(db_path) if db_path else RateLimiter()
+    return _default_limiter
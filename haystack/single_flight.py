@@ -0,0 +1,139 @@
+import asyncio
+import threading
+
+
+class _Call:
+    """One in-flight execution and the outcome every waiter will receive."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # (loop, future) for each coroutine waiting on this call, woken from whichever thread finishes it
+        self.waiters = []
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    in flight block and receive the same return value or exception. Once it
+    finishes the key is released, so later calls run the function again.
+
+    Threads calling do() and coroutines calling do_async() share the same keys,
+    so a coroutine can wait on a thread's execution and vice versa.
+
+    Usage:
+        flight = SingleFlight()
+        metrics = flight.do("AAPL", analyze, "AAPL")
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        # Calls answered by another caller's execution
+        self.coalesced = 0
+
+    def in_flight(self, key):
+        """Atomically reports whether a call for the key is currently running."""
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Runs fn(*args, **kwargs) unless a call for the key is already running, in which case waits for it.
+
+        Args:
+            key (Hashable): Identifies calls that may share a result.
+            fn (callable): The function to run.
+
+        Returns:
+            The return value of the one execution for this key.
+
+        Raises:
+            Exception: Whatever the shared execution raised.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            self._finish(key, call)
+        return call.result
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        """
+        Coroutine counterpart of do(): awaits fn(*args, **kwargs) unless a call for the key is already running.
+
+        Waiting never blocks the event loop, whether the running call is a coroutine or a thread.
+
+        Args:
+            key (Hashable): Identifies calls that may share a result.
+            fn (callable): The coroutine function to run.
+
+        Returns:
+            The return value of the one execution for this key.
+
+        Raises:
+            Exception: Whatever the shared execution raised.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+                waiter = loop.create_future()
+                call.waiters.append((loop, waiter))
+
+        if not leader:
+            await waiter
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = await fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            self._finish(key, call)
+        return call.result
+
+    def _finish(self, key, call):
+        """Atomically releases the key and wakes every thread and coroutine waiting on the call."""
+        with self._lock:
+            del self._calls[key]
+            waiters = call.waiters
+        call.done.set()
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                # The waiter's event loop has already closed
+                pass
+
+
+def _wake(waiter):
+    """Resolves a coroutine's wait future unless it was cancelled meanwhile."""
+    if not waiter.done():
+        waiter.set_result(None)
@@ -0,0 +1,210 @@
+import unittest
+import asyncio
+import http.server
+import json
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import time
+from unittest.mock import AsyncMock, patch
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import async_scraper
+import filing_index
+import http_session
+import rate_limiter
+import ticker_index
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'aapl-20220924_htm.xml')
+with open(FIXTURE_PATH, 'rb') as fixture:
+    SAMPLE_XBRL = fixture.read()
+
+
+class StubEdgarHandler(http.server.BaseHTTPRequestHandler):
+    """Serves canned submissions, filing index and XBRL documents keyed by path"""
+    protocol_version = 'HTTP/1.1'
+    routes = {
+        "/submissions/CIK0000320193.json": {
+            "filings": {"recent": {"form": ["8-K", "10-K"], "accessionNumber": ["0000320193-22-000107", "0000320193-22-000108"]}}
+        },
+        "/Archives/edgar/data/320193/000032019322000108/index.json": {
+            "directory": {"item": [{"name": "aapl-20220924.htm"}, {"name": "aapl-20220924_htm.xml"}]}
+        },
+        "/Archives/edgar/data/320193/000032019322000108/aapl-20220924_htm.xml": SAMPLE_XBRL,
+        "/submissions/CIK0000789019.json": {
+            "filings": {"recent": {"form": ["10-K"], "accessionNumber": ["0000950170-22-015345"],
+                                   "primaryDocument": ["msft-20220630.htm"], "isInlineXBRL": [1]}}
+        },
+        # An inline filing whose instance does not follow the <primary document>_htm.xml convention
+        "/submissions/CIK0000000002.json": {
+            "filings": {"recent": {"form": ["10-K"], "accessionNumber": ["0000000002-23-000001"],
+                                   "primaryDocument": ["abc-20230930.htm"], "isInlineXBRL": [1]}}
+        },
+        "/Archives/edgar/data/2/000000000223000001/index.json": {
+            "directory": {"item": [{"name": "abc-20230930.htm"}, {"name": "abc-20230930.xml"}]}
+        },
+        "/Archives/edgar/data/2/000000000223000001/abc-20230930.xml": SAMPLE_XBRL
+    }
+
+    def do_GET(self):
+        self.server.requests.append({'path': self.path, 'headers': dict(self.headers)})
+        document = self.routes.get(self.path)
+        if document is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        etag = f'"{hash(self.path)}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = document if isinstance(document, bytes) else json.dumps(document).encode('utf-8')
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestAsyncEdgarScraper(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the asyncio EDGAR client against a local stub server"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Start the stub server once for all tests"""
+        cls.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StubEdgarHandler)
+        cls.server.requests = []
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.root = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the stub server"""
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    async def asyncSetUp(self):
+        """Set up a scraper pointed at the stub server with isolated caches"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.server.requests.clear()
+        self.index = ticker_index.TickerIndex(cache_file=os.path.join(self.temp_dir, "company_tickers.json"))
+        self.index.build({"0": {"cik_str": 320193, "ticker": "AAPL"}})
+        self.index.fetched_at = time.time()
+        self.scraper = async_scraper.AsyncEdgarScraper(
+            ticker_index=self.index,
+            validator_cache=http_session.ValidatorCache(cache_dir=os.path.join(self.temp_dir, "http")),
+            rate_limiter=rate_limiter.RateLimiter(global_rate=100),
+            filing_index=filing_index.FilingIndex(os.path.join(self.temp_dir, "filings.sqlite3"))
+        )
+        self.scraper.base_url = f"{self.root}/Archives"
+        self.scraper.submissions_url = f"{self.root}/submissions/CIK{{cik}}.json"
+        await self.scraper.__aenter__()
+
+    async def asyncTearDown(self):
+        """Close the session and clean up"""
+        await self.scraper.__aexit__(None, None, None)
+        self.scraper.filing_index.close()
+        shutil.rmtree(self.temp_dir)
+
+    async def test_search_company_uses_loaded_index(self):
+        """Test that a fresh index answers without any request"""
+        self.assertEqual(await self.scraper.search_company("aapl"), ("0000320193", None))
+        cik, error = await self.scraper.search_company("NONEXIST")
+        self.assertIsNone(cik)
+        self.assertIn("not found", error)
+        self.assertEqual(self.server.requests, [])
+
+    async def test_get_recent_10k_url(self):
+        """Test that the newest 10-K and its XBRL file are found"""
+        url, error = await self.scraper.get_recent_10k_url("0000320193")
+
+        self.assertIsNone(error)
+        self.assertEqual(url, f"{self.root}/Archives/edgar/data/320193/000032019322000108/aapl-20220924_htm.xml")
+
+    async def test_json_lookups_are_revalidated(self):
+        """Test that repeat lookups send the stored ETag and reuse the stored body and instance filename"""
+        first = await self.scraper.get_recent_10k_url("0000320193")
+        second = await self.scraper.get_recent_10k_url("0000320193")
+
+        self.assertEqual(first, second)
+        self.assertEqual([request['path'] for request in self.server.requests], [
+            "/submissions/CIK0000320193.json", "/Archives/edgar/data/320193/000032019322000108/index.json", "/submissions/CIK0000320193.json"
+        ])
+        self.assertIn('If-None-Match', self.server.requests[2]['headers'])
+
+    async def test_inline_filing_needs_no_index_json(self):
+        """Test that an inline XBRL 10-K's instance is derived from its primary document"""
+        url, error = await self.scraper.get_recent_10k_url("0000789019")
+
+        self.assertIsNone(error)
+        self.assertEqual(url, f"{self.root}/Archives/edgar/data/789019/000095017022015345/msft-20220630_htm.xml")
+        self.assertEqual([request['path'] for request in self.server.requests], ["/submissions/CIK0000789019.json"])
+
+    async def test_get_recent_10k_url_reports_missing_submissions(self):
+        """Test that a failed submissions fetch becomes an error result"""
+        url, error = await self.scraper.get_recent_10k_url("0000000001")
+
+        self.assertIsNone(url)
+        self.assertIn("Error fetching submission data", error)
+
+    async def test_extract_financial_data_streams_document(self):
+        """Test that the XBRL document is parsed as it streams in"""
+        xbrl_url = f"{self.root}/Archives/edgar/data/320193/000032019322000108/aapl-20220924_htm.xml"
+        with patch.object(self.scraper, 'XBRL_CHUNK_SIZE', 512):
+            metrics, error = await self.scraper.extract_financial_data(xbrl_url)
+
+        self.assertIsNone(error)
+        self.assertEqual(metrics["company_name"], "Apple Inc.")
+        self.assertEqual(metrics["fiscal_year_end"], "2022-09-24")
+
+    async def test_extract_financial_data_reports_missing_document(self):
+        """Test that a failed download becomes an error result"""
+        metrics, error = await self.scraper.extract_financial_data(f"{self.root}/Archives/missing.xml")
+
+        self.assertIsNone(metrics)
+        self.assertIn("Error extracting financial data", error)
+
+    async def test_wrong_derived_name_falls_back_to_index_json(self):
+        """Test that a 404 for a derived instance name is re-resolved from index.json and retried once"""
+        with patch('app.load_from_cache', return_value=None), patch('app.load_filing_from_cache', return_value=None), \
+                patch('app.save_to_cache'), patch.object(self.scraper, 'search_company', AsyncMock(return_value=("0000000002", None))):
+            metrics, error = await async_scraper.analyze_ticker("ABC", self.scraper)
+
+        self.assertIsNone(error)
+        self.assertEqual(metrics["company_name"], "Apple Inc.")
+        self.assertTrue(metrics["source_url"].endswith("/000000000223000001/abc-20230930.xml"))
+        self.assertEqual(self.scraper.filing_index.get("000000000223000001"), "abc-20230930.xml")
+        self.assertEqual([request['path'].rsplit('/', 1)[-1] for request in self.server.requests],
+                         ["CIK0000000002.json", "abc-20230930_htm.xml", "index.json", "abc-20230930.xml"])
+
+    async def test_analyze_tickers_bounds_concurrency(self):
+        """Test that no more than `concurrency` tickers are in flight at once"""
+        in_flight = []
+        peak = []
+
+        async def fake_analyze(ticker, scraper):
+            in_flight.append(ticker)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.05)
+            in_flight.remove(ticker)
+            return {"ticker": ticker}, None
+
+        with patch('async_scraper.analyze_ticker', side_effect=fake_analyze):
+            results = [result async for result in async_scraper.analyze_tickers(["A", "B", "C", "D", "E"], concurrency=2, scraper=self.scraper)]
+
+        self.assertEqual(sorted(ticker for ticker, _, _ in results), ["A", "B", "C", "D", "E"])
+        self.assertEqual(max(peak), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import json
+import os
+import sys
+import time
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+class TestBatchAnalysis(unittest.TestCase):
+    """Test cases for the batch analysis entry point and route"""
+
+    def setUp(self):
+        """Set up test environment before each test"""
+        app.app.config['TESTING'] = True
+        self.client = app.app.test_client()
+
+    def _fake_analyze(self, delay=0):
+        """Returns a stand-in for analyze_ticker that fails for BAD and succeeds otherwise"""
+        def fake(ticker, scraper=None):
+            time.sleep(delay)
+            if ticker == "BAD":
+                return None, f"Company with ticker {ticker} not found"
+            return {"ticker": ticker, "revenue": 100}, None
+        return fake
+
+    def test_analyze_tickers_yields_every_ticker_once(self):
+        """Test that duplicate and blank tickers are dropped and each ticker yields one result"""
+        with patch('app.analyze_ticker', side_effect=self._fake_analyze()):
+            results = list(app.analyze_tickers(["aapl", "MSFT ", "", "AAPL", "BAD"], max_workers=2))
+
+        self.assertEqual(sorted(ticker for ticker, _, _ in results), ["AAPL", "BAD", "MSFT"])
+        errors = {ticker: error for ticker, _, error in results}
+        self.assertIsNone(errors["AAPL"])
+        self.assertIn("not found", errors["BAD"])
+
+    def test_analyze_tickers_runs_concurrently(self):
+        """Test that wall-clock time tracks the slowest ticker rather than the sum"""
+        with patch('app.analyze_ticker', side_effect=self._fake_analyze(delay=0.2)):
+            start = time.time()
+            results = list(app.analyze_tickers(["A", "B", "C", "D"], max_workers=4))
+            elapsed = time.time() - start
+
+        self.assertEqual(len(results), 4)
+        self.assertLess(elapsed, 0.6)
+
+    def test_analyze_tickers_reports_worker_exceptions(self):
+        """Test that an exception in one ticker becomes an error result instead of aborting the batch"""
+        with patch('app.analyze_ticker', side_effect=RuntimeError("boom")):
+            results = list(app.analyze_tickers(["AAPL"]))
+
+        self.assertEqual(results, [("AAPL", None, "Error analyzing AAPL: boom")])
+
+    def test_closing_the_batch_cancels_pending_tickers(self):
+        """Test that a consumer stopping early leaves no queued tickers running"""
+        started = []
+
+        def slow(ticker, scraper=None):
+            started.append(ticker)
+            time.sleep(0.1)
+            return {"ticker": ticker}, None
+
+        with patch('app.analyze_ticker', side_effect=slow):
+            results = app.analyze_tickers([f"T{i}" for i in range(20)], max_workers=2, scraper=object())
+            next(results)
+            results.close()
+            time.sleep(0.3)
+
+        self.assertLessEqual(len(started), 4)
+
+    def test_batch_route_streams_ndjson(self):
+        """Test that the batch route returns one JSON document per line"""
+        with patch('app.analyze_ticker', side_effect=self._fake_analyze()):
+            response = self.client.post('/analyze/batch', json={"tickers": ["AAPL", "BAD"]})
+            lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        by_ticker = {line["ticker"]: line for line in lines}
+        self.assertEqual(by_ticker["AAPL"]["revenue"], 100)
+        self.assertIn("error", by_ticker["BAD"])
+
+    def test_batch_route_accepts_form_field(self):
+        """Test that a comma-separated form field is accepted"""
+        with patch('app.analyze_ticker', side_effect=self._fake_analyze()):
+            response = self.client.post('/analyze/batch', data={"tickers": "AAPL,MSFT"})
+            lines = response.get_data(as_text=True).splitlines()
+
+        self.assertEqual(len(lines), 2)
+
+    def test_batch_route_rejects_empty_list(self):
+        """Test that a batch without tickers is rejected"""
+        response = self.client.post('/analyze/batch', json={"tickers": []})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", response.get_json())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import json
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark
+import cache_backend
+import instrumentation
+import rate_limiter
+
+
+class TestBenchmark(unittest.TestCase):
+    """Test cases for the pipeline benchmark harness"""
+
+    def test_run_measures_every_scenario(self):
+        """Test that a small run analyzes every ticker without errors and reports each stage"""
+        saved = (cache_backend._default_cache, rate_limiter._default_limiter, instrumentation._default_registry)
+
+        results = benchmark.run(tickers=3, workers=2, large_facts=200, repeats=1)
+
+        self.assertEqual(saved, (cache_backend._default_cache, rate_limiter._default_limiter, instrumentation._default_registry))
+        json.dumps(results)
+        cold = results['analyze_single']['cold']
+        self.assertEqual(cold['errors'], 0)
+        # Synthetic filings are inline XBRL, so no index.json is ever needed
+        self.assertEqual(set(cold['stages']), {'ticker_lookup', 'submissions', 'xbrl_download', 'xbrl_parse', 'ratios'})
+        self.assertEqual(cold['stages']['xbrl_parse']['count'], 3)
+        self.assertEqual(results['analyze_single']['warm']['errors'], 0)
+        self.assertEqual(results['analyze_batch']['errors'], 0)
+        self.assertGreater(results['analyze_batch']['tickers_per_second'], 0)
+        self.assertGreater(results['parse']['large']['document_kib'], results['parse']['small']['document_kib'])
+        self.assertEqual(results['parse']['large']['facts_kept'], results['parse']['small']['facts_kept'])
+
+    def test_large_filing_adds_facts(self):
+        """Test that the padded document is still a valid instance with the extra facts"""
+        document = benchmark.large_filing(10)
+
+        self.assertEqual(document.count(b'BenchmarkFiller'), 20)
+        self.assertTrue(document.rstrip().endswith(b'</xbrli:xbrl>'))
+
+    def test_compare_reports_large_changes(self):
+        """Test that only measurements beyond the threshold are listed, largest first"""
+        baseline = {'config': {'tickers': 50}, 'batch': {'tickers_per_second': 100.0, 'seconds': 1.0}, 'parse': {'peak_kib': 500}}
+        current = {'config': {'tickers': 10}, 'batch': {'tickers_per_second': 80.0, 'seconds': 1.02}, 'parse': {'peak_kib': 1000}}
+
+        changes = benchmark.compare(baseline, current)
+
+        self.assertEqual([name for name, _, _, _ in changes], ['parse.peak_kib', 'batch.tickers_per_second'])
+        self.assertAlmostEqual(changes[1][3], -0.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+import unittest
+import json
+import os
+import sys
+import shutil
+import tempfile
+import zipfile
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+import bulk_import
+import cache_backend
+import company_facts
+import filing_index
+import ticker_index
+
+ACCESSION_2022 = "0000320193-22-000108"
+ACCESSION_2021 = "0000320193-21-000105"
+
+
+def _fact(value, end, accn, start=None, form="10-K", filed="2022-10-28"):
+    """Builds one companyfacts entry"""
+    entry = {"end": end, "val": value, "accn": accn, "fy": int(filed[:4]), "fp": "FY", "form": form, "filed": filed}
+    if start:
+        entry["start"] = start
+    return entry
+
+
+APPLE_FACTS = {
+    "cik": 320193,
+    "entityName": "Apple Inc.",
+    "facts": {
+        "dei": {"EntityCommonStockSharesOutstanding": {"units": {"shares": [
+            _fact(16406397000, "2021-10-15", ACCESSION_2021, filed="2021-10-29"),
+            _fact(15908118000, "2022-10-14", ACCESSION_2022),
+        ]}}},
+        "us-gaap": {
+            "RevenueFromContractWithCustomerExcludingAssessedTax": {"units": {"USD": [
+                _fact(365817000000, "2021-09-25", ACCESSION_2021, start="2020-09-27", filed="2021-10-29"),
+                _fact(365817000000, "2021-09-25", ACCESSION_2022, start="2020-09-27"),
+                _fact(394328000000, "2022-09-24", ACCESSION_2022, start="2021-09-26"),
+            ]}},
+            "NetIncomeLoss": {"units": {"USD": [
+                _fact(94680000000, "2021-09-25", ACCESSION_2022, start="2020-09-27"),
+                _fact(99803000000, "2022-09-24", ACCESSION_2022, start="2021-09-26"),
+            ]}},
+            "Assets": {"units": {"USD": [
+                _fact(351002000000, "2021-09-25", ACCESSION_2022),
+                _fact(352755000000, "2022-09-24", ACCESSION_2022),
+            ]}},
+            "Liabilities": {"units": {"USD": [
+                _fact(302083000000, "2022-09-24", ACCESSION_2022),
+            ]}},
+        }
+    }
+}
+
+MICROSOFT_FACTS = {
+    "cik": 789019,
+    "entityName": "MICROSOFT CORPORATION",
+    "facts": {"us-gaap": {"Revenues": {"units": {"USD": [
+        _fact(198270000000, "2022-06-30", "0000950170-22-015345", start="2021-07-01", filed="2022-07-28"),
+    ]}}}}
+}
+
+
+class TestBulkImport(unittest.TestCase):
+    """Test cases for importing synthetic bulk EDGAR archives"""
+
+    def setUp(self):
+        """Write small submissions.zip and companyfacts.zip archives"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.submissions_zip = os.path.join(self.temp_dir, "submissions.zip")
+        self.companyfacts_zip = os.path.join(self.temp_dir, "companyfacts.zip")
+        self.store_dir = os.path.join(self.temp_dir, "companyfacts")
+        self.index = ticker_index.TickerIndex(cache_file=os.path.join(self.temp_dir, "company_tickers.json"))
+        self.filings = filing_index.FilingIndex(os.path.join(self.temp_dir, "filings.sqlite3"))
+
+        with zipfile.ZipFile(self.submissions_zip, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("CIK0000320193.json", json.dumps({"cik": "320193", "name": "Apple Inc.", "tickers": ["AAPL"], "filings": {"recent": {
+                "accessionNumber": [ACCESSION_2022, "0000320193-22-000107"], "form": ["10-K", "8-K"],
+                "primaryDocument": ["aapl-20220924.htm", "aapl-20221027.htm"], "isInlineXBRL": [1, 1]
+            }}}))
+            archive.writestr("CIK0000320193-submissions-001.json", json.dumps({"accessionNumber": []}))
+            archive.writestr("CIK0000789019.json", json.dumps({"cik": "789019", "name": "MICROSOFT CORP", "tickers": ["MSFT"]}))
+            archive.writestr("CIK0001067983.json", json.dumps({"cik": "1067983", "name": "BERKSHIRE HATHAWAY INC", "tickers": ["BRK-B", "BRK-A"]}))
+            archive.writestr("CIK0000000001.json", "{not json")
+
+        with zipfile.ZipFile(self.companyfacts_zip, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("CIK0000320193.json", json.dumps(APPLE_FACTS))
+            archive.writestr("CIK0000789019.json", json.dumps(MICROSOFT_FACTS))
+
+    def tearDown(self):
+        """Clean up after each test"""
+        self.filings.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_import_submissions_builds_ticker_index(self):
+        """Test that every ticker of every company is indexed and saved, skipping bad members"""
+        count = bulk_import.import_submissions(self.submissions_zip, index=self.index, workers=2, chunk_size=1, filings=self.filings)
+
+        self.assertEqual(count, 4)
+        self.assertEqual(self.index.get_cik("BRK-A"), "0001067983")
+        self.assertEqual(self.index.get_ticker("1067983"), "BRK-B")
+        self.assertTrue(self.index.is_fresh())
+
+        reloaded = ticker_index.TickerIndex(cache_file=self.index.cache_file)
+        self.assertIsNone(reloaded.ensure_loaded(lambda url, headers: None))
+        self.assertEqual(reloaded.get_cik("MSFT"), "0000789019")
+        self.assertEqual(self.filings.get(ACCESSION_2022), "aapl-20220924_htm.xml")
+        self.assertEqual(len(self.filings), 1)
+
+    def test_import_company_facts_builds_store(self):
+        """Test that each company is converted to the columnar store across worker processes"""
+        count = bulk_import.import_company_facts(self.companyfacts_zip, store_dir=self.store_dir, workers=2, chunk_size=1)
+
+        store = company_facts.CompanyFactsStore(store_dir=self.store_dir)
+        self.assertEqual(count, 2)
+        self.assertEqual(store.load("0000789019").entity_name, "MICROSOFT CORPORATION")
+        self.assertEqual(len(store.load("0000320193")), 10)
+
+    def test_analyze_offline_after_import(self):
+        """Test that /analyze answers from the snapshot with no network access"""
+        bulk_import.import_submissions(self.submissions_zip, index=self.index, workers=1, filings=self.filings)
+        bulk_import.import_company_facts(self.companyfacts_zip, store_dir=self.store_dir, workers=1)
+        store = company_facts.CompanyFactsStore(store_dir=self.store_dir)
+        analysis_store = cache_backend.SQLiteStore(os.path.join(self.temp_dir, "analyses.sqlite3"))
+        client = app.app.test_client()
+
+        with patch('app.OFFLINE_MODE', True), \
+             patch('app.get_ticker_index', return_value=self.index), \
+             patch('app.get_company_facts_store', return_value=store), \
+             patch('app.get_analysis_cache', return_value=cache_backend.TieredCache(store=analysis_store)), \
+             patch('app.requests.Session.get', side_effect=AssertionError("network access")):
+            response = client.post('/analyze', data={'ticker': 'AAPL'})
+        analysis_store.close()
+
+        data = response.get_json()
+        self.assertEqual(data["company_name"], "Apple Inc.")
+        self.assertEqual(data["fiscal_year_end"], "2022-09-24")
+        self.assertEqual(data["revenue"], 394328000000)
+        self.assertEqual(data["total_assets"], 352755000000)
+        self.assertEqual(data["shares_outstanding"], 15908118000)
+        self.assertEqual(data["equity"], 50672000000)
+
+    def test_analyze_offline_reports_missing_company(self):
+        """Test that tickers without imported facts are errors rather than downloads"""
+        bulk_import.import_submissions(self.submissions_zip, index=self.index, workers=1, filings=self.filings)
+        store = company_facts.CompanyFactsStore(store_dir=self.store_dir)
+
+        metrics, error = app.analyze_ticker_offline("BRK-B", ticker_index=self.index, store=store)
+
+        self.assertIsNone(metrics)
+        self.assertIn("No offline company facts", error)
+
+
+if __name__ == '__main__':
+    unittest.main()
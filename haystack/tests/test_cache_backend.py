@@ -0,0 +1,187 @@
+import unittest
+import concurrent.futures
+import os
+import sys
+import shutil
+import tempfile
+import time
+from unittest.mock import patch, MagicMock
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+import cache_backend
+
+
+class TestSQLiteStore(unittest.TestCase):
+    """Test cases for the durable SQLite analysis store"""
+
+    def setUp(self):
+        """Set up test environment before each test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "nested", "analyses.sqlite3")
+        self.store = cache_backend.SQLiteStore(self.db_path)
+
+    def tearDown(self):
+        """Clean up after each test"""
+        self.store.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_round_trip_and_persistence(self):
+        """Test that entries survive reopening the database"""
+        self.store.put(cache_backend.CacheEntry("AAPL", "0001", {"revenue": 1}, 100.0))
+        self.store.close()
+
+        reopened = cache_backend.SQLiteStore(self.db_path)
+        self.assertEqual(reopened.get("AAPL"), cache_backend.CacheEntry("AAPL", "0001", {"revenue": 1}, 100.0))
+        self.assertEqual(reopened.tickers(), ["AAPL"])
+        reopened.close()
+
+    def test_new_filing_replaces_only_that_ticker(self):
+        """Test that storing a newer filing drops the ticker's older filings and nothing else"""
+        self.store.put(cache_backend.CacheEntry("AAPL", "0001", {"revenue": 1}, 100.0))
+        self.store.put(cache_backend.CacheEntry("MSFT", "0002", {"revenue": 2}, 100.0))
+        self.store.put(cache_backend.CacheEntry("AAPL", "0003", {"revenue": 3}, 200.0))
+
+        self.assertIsNone(self.store.get_filing("AAPL", "0001"))
+        self.assertEqual(self.store.get("AAPL").metrics, {"revenue": 3})
+        self.assertEqual(self.store.get("MSFT").metrics, {"revenue": 2})
+
+    def test_concurrent_writes(self):
+        """Test that writes from many threads all land intact"""
+        def write(i):
+            self.store.put(cache_backend.CacheEntry(f"T{i}", "0001", {"value": i}, time.time()))
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(write, range(50)))
+
+        self.assertEqual(len(self.store.tickers()), 50)
+        self.assertEqual(self.store.get("T7").metrics, {"value": 7})
+
+
+class TestLRUCache(unittest.TestCase):
+    """Test cases for the in-process LRU"""
+
+    def test_least_recently_used_is_evicted(self):
+        """Test that reads refresh recency and the oldest key is evicted"""
+        cache = cache_backend.LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 2)
+
+
+class TestTieredCache(unittest.TestCase):
+    """Test cases for the LRU-over-SQLite analysis cache"""
+
+    def setUp(self):
+        """Set up test environment before each test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = cache_backend.SQLiteStore(os.path.join(self.temp_dir, "analyses.sqlite3"))
+        self.cache = cache_backend.TieredCache(store=self.store, maxsize=8, ttl=60)
+
+    def tearDown(self):
+        """Clean up after each test"""
+        self.store.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_hits_and_misses_are_counted(self):
+        """Test that memory, store and miss lookups are counted separately"""
+        self.assertIsNone(self.cache.get("AAPL"))
+        self.cache.put("aapl", "0001", {"revenue": 1})
+        self.assertEqual(self.cache.get("AAPL"), {"revenue": 1})
+
+        fresh = cache_backend.TieredCache(store=self.store, ttl=60)
+        self.assertEqual(fresh.get("AAPL"), {"revenue": 1})
+        self.assertEqual(fresh.get("AAPL"), {"revenue": 1})
+
+        self.assertEqual(self.cache.stats()["misses"], 1)
+        self.assertEqual(self.cache.stats()["memory_hits"], 1)
+        self.assertEqual(fresh.stats()["store_hits"], 1)
+        self.assertEqual(fresh.stats()["memory_hits"], 1)
+
+    def test_expired_entry_is_renewed_for_same_filing(self):
+        """Test that an expired entry is served again once its filing is confirmed current"""
+        self.cache.put("AAPL", "0001", {"revenue": 1})
+        with patch('cache_backend.time.time', return_value=time.time() + 120):
+            self.assertIsNone(self.cache.get("AAPL"))
+            self.assertEqual(self.cache.get_filing("AAPL", "0001"), {"revenue": 1})
+            self.assertEqual(self.cache.get("AAPL"), {"revenue": 1})
+
+        self.assertEqual(self.cache.stats()["stale"], 1)
+        self.assertEqual(self.cache.stats()["revalidated"], 1)
+
+    def test_new_filing_is_a_miss(self):
+        """Test that a newer accession number is not answered from the old entry"""
+        self.cache.put("AAPL", "0001", {"revenue": 1})
+
+        self.assertIsNone(self.cache.get_filing("AAPL", "0002"))
+
+    def test_invalidate(self):
+        """Test that invalidation clears both tiers"""
+        self.cache.put("AAPL", "0001", {"revenue": 1})
+        self.cache.invalidate("aapl")
+
+        self.assertIsNone(self.cache.get("AAPL"))
+        self.assertIsNone(self.store.get("AAPL"))
+
+
+class TestAnalyzeTickerCaching(unittest.TestCase):
+    """Test cases for how analyze_ticker uses the tiered cache"""
+
+    def setUp(self):
+        """Set up test environment before each test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = cache_backend.SQLiteStore(os.path.join(self.temp_dir, "analyses.sqlite3"))
+        self.cache = cache_backend.TieredCache(store=self.store, ttl=60)
+        self.scraper = MagicMock()
+        self.scraper.search_company.return_value = ("0000320193", None)
+        self.scraper.get_recent_10k_url.return_value = (
+            "https://www.sec.gov/Archives/edgar/data/320193/000032019322000108/aapl-20220924_htm.xml", None
+        )
+        self.scraper.extract_financial_data.side_effect = lambda url: ({"revenue": 2}, None)
+
+    def tearDown(self):
+        """Clean up after each test"""
+        self.store.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_fresh_entry_skips_network(self):
+        """Test that an unexpired entry answers without touching the scraper"""
+        self.cache.put("AAPL", "000032019322000108", {"revenue": 1})
+        with patch('app.get_analysis_cache', return_value=self.cache):
+            metrics, error = app.analyze_ticker("AAPL", scraper=self.scraper)
+
+        self.assertEqual(metrics, {"revenue": 1})
+        self.scraper.search_company.assert_not_called()
+
+    def test_expired_entry_for_same_filing_skips_extraction(self):
+        """Test that only the filing lookup runs when no new 10-K exists"""
+        self.cache.put("AAPL", "000032019322000108", {"revenue": 1})
+        with patch('app.get_analysis_cache', return_value=self.cache), \
+             patch('cache_backend.time.time', return_value=time.time() + 120):
+            metrics, error = app.analyze_ticker("AAPL", scraper=self.scraper)
+
+        self.assertEqual(metrics, {"revenue": 1})
+        self.scraper.get_recent_10k_url.assert_called_once()
+        self.scraper.extract_financial_data.assert_not_called()
+
+    def test_new_filing_replaces_entry(self):
+        """Test that a new 10-K is analyzed and stored under its accession number"""
+        self.cache.put("AAPL", "000032019321000105", {"revenue": 1})
+        with patch('app.get_analysis_cache', return_value=self.cache), \
+             patch('cache_backend.time.time', return_value=time.time() + 120):
+            metrics, error = app.analyze_ticker("AAPL", scraper=self.scraper)
+
+        self.assertEqual(metrics["revenue"], 2)
+        self.assertEqual(self.store.get("AAPL").accession_number, "000032019322000108")
+        self.assertIsNone(self.store.get_filing("AAPL", "000032019321000105"))
+
+
+if __name__ == '__main__':
+    unittest.main()
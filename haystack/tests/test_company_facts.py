@@ -0,0 +1,200 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from unittest.mock import patch, MagicMock
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+import company_facts
+
+
+def _annual(start, end, value, filed, form='10-K', fy=None, accn='0000000000-00-000000'):
+    """Builds one companyfacts entry for a full fiscal year"""
+    return {"start": start, "end": end, "val": value, "accn": accn, "fy": fy or int(end[:4]), "fp": "FY", "form": form, "filed": filed}
+
+
+SAMPLE_COMPANY_FACTS = {
+    "cik": 320193,
+    "entityName": "Apple Inc.",
+    "facts": {
+        "dei": {
+            "EntityCommonStockSharesOutstanding": {"units": {"shares": [
+                {"end": "2022-10-14", "val": 15908118000, "accn": "0000320193-22-000108", "fy": 2022, "fp": "FY", "form": "10-K", "filed": "2022-10-28"}
+            ]}}
+        },
+        "us-gaap": {
+            "SalesRevenueNet": {"units": {"USD": [
+                _annual("2016-09-25", "2017-09-30", 229234000000, "2017-11-03"),
+                _annual("2017-10-01", "2018-09-29", 265595000000, "2018-11-05"),
+            ]}},
+            "RevenueFromContractWithCustomerExcludingAssessedTax": {"units": {"USD": [
+                _annual("2017-10-01", "2018-09-29", 265595000000, "2019-10-31"),
+                _annual("2018-09-30", "2019-09-28", 260174000000, "2019-10-31"),
+                _annual("2019-09-29", "2020-09-26", 274515000000, "2020-10-30"),
+                _annual("2020-09-27", "2021-09-25", 365817000000, "2021-10-29"),
+                _annual("2021-09-26", "2022-09-24", 394328000000, "2022-10-28"),
+                # Quarterly figures must not leak into the annual series
+                {"start": "2022-06-26", "end": "2022-09-24", "val": 90146000000, "accn": "x", "fy": 2022, "fp": "Q4", "form": "10-Q", "filed": "2022-10-28"},
+            ]}},
+            "NetIncomeLoss": {"units": {"USD": [
+                _annual("2016-09-25", "2017-09-30", 48351000000, "2017-11-03"),
+                _annual("2017-10-01", "2018-09-29", 59531000000, "2018-11-05"),
+                _annual("2018-09-30", "2019-09-28", 55256000000, "2019-10-31"),
+                _annual("2019-09-29", "2020-09-26", 57411000000, "2020-10-30"),
+                _annual("2020-09-27", "2021-09-25", 94000000000, "2021-10-29"),
+                # Restated in the following year's 10-K
+                _annual("2020-09-27", "2021-09-25", 94680000000, "2022-10-28"),
+                _annual("2021-09-26", "2022-09-24", 99803000000, "2022-10-28"),
+            ]}},
+            "OperatingIncomeLoss": {"units": {"USD": [
+                _annual("2021-09-26", "2022-09-24", 119437000000, "2022-10-28"),
+            ]}},
+            "Assets": {"units": {"USD": [
+                {"end": "2022-09-24", "val": 352755000000, "accn": "x", "fy": 2022, "fp": "FY", "form": "10-K", "filed": "2022-10-28"}
+            ]}},
+        }
+    }
+}
+
+
+class TestCompanyFacts(unittest.TestCase):
+    """Test cases for the columnar companyfacts representation"""
+
+    def setUp(self):
+        """Set up test environment before each test"""
+        self.facts = company_facts.CompanyFacts("0000320193", company_facts.build_columns(SAMPLE_COMPANY_FACTS))
+
+    def test_build_columns(self):
+        """Test that every numeric entry becomes one row"""
+        self.assertEqual(len(self.facts), 18)
+        self.assertEqual(self.facts.entity_name, "Apple Inc.")
+        self.assertIn("us-gaap:NetIncomeLoss", self.facts.columns['concept_names'])
+
+    def test_annual_series_prefers_concepts_in_order(self):
+        """Test that one value per year is chosen, preferring earlier concepts"""
+        ends, values = self.facts.annual_series(company_facts.REVENUE_CONCEPTS)
+
+        self.assertEqual([str(end) for end in ends], ["2017-09-30", "2018-09-29", "2019-09-28", "2020-09-26", "2021-09-25", "2022-09-24"])
+        self.assertEqual(values[0], 229234000000)
+        self.assertEqual(values[-1], 394328000000)
+
+    def test_annual_series_uses_latest_filing(self):
+        """Test that a re-reported period takes the most recently filed value"""
+        ends, values = self.facts.annual_series(company_facts.NET_INCOME_CONCEPTS)
+
+        self.assertEqual(values[list(map(str, ends)).index("2021-09-25")], 94680000000)
+
+    def test_annual_series_includes_balance_instants(self):
+        """Test that instant facts from annual reports form a series"""
+        ends, values = self.facts.annual_series(("us-gaap:Assets",))
+
+        self.assertEqual(list(values), [352755000000])
+
+    def test_unknown_concept_or_unit(self):
+        """Test that missing data yields empty series"""
+        self.assertEqual(len(self.facts.annual_series(("us-gaap:Goodwill",))[0]), 0)
+        self.assertEqual(len(self.facts.annual_series(company_facts.REVENUE_CONCEPTS, unit="EUR")[0]), 0)
+
+    def test_trend_metrics(self):
+        """Test multi-year history, margins and growth rates"""
+        trends = company_facts.trend_metrics(self.facts, years=5)
+
+        self.assertEqual(len(trends["history"]), 5)
+        self.assertEqual(trends["history"][0]["fiscal_year_end"], "2018-09-29")
+        self.assertEqual(trends["history"][-1]["profit_margin"], 25.31)
+        self.assertEqual(trends["history"][-1]["operating_margin"], 30.29)
+        self.assertIsNone(trends["history"][0]["operating_margin"])
+        self.assertEqual(trends["revenue_cagr"], 10.38)
+        self.assertEqual(trends["company_name"], "Apple Inc.")
+
+
+class TestCompanyFactsStore(unittest.TestCase):
+    """Test cases for the on-disk columnar store"""
+
+    def setUp(self):
+        """Set up test environment before each test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = company_facts.CompanyFactsStore(store_dir=os.path.join(self.temp_dir, "companyfacts"))
+
+    def tearDown(self):
+        """Clean up after each test"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_round_trip(self):
+        """Test that a fresh store instance reads back identical columns"""
+        self.store.save("0000320193", SAMPLE_COMPANY_FACTS)
+        reloaded = company_facts.CompanyFactsStore(store_dir=self.store.store_dir).load("0000320193")
+
+        self.assertEqual(len(reloaded), 18)
+        self.assertEqual(reloaded.entity_name, "Apple Inc.")
+        self.assertEqual(company_facts.trend_metrics(reloaded), company_facts.trend_metrics(self.store.load("0000320193")))
+
+    def test_get_downloads_only_when_stale(self):
+        """Test that a fresh copy answers without fetching"""
+        fetch_json = MagicMock(return_value=SAMPLE_COMPANY_FACTS)
+
+        self.store.get("0000320193", fetch_json)
+        facts, error = self.store.get("0000320193", fetch_json)
+
+        self.assertIsNone(error)
+        self.assertEqual(facts.entity_name, "Apple Inc.")
+        fetch_json.assert_called_once_with(company_facts.COMPANY_FACTS_URL.format(cik="0000320193"))
+
+    def test_get_falls_back_to_stale_copy(self):
+        """Test that a failed refresh serves the stored copy"""
+        self.store.save("0000320193", SAMPLE_COMPANY_FACTS)
+        self.store.ttl = 0
+
+        facts, error = self.store.get("0000320193", MagicMock(return_value=None))
+
+        self.assertIsNone(error)
+        self.assertEqual(facts.entity_name, "Apple Inc.")
+
+    def test_get_reports_missing_company(self):
+        """Test that a failed download with nothing stored is an error"""
+        facts, error = self.store.get("0000000001", MagicMock(return_value=None))
+
+        self.assertIsNone(facts)
+        self.assertIn("Error fetching company facts", error)
+
+
+class TestHistoryRoute(unittest.TestCase):
+    """Test cases for the /analyze/history endpoint"""
+
+    def setUp(self):
+        """Set up test environment before each test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.client = app.app.test_client()
+        self.scraper = MagicMock()
+        self.scraper.search_company.return_value = ("0000320193", None)
+        self.scraper._fetch_json.return_value = SAMPLE_COMPANY_FACTS
+        self.store = company_facts.CompanyFactsStore(store_dir=self.temp_dir)
+
+    def tearDown(self):
+        """Clean up after each test"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_history_route(self):
+        """Test that the route returns trends for the requested number of years"""
+        with patch('app.EdgarScraper', return_value=self.scraper), \
+             patch('app.get_company_facts_store', return_value=self.store):
+            response = self.client.post('/analyze/history', data={'ticker': 'aapl', 'years': '3'})
+
+        data = response.get_json()
+        self.assertEqual(data["ticker"], "AAPL")
+        self.assertEqual(len(data["history"]), 3)
+        self.assertEqual(data["history"][-1]["revenue"], 394328000000)
+
+    def test_history_route_rejects_bad_years(self):
+        """Test that a non-numeric year count is a client error"""
+        response = self.client.post('/analyze/history', data={'ticker': 'AAPL', 'years': 'many'})
+
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import unittest
+import gzip
+import json
+import os
+import sys
+import zlib
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+import compression
+
+ANALYSIS = {
+    "ticker": "AAPL", "accession_number": "000032019322000108", "company_name": "Apple Inc.",
+    "revenue": 394328000000.0, "net_income": 99803000000.0,
+}
+
+
+class TestCompression(unittest.TestCase):
+    """Test cases for the content-coding helpers"""
+
+    def test_stream_flushes_every_chunk(self):
+        """Test that each streamed line can be decoded before the stream ends"""
+        lines = [b'{"ticker": "AAPL"}\n', b'{"ticker": "MSFT"}\n']
+        decompressor = zlib.decompressobj(31)
+        stream = compression.compress_stream(iter(lines), 'gzip')
+
+        self.assertEqual(decompressor.decompress(next(stream)), lines[0])
+        self.assertEqual(decompressor.decompress(next(stream)), lines[1])
+        decompressor.decompress(b''.join(stream))
+        self.assertTrue(decompressor.eof)
+
+    def test_strip_encoding(self):
+        """Test that the coding suffix of a compressed representation's tag is split off"""
+        self.assertEqual(compression.strip_encoding("abc-gzip"), ("abc", "gzip"))
+        self.assertEqual(compression.strip_encoding("abc-br"), ("abc", "br"))
+        self.assertEqual(compression.strip_encoding("abc"), ("abc", None))
+
+
+class TestAnalyzeCaching(unittest.TestCase):
+    """Test cases for ETags, conditional requests and compression on the routes"""
+
+    def setUp(self):
+        """Set up test environment before each test"""
+        app.app.config['TESTING'] = True
+        self.client = app.app.test_client()
+        self.patcher = patch('app.analyze_ticker', return_value=(dict(ANALYSIS), None))
+        self.analyze_ticker = self.patcher.start()
+
+    def tearDown(self):
+        """Clean up after each test"""
+        self.patcher.stop()
+
+    def test_etag_depends_on_ticker_and_accession(self):
+        """Test that the tag is stable for a filing and changes with a new one"""
+        etag = app.analysis_etag(ANALYSIS)
+
+        self.assertEqual(app.analysis_etag(dict(ANALYSIS)), etag)
+        self.assertNotEqual(app.analysis_etag(dict(ANALYSIS, accession_number="000032019323000106")), etag)
+        self.assertIsNone(app.analysis_etag({"ticker": "AAPL"}))
+
+    def test_analyze_sets_etag(self):
+        """Test that GET and POST both return the analysis with its ETag"""
+        get_response = self.client.get('/analyze?ticker=AAPL')
+        post_response = self.client.post('/analyze', data={'ticker': 'AAPL'})
+
+        self.assertEqual(get_response.status_code, 200)
+        self.assertEqual(get_response.get_json()["revenue"], 394328000000)
+        self.assertEqual(get_response.get_etag(), (app.analysis_etag(ANALYSIS), False))
+        self.assertEqual(post_response.get_etag(), get_response.get_etag())
+
+    def test_if_none_match_returns_304(self):
+        """Test that a client holding the current analysis gets an empty 304"""
+        etag = app.analysis_etag(ANALYSIS)
+
+        response = self.client.get('/analyze?ticker=AAPL', headers={'If-None-Match': f'"{etag}-gzip"'})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+        self.assertEqual(response.get_etag(), (f"{etag}-gzip", False))
+
+    def test_compressed_representation_revalidates_with_its_own_tag(self):
+        """Test that a gzip client's stored ETag is confirmed by a 304 carrying that same ETag"""
+        large = dict(ANALYSIS, accession_number="000032019399000001", company_name="Apple Inc. " * 200)
+        self.analyze_ticker.return_value = (large, None)
+        first = self.client.get('/analyze?ticker=AAPL', headers={'Accept-Encoding': 'gzip'})
+        stored, _ = first.get_etag()
+
+        response = self.client.get('/analyze?ticker=AAPL', headers={'Accept-Encoding': 'gzip', 'If-None-Match': f'"{stored}"'})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_etag(), (stored, False))
+        self.assertEqual(stored, app.analysis_etag(large) + "-gzip")
+
+    def test_uncompressed_representation_revalidates_with_base_tag(self):
+        """Test that an identity client's tag comes back unchanged"""
+        etag = app.analysis_etag(ANALYSIS)
+
+        response = self.client.get('/analyze?ticker=AAPL', headers={'If-None-Match': f'"{etag}"'})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_etag(), (etag, False))
+
+    def test_stale_etag_returns_analysis(self):
+        """Test that a tag from an older filing gets the full analysis"""
+        response = self.client.get('/analyze?ticker=AAPL', headers={'If-None-Match': '"outdated"'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["ticker"], "AAPL")
+
+    def test_small_responses_are_not_compressed(self):
+        """Test that a single analysis below the size threshold is sent as is"""
+        response = self.client.get('/analyze?ticker=AAPL', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+
+    def test_large_responses_are_gzipped(self):
+        """Test that large bodies are compressed and the ETag marks the coding"""
+        large = dict(ANALYSIS, accession_number="000032019399000001", company_name="Apple Inc. " * 200)
+        self.analyze_ticker.return_value = (large, None)
+
+        response = self.client.get('/analyze?ticker=AAPL', headers={'Accept-Encoding': 'gzip, deflate'})
+
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.get_data()))["company_name"], large["company_name"])
+        self.assertEqual(response.get_etag(), (app.analysis_etag(large) + "-gzip", False))
+
+    def test_batch_stream_is_gzipped(self):
+        """Test that the NDJSON batch stream is compressed incrementally"""
+        with patch('app.analyze_ticker', side_effect=lambda ticker, scraper=None: ({"ticker": ticker}, None)):
+            response = self.client.post('/analyze/batch', json={"tickers": ["AAPL", "MSFT"]}, headers={'Accept-Encoding': 'gzip'})
+            body = gzip.decompress(response.get_data())
+
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(sorted(json.loads(line)["ticker"] for line in body.splitlines()), ["AAPL", "MSFT"])
+
+    def test_no_accept_encoding_means_identity(self):
+        """Test that clients that do not ask for compression get plain bodies"""
+        with patch('app.analyze_ticker', side_effect=lambda ticker, scraper=None: ({"ticker": ticker}, None)):
+            response = self.client.post('/analyze/batch', json={"tickers": ["AAPL"]})
+
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(json.loads(response.get_data(as_text=True))["ticker"], "AAPL")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+import filing_index
+
+SUBMISSIONS = {
+    "filings": {"recent": {
+        "accessionNumber": ["0000320193-23-000106", "0000320193-23-000077", "0000320193-22-000108", "0000320193-09-000012"],
+        "form": ["10-K", "8-K", "10-K", "10-K"],
+        "primaryDocument": ["aapl-20230930.htm", "aapl-20230803.htm", "aapl-20220924.htm", "d10k.htm"],
+        "isInlineXBRL": [1, 1, 1, 0],
+    }}
+}
+
+
+class TestChooseInstanceFilename(unittest.TestCase):
+    """Test cases for picking the instance document from a filing's files"""
+
+    def test_prefers_extracted_inline_instance(self):
+        """Test that schemas, linkbases and summaries are never chosen"""
+        names = ["FilingSummary.xml", "aapl-20220924_cal.xml", "aapl-20220924.xsd", "aapl-20220924_htm.xml", "aapl-20220924.htm"]
+        self.assertEqual(filing_index.choose_instance_filename(names), "aapl-20220924_htm.xml")
+
+    def test_falls_back_to_plain_instance(self):
+        """Test that pre-inline filings resolve to their standalone instance"""
+        names = ["aapl-20180929_def.xml", "aapl-20180929_lab.xml", "aapl-20180929_pre.xml", "aapl-20180929.xml"]
+        self.assertEqual(filing_index.choose_instance_filename(names), "aapl-20180929.xml")
+
+    def test_no_instance(self):
+        """Test that filings without XBRL resolve to None"""
+        self.assertIsNone(filing_index.choose_instance_filename(["d10k.htm", "FilingSummary.xml"]))
+
+
+class TestFilingIndex(unittest.TestCase):
+    """Test cases for the persistent accession to instance filename index"""
+
+    def setUp(self):
+        """Set up test environment before each test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "filings.sqlite3")
+        self.index = filing_index.FilingIndex(self.db_path)
+
+    def tearDown(self):
+        """Clean up after each test"""
+        self.index.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_record_submissions_derives_inline_instances(self):
+        """Test that only inline 10-Ks are indexed, keyed without dashes"""
+        self.assertEqual(self.index.record_submissions(SUBMISSIONS), 2)
+
+        self.assertEqual(self.index.get("000032019323000106"), "aapl-20230930_htm.xml")
+        self.assertEqual(self.index.get("0000320193-22-000108"), "aapl-20220924_htm.xml")
+        self.assertIsNone(self.index.get("000032019323000077"))
+        self.assertIsNone(self.index.get("000032019309000012"))
+
+    def test_entries_persist(self):
+        """Test that a new process sees earlier entries"""
+        self.index.put("0000320193-18-000145", "10-K", "aapl-20180929.xml")
+        self.index.close()
+
+        reopened = filing_index.FilingIndex(self.db_path)
+        self.assertEqual(reopened.get("000032019318000145"), "aapl-20180929.xml")
+        reopened.close()
+
+    def test_derived_names_do_not_replace_corrections(self):
+        """Test that re-recording submissions keeps an entry corrected from index.json"""
+        self.index.record_submissions(SUBMISSIONS)
+        self.index.put("0000320193-23-000106", "10-K", "aapl-20230930.xml")
+        self.index.record_submissions(SUBMISSIONS)
+
+        self.assertEqual(self.index.get("000032019323000106"), "aapl-20230930.xml")
+
+
+class TestRecentTenKResolution(unittest.TestCase):
+    """Test cases for resolving the newest 10-K through the filing index"""
+
+    def setUp(self):
+        """Set up a scraper with a stubbed JSON fetcher and a private filing index"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.index = filing_index.FilingIndex(os.path.join(self.temp_dir, "filings.sqlite3"))
+        self.scraper = app.EdgarScraper(ticker_index=MagicMock(), session=MagicMock(), validator_cache=MagicMock(), filing_index=self.index)
+        self.scraper._fetch_json = MagicMock()
+
+    def tearDown(self):
+        """Clean up after each test"""
+        self.index.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_inline_filing_resolved_from_submissions_alone(self):
+        """Test that the submissions document is the only request"""
+        self.scraper._fetch_json.return_value = SUBMISSIONS
+
+        url, error = self.scraper.get_recent_10k_url("0000320193")
+
+        self.assertIsNone(error)
+        self.assertEqual(url, "https://www.sec.gov/Archives/edgar/data/320193/000032019323000106/aapl-20230930_htm.xml")
+        self.assertEqual(self.scraper._fetch_json.call_count, 1)
+
+    def test_other_filings_fall_back_to_index_json_once(self):
+        """Test that index.json is fetched once, its instance chosen and remembered"""
+        submissions = {"filings": {"recent": {"accessionNumber": ["0000320193-18-000145"], "form": ["10-K"]}}}
+        details = {"directory": {"item": [{"name": "aapl-20180929.xsd"}, {"name": "aapl-20180929_cal.xml"}, {"name": "aapl-20180929.xml"}]}}
+        self.scraper._fetch_json.side_effect = lambda url: details if url.endswith("index.json") else submissions
+
+        first, _ = self.scraper.get_recent_10k_url("0000320193")
+        second, _ = self.scraper.get_recent_10k_url("0000320193")
+
+        self.assertEqual(first, "https://www.sec.gov/Archives/edgar/data/320193/000032019318000145/aapl-20180929.xml")
+        self.assertEqual(second, first)
+        self.assertEqual([call.args[0].endswith("index.json") for call in self.scraper._fetch_json.call_args_list], [False, True, False])
+
+    def test_missing_document_is_reported_as_not_found(self):
+        """Test that a 404 for the instance document is distinguishable from other failures"""
+        url = "https://www.sec.gov/Archives/edgar/data/320193/000032019323000106/aapl-20230930_htm.xml"
+        self.scraper.session.get.return_value = MagicMock(status_code=404)
+
+        metrics, error = self.scraper.extract_financial_data(url)
+
+        self.assertIsNone(metrics)
+        self.assertEqual(error, app.XBRL_NOT_FOUND_ERROR.format(url=url))
+
+    @patch('app.save_to_cache')
+    @patch('app.load_filing_from_cache', return_value=None)
+    @patch('app.load_from_cache', return_value=None)
+    def test_wrong_derived_name_is_corrected_from_index_json(self, mock_load, mock_load_filing, mock_save):
+        """Test that a 404 for a derived name falls back to index.json, rewrites the entry and retries once"""
+        folder = "https://www.sec.gov/Archives/edgar/data/320193/000032019323000106"
+        details = {"directory": {"item": [{"name": "aapl-20230930.xsd"}, {"name": "aapl-20230930_lab.xml"}, {"name": "aapl-20230930.xml"}]}}
+        self.scraper._fetch_json.side_effect = lambda url: details if url.endswith("index.json") else SUBMISSIONS
+        self.scraper.search_company = MagicMock(return_value=("0000320193", None))
+        self.scraper.extract_financial_data = MagicMock(side_effect=lambda url: (
+            ({"revenue": 383285000000}, None) if url == f"{folder}/aapl-20230930.xml" else (None, app.XBRL_NOT_FOUND_ERROR.format(url=url))
+        ))
+
+        metrics, error = app._analyze_uncached("AAPL", self.scraper)
+
+        self.assertIsNone(error)
+        self.assertEqual(metrics["source_url"], f"{folder}/aapl-20230930.xml")
+        self.assertEqual([call.args[0] for call in self.scraper.extract_financial_data.call_args_list], [f"{folder}/aapl-20230930_htm.xml", f"{folder}/aapl-20230930.xml"])
+        # Later lookups go straight to the corrected document
+        self.scraper._fetch_json.reset_mock()
+        url, _ = self.scraper.get_recent_10k_url("0000320193")
+        self.assertEqual(url, f"{folder}/aapl-20230930.xml")
+        self.assertEqual(self.scraper._fetch_json.call_count, 1)
+
+    @patch('app.load_filing_from_cache', return_value=None)
+    @patch('app.load_from_cache', return_value=None)
+    def test_missing_document_retries_only_if_index_json_disagrees(self, mock_load, mock_load_filing):
+        """Test that a 404 for the document index.json also names is reported without a retry"""
+        details = {"directory": {"item": [{"name": "aapl-20230930_htm.xml"}]}}
+        self.scraper._fetch_json.side_effect = lambda url: details if url.endswith("index.json") else SUBMISSIONS
+        self.scraper.search_company = MagicMock(return_value=("0000320193", None))
+        self.scraper.extract_financial_data = MagicMock(side_effect=lambda url: (None, app.XBRL_NOT_FOUND_ERROR.format(url=url)))
+
+        metrics, error = app._analyze_uncached("AAPL", self.scraper)
+
+        self.assertIsNone(metrics)
+        self.assertIn("XBRL document not found", error)
+        self.assertEqual(self.scraper.extract_financial_data.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,6 +10,7 @@ from unittest.mock import patch, MagicMock, mock_open
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import app
+import cache_backend
 
 
 class TestHelperFunctions(unittest.TestCase):
@@ -37,29 +38,18 @@ class TestHelperFunctions(unittest.TestCase):
 
     def test_save_and_load_from_cache(self):
         """Test saving and loading data from cache"""
-        # Create a temporary cache file path
-        cache_file = os.path.join(self.temp_dir, f"{self.sample_ticker.upper()}.json")
-
-        # Mock the cache directory path
-        with patch('app.os.path.exists', return_value=True), \
-             patch('app.open', mock_open()) as mock_file:
-
-            # Test save_to_cache
-            with patch('app.json.dump') as mock_json_dump:
-                app.save_to_cache(self.sample_ticker, self.sample_metrics)
-                mock_json_dump.assert_called_once()
-
-            # Test load_from_cache when file exists
-            with patch('app.os.path.exists', return_value=True), \
-                 patch('app.json.load', return_value=self.sample_metrics) as mock_json_load:
-                result = app.load_from_cache(self.sample_ticker)
-                self.assertEqual(result, self.sample_metrics)
-                mock_json_load.assert_called_once()
-
-            # Test load_from_cache when file doesn't exist
-            with patch('app.os.path.exists', return_value=False):
-                result = app.load_from_cache(self.sample_ticker)
-                self.assertIsNone(result)
+        cache = cache_backend.TieredCache(store=cache_backend.SQLiteStore(os.path.join(self.temp_dir, "analyses.sqlite3")))
+
+        with patch('app.get_analysis_cache', return_value=cache):
+            # Test load_from_cache when nothing is stored
+            self.assertIsNone(app.load_from_cache(self.sample_ticker))
+
+            # Test save_to_cache followed by load_from_cache
+            app.save_to_cache(self.sample_ticker, self.sample_metrics, "000032019322000108")
+            self.assertEqual(app.load_from_cache(self.sample_ticker.lower()), self.sample_metrics)
+            self.assertEqual(app.load_filing_from_cache(self.sample_ticker, "000032019322000108"), self.sample_metrics)
+
+        cache.store.close()
 
     def test_calculate_equity_value(self):
         """Test the calculate_equity_value function from imported tail_risk_hedge module"""
@@ -100,7 +90,7 @@ class TestCalculationFunctions(unittest.TestCase):
         expected_equity = 400000
 
         # Create a scraper instance to test the method
-        scraper = app.EdgarScraper()
+        scraper = app.EdgarScraper(ticker_index=MagicMock(), validator_cache=MagicMock(), filing_index=MagicMock())
         metrics = {
             "total_assets": total_assets,
             "total_liabilities": total_liabilities
@@ -140,7 +130,7 @@ class TestCalculationFunctions(unittest.TestCase):
     def test_handle_missing_financial_data(self):
         """Test handling of missing financial data for ratio calculations"""
         # Create a scraper instance
-        scraper = app.EdgarScraper()
+        scraper = app.EdgarScraper(ticker_index=MagicMock(), validator_cache=MagicMock(), filing_index=MagicMock())
 
         # Simulate metrics with missing values
         metrics = {
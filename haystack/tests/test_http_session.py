@@ -0,0 +1,179 @@
+import unittest
+import gzip
+import http.server
+import json
+import os
+import sys
+import shutil
+import tempfile
+import threading
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+import filing_index
+import http_session
+import ticker_index
+
+
+class StubEdgarHandler(http.server.BaseHTTPRequestHandler):
+    """Serves a fixed JSON document with an ETag, gzip-encoded, and honors If-None-Match"""
+    protocol_version = 'HTTP/1.1'
+    document = {"cik": "0000320193", "filings": {"recent": {"form": ["10-K"]}}}
+    etag = '"submissions-v1"'
+
+    def do_GET(self):
+        self.server.requests.append({'path': self.path, 'headers': dict(self.headers), 'client': self.client_address})
+        if self.path.endswith('/throttled'):
+            self.send_response(429)
+            self.send_header('Retry-After', '0')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.send_header('ETag', self.etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = gzip.compress(json.dumps(self.document).encode('utf-8'))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('ETag', self.etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestPooledSessionAgainstStubServer(unittest.TestCase):
+    """Test cases for the pooled session and conditional GETs against a local stub server"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Start the stub server once for all tests"""
+        cls.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StubEdgarHandler)
+        cls.server.requests = []
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/submissions/CIK0000320193.json"
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the stub server"""
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        """Set up test environment before each test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.server.requests.clear()
+        self.session = http_session.create_session()
+        self.validator_cache = http_session.ValidatorCache(cache_dir=os.path.join(self.temp_dir, "http"))
+        self.filing_index = filing_index.FilingIndex(os.path.join(self.temp_dir, "filings.sqlite3"))
+        self.scraper = self._make_scraper(self.validator_cache)
+
+    def tearDown(self):
+        """Clean up after each test"""
+        self.session.close()
+        self.filing_index.close()
+        shutil.rmtree(self.temp_dir)
+
+    def _make_scraper(self, validator_cache):
+        """Builds a scraper wired to the test session and an isolated cache"""
+        index = ticker_index.TickerIndex(cache_file=os.path.join(self.temp_dir, "company_tickers.json"))
+        return app.EdgarScraper(ticker_index=index, session=self.session, validator_cache=validator_cache, filing_index=self.filing_index)
+
+    def test_gzip_body_is_decoded_transparently(self):
+        """Test that gzip responses are requested and decoded"""
+        data = self.scraper._fetch_json(self.url)
+
+        self.assertEqual(data, StubEdgarHandler.document)
+        self.assertIn('gzip', self.server.requests[0]['headers']['Accept-Encoding'])
+
+    def test_repeat_request_is_revalidated_with_304(self):
+        """Test that a repeat request sends If-None-Match and is answered from the stored body"""
+        first = self.scraper._fetch_json(self.url)
+        second = self.scraper._fetch_json(self.url)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertNotIn('If-None-Match', self.server.requests[0]['headers'])
+        self.assertEqual(self.server.requests[1]['headers']['If-None-Match'], StubEdgarHandler.etag)
+
+    def test_validators_persist_across_processes(self):
+        """Test that a fresh cache instance on the same directory still revalidates"""
+        self.scraper._fetch_json(self.url)
+
+        other_scraper = self._make_scraper(http_session.ValidatorCache(cache_dir=self.validator_cache.cache_dir))
+        data = other_scraper._fetch_json(self.url)
+
+        self.assertEqual(data, StubEdgarHandler.document)
+        self.assertEqual(self.server.requests[-1]['headers']['If-None-Match'], StubEdgarHandler.etag)
+
+    def test_connections_are_reused(self):
+        """Test that sequential requests share one keep-alive connection"""
+        for _ in range(3):
+            self.scraper._fetch_json(self.url)
+
+        client_ports = {request['client'][1] for request in self.server.requests}
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(client_ports), 1)
+
+    def test_explicit_validators_are_passed_through(self):
+        """Test that callers managing their own ETag see the raw 304"""
+        headers = dict(self.scraper.headers, **{'If-None-Match': StubEdgarHandler.etag})
+        response = self.scraper._fetch_response(self.url, headers)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_throttled_responses_are_not_resent_by_the_session(self):
+        """Test that a 429 reaches the caller instead of being retried outside the rate limiter"""
+        url = self.url.rsplit('/', 1)[0] + '/throttled'
+        response = self.scraper._fetch_response(url)
+
+        self.assertIsNone(response)
+        self.assertEqual(len(self.server.requests), 1)
+
+
+class TestValidatorCache(unittest.TestCase):
+    """Test cases for the on-disk validator cache"""
+
+    def setUp(self):
+        """Set up test environment before each test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = http_session.ValidatorCache(cache_dir=self.temp_dir)
+
+    def tearDown(self):
+        """Clean up after each test"""
+        shutil.rmtree(self.temp_dir)
+
+    def _response(self, headers, body=b'{}'):
+        """Builds a response with the given headers and body"""
+        response = http_session.requests.Response()
+        response.status_code = 200
+        response.headers.update(headers)
+        response._content = body
+        return response
+
+    def test_responses_without_validators_are_not_stored(self):
+        """Test that responses lacking ETag and Last-Modified are skipped"""
+        self.cache.store("https://example.com/a", self._response({}))
+        self.assertEqual(self.cache.conditional_headers("https://example.com/a"), {})
+        self.assertIsNone(self.cache.load_response("https://example.com/a"))
+
+    def test_last_modified_round_trip(self):
+        """Test that Last-Modified is replayed as If-Modified-Since"""
+        last_modified = 'Wed, 21 Oct 2015 07:28:00 GMT'
+        self.cache.store("https://example.com/a", self._response({'Last-Modified': last_modified}, b'{"a": 1}'))
+
+        self.assertEqual(self.cache.conditional_headers("https://example.com/a"), {'If-Modified-Since': last_modified})
+        self.assertEqual(self.cache.load_response("https://example.com/a").json(), {"a": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
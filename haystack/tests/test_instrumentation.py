@@ -0,0 +1,124 @@
+import unittest
+import os
+import sys
+import time
+from unittest.mock import MagicMock
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+import instrumentation
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "aapl-20220924_htm.xml")
+XBRL_URL = "https://www.sec.gov/Archives/edgar/data/320193/000032019322000108/aapl-20220924_htm.xml"
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """Test cases for counters, histograms and the Prometheus text format"""
+
+    def setUp(self):
+        """Set up a registry with small buckets"""
+        self.registry = instrumentation.MetricsRegistry(buckets=(0.1, 1.0))
+        self.registry.describe("stage_seconds", "histogram", "Stage latency.")
+        self.registry.describe("requests_total", "counter", "Requests.")
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test that each bucket counts observations at or below its bound"""
+        for value in (0.05, 0.1, 0.5, 3.0):
+            self.registry.observe("stage_seconds", value, {"stage": "parse"})
+
+        text = self.registry.render()
+
+        self.assertIn('# TYPE stage_seconds histogram', text)
+        self.assertIn('stage_seconds_bucket{stage="parse",le="0.1"} 2', text)
+        self.assertIn('stage_seconds_bucket{stage="parse",le="1.0"} 3', text)
+        self.assertIn('stage_seconds_bucket{stage="parse",le="+Inf"} 4', text)
+        self.assertIn('stage_seconds_sum{stage="parse"} 3.65', text)
+        self.assertIn('stage_seconds_count{stage="parse"} 4', text)
+
+    def test_counters_and_label_escaping(self):
+        """Test that counters accumulate per label set and label values are escaped"""
+        self.registry.increment("requests_total", {"outcome": "200"})
+        self.registry.increment("requests_total", {"outcome": "200"}, amount=2)
+        self.registry.increment("requests_total", {"outcome": 'say "hi"'})
+
+        text = self.registry.render()
+
+        self.assertIn('requests_total{outcome="200"} 3', text)
+        self.assertIn('requests_total{outcome="say \\"hi\\""} 1', text)
+        self.assertEqual(self.registry.counter_value("requests_total", {"outcome": "200"}), 3)
+
+    def test_span_records_even_when_block_raises(self):
+        """Test that a failing stage is still timed"""
+        with self.assertRaises(RuntimeError):
+            with self.registry.span("stage_seconds", stage="download"):
+                raise RuntimeError("boom")
+
+        self.assertEqual(self.registry.histogram_count("stage_seconds", {"stage": "download"}), 1)
+
+    def test_collectors_are_rendered_and_failures_skipped(self):
+        """Test that collector samples appear and a broken collector does not break the page"""
+        self.registry.register_collector(lambda: [instrumentation.Sample("cache_hits_total", "counter", "Hits.", {"tier": "memory"}, 7)])
+        self.registry.register_collector(lambda: 1 / 0)
+
+        text = self.registry.render()
+
+        self.assertIn('# TYPE cache_hits_total counter', text)
+        self.assertIn('cache_hits_total{tier="memory"} 7', text)
+
+    def test_timed_iterator_measures_waits(self):
+        """Test that time blocked on the wrapped iterator is accumulated"""
+        def slow():
+            time.sleep(0.05)
+            yield b"a"
+
+        chunks = instrumentation.TimedIterator(slow())
+
+        self.assertEqual(list(chunks), [b"a"])
+        self.assertGreaterEqual(chunks.seconds, 0.04)
+
+
+class TestAppInstrumentation(unittest.TestCase):
+    """Test cases for the scraper's stage spans and the /metrics endpoint"""
+
+    def _count(self, stage):
+        return instrumentation.get_metrics().histogram_count(app.STAGE_SECONDS, {"stage": stage})
+
+    def test_extraction_records_download_parse_and_ratio_stages(self):
+        """Test that one extraction adds one observation to each of its stages"""
+        with open(FIXTURE, "rb") as f:
+            content = f.read()
+        response = MagicMock(status_code=200)
+        response.iter_content.return_value = [content[i:i + 4096] for i in range(0, len(content), 4096)]
+        session = MagicMock()
+        session.get.return_value = response
+        scraper = app.EdgarScraper(ticker_index=MagicMock(), session=session, validator_cache=MagicMock(), filing_index=MagicMock())
+        before = {stage: self._count(stage) for stage in ("xbrl_download", "xbrl_parse", "ratios")}
+
+        metrics, error = scraper.extract_financial_data(XBRL_URL)
+
+        self.assertIsNone(error)
+        self.assertEqual(metrics["revenue"], 394328000000)
+        for stage, count in before.items():
+            self.assertEqual(self._count(stage), count + 1, stage)
+
+    def test_metrics_endpoint(self):
+        """Test that /metrics serves stage histograms and component counters as Prometheus text"""
+        client = app.app.test_client()
+        client.get('/')
+
+        response = client.get('/metrics')
+        text = response.get_data(as_text=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        self.assertIn('# TYPE haystack_stage_seconds histogram', text)
+        self.assertIn('haystack_request_seconds_count{endpoint="/"}', text)
+        self.assertIn('haystack_analysis_cache_events_total{event="misses"}', text)
+        self.assertIn('haystack_rate_limit_waits_total', text)
+        self.assertIn('haystack_coalesced_analyses_total', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
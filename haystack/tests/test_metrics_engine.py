@@ -0,0 +1,122 @@
+import unittest
+import os
+import sys
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics_engine
+
+
+class TestFinancialMetrics(unittest.TestCase):
+    """Test cases for the registered financial ratios"""
+
+    def setUp(self):
+        """Set up test environment before each test"""
+        self.apple = {
+            "company_name": "Apple Inc.",
+            "revenue": 394328000000,
+            "net_income": 99803000000,
+            "total_assets": 352755000000,
+            "total_liabilities": 302083000000,
+            "cash_and_equivalents": 23646000000,
+            "long_term_debt": 98959000000,
+            "shares_outstanding": 15908118000,
+            "fcf": None,
+            "intangible_assets": None,
+        }
+
+    def test_single_company(self):
+        """Test that one company's ratios match the hand-computed values"""
+        metrics = metrics_engine.evaluate(self.apple)
+
+        self.assertEqual(metrics["company_name"], "Apple Inc.")
+        self.assertEqual(metrics["equity"], 50672000000)
+        self.assertEqual(metrics["profit_margin"], 25.31)
+        self.assertEqual(metrics["return_on_assets"], 28.29)
+        self.assertEqual(metrics["return_on_equity"], 196.96)
+        self.assertEqual(metrics["debt_to_assets_ratio"], 0.86)
+        self.assertEqual(metrics["revenue_per_share"], 24.79)
+        self.assertEqual(metrics["net_tangible_assets_per_share"], 3.19)
+
+    def test_missing_inputs_propagate(self):
+        """Test that metrics depending on a missing value are None and others still compute"""
+        metrics = metrics_engine.evaluate(dict(self.apple, total_liabilities=None, shares_outstanding=None))
+
+        self.assertIsNone(metrics["equity"])
+        self.assertIsNone(metrics["return_on_equity"])
+        self.assertIsNone(metrics["debt_to_assets_ratio"])
+        self.assertIsNone(metrics["revenue_per_share"])
+        self.assertIsNone(metrics["fcf_per_share"])
+        self.assertEqual(metrics["profit_margin"], 25.31)
+
+    def test_division_by_zero_is_missing(self):
+        """Test that a zero denominator yields None rather than infinity"""
+        metrics = metrics_engine.evaluate(dict(self.apple, revenue=0, shares_outstanding=0))
+
+        self.assertIsNone(metrics["profit_margin"])
+        self.assertIsNone(metrics["net_income_per_share"])
+
+    def test_intangibles_reduce_tangible_assets(self):
+        """Test that reported intangibles are subtracted"""
+        metrics = metrics_engine.evaluate(dict(self.apple, intangible_assets=15908118000))
+
+        self.assertEqual(metrics["net_tangible_assets_per_share"], 2.19)
+
+    def test_single_company_does_not_build_a_frame(self):
+        """Test that evaluating one company stays on scalars"""
+        with patch('metrics_engine.pd.DataFrame') as mock_frame:
+            metrics_engine.evaluate(self.apple)
+
+        mock_frame.assert_not_called()
+
+    def test_screen_matches_single_evaluation(self):
+        """Test that a vectorized pass over many companies agrees with per-company evaluation"""
+        rng = np.random.default_rng(7)
+        companies = []
+        for i in range(500):
+            company = {key: float(value) for key, value in zip(
+                ("revenue", "net_income", "total_assets", "total_liabilities", "shares_outstanding"),
+                rng.uniform(1e6, 1e9, 5)
+            )}
+            if i % 7 == 0:
+                company["net_income"] = None
+            companies.append(company)
+
+        table = metrics_engine.screen(companies)
+
+        self.assertEqual(len(table), 500)
+        for i in (0, 1, 250, 499):
+            expected = metrics_engine.evaluate(companies[i])
+            for name in metrics_engine.FINANCIAL_METRICS.names():
+                actual = table.at[i, name]
+                self.assertEqual(None if pd.isna(actual) else float(actual), expected[name], name)
+
+
+class TestMetricRegistry(unittest.TestCase):
+    """Test cases for registering metrics"""
+
+    def test_registered_metric_can_use_earlier_metrics(self):
+        """Test that a new ratio is one registry entry and sees earlier outputs"""
+        registry = metrics_engine.MetricRegistry()
+        registry.register('equity', lambda frame: metrics_engine.column(frame, 'assets') - metrics_engine.column(frame, 'liabilities'))
+        registry.register('leverage', metrics_engine.ratio('assets', 'equity'), digits=1)
+
+        result = registry.evaluate({"assets": 300, "liabilities": 200})
+
+        self.assertEqual(registry.names(), ['equity', 'leverage'])
+        self.assertEqual(result["leverage"], 3.0)
+
+    def test_missing_column_is_missing_metric(self):
+        """Test that a formula over a column nobody supplied yields None"""
+        registry = metrics_engine.MetricRegistry()
+        registry.register('margin', metrics_engine.ratio('income', 'sales'))
+
+        self.assertIsNone(registry.evaluate({"income": 1})["margin"])
+
+
+if __name__ == '__main__':
+    unittest.main()
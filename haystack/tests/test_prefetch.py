@@ -0,0 +1,105 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+import time
+from unittest.mock import patch, MagicMock
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache_backend
+import prefetch
+
+URL_2022 = "https://www.sec.gov/Archives/edgar/data/320193/000032019322000108/aapl-20220924_htm.xml"
+URL_2023 = "https://www.sec.gov/Archives/edgar/data/320193/000032019323000106/aapl-20230930_htm.xml"
+
+
+class TestPrefetcher(unittest.TestCase):
+    """Test cases for the background watchlist prefetcher"""
+
+    def setUp(self):
+        """Set up a temporary analysis cache and a mock scraper"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = cache_backend.SQLiteStore(os.path.join(self.temp_dir, "analyses.sqlite3"))
+        self.cache = cache_backend.TieredCache(store=self.store)
+        self.patcher = patch('app.get_analysis_cache', return_value=self.cache)
+        self.patcher.start()
+
+        self.scraper = MagicMock()
+        self.scraper.search_company.return_value = ("0000320193", None)
+        self.scraper.get_recent_10k_url.return_value = (URL_2022, None)
+        self.scraper.extract_financial_data.return_value = ({"revenue": 394328000000}, None)
+
+    def tearDown(self):
+        """Clean up after each test"""
+        self.patcher.stop()
+        self.store.close()
+        shutil.rmtree(self.temp_dir)
+
+    def _prefetcher(self, tickers, **kwargs):
+        return prefetch.Prefetcher(tickers, tickers_per_second=1000, scraper=self.scraper, **kwargs)
+
+    def test_parse_watchlist(self):
+        """Test that commas, whitespace, case and duplicates are normalized"""
+        self.assertEqual(prefetch.parse_watchlist("aapl, msft\nGOOG,,AAPL"), ["AAPL", "MSFT", "GOOG"])
+        self.assertEqual(prefetch.parse_watchlist(None), [])
+
+    def test_unchanged_filing_is_not_reextracted(self):
+        """Test that a second pass with the same newest 10-K reuses the cached analysis"""
+        prefetcher = self._prefetcher(["aapl"])
+
+        self.assertEqual(prefetcher.run_once(), 1)
+        self.assertEqual(prefetcher.run_once(), 1)
+
+        self.assertEqual(self.scraper.extract_financial_data.call_count, 1)
+        self.assertEqual(self.scraper.get_recent_10k_url.call_count, 2)
+        self.assertEqual(self.cache.get("AAPL")["revenue"], 394328000000)
+        self.assertEqual(prefetcher.stats["refreshed"], 2)
+
+    def test_new_filing_is_extracted(self):
+        """Test that a newly filed 10-K replaces the cached analysis"""
+        prefetcher = self._prefetcher(["AAPL"])
+        prefetcher.run_once()
+
+        self.scraper.get_recent_10k_url.return_value = (URL_2023, None)
+        self.scraper.extract_financial_data.return_value = ({"revenue": 383285000000}, None)
+        prefetcher.run_once()
+
+        self.assertEqual(self.scraper.extract_financial_data.call_count, 2)
+        self.assertEqual(self.cache.get("AAPL")["revenue"], 383285000000)
+        self.assertEqual(self.cache.get("AAPL")["source_url"], URL_2023)
+
+    def test_errors_are_recorded(self):
+        """Test that one failing ticker does not stop the others"""
+        self.scraper.search_company.side_effect = lambda ticker: (None, "Ticker not found") if ticker == "ZZZZ" else ("0000320193", None)
+        prefetcher = self._prefetcher(["ZZZZ", "AAPL"])
+
+        self.assertEqual(prefetcher.run_once(), 1)
+
+        self.assertEqual(prefetcher.errors, {"ZZZZ": "Ticker not found"})
+        self.assertEqual(prefetcher.stats["errors"], 1)
+
+    def test_start_and_stop(self):
+        """Test that the background thread refreshes and exits promptly when stopped"""
+        prefetcher = self._prefetcher(["AAPL"], interval=60)
+        prefetcher.start()
+        deadline = time.monotonic() + 5
+        while prefetcher.stats["passes"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        prefetcher.stop(timeout=5)
+
+        self.assertFalse(prefetcher.is_running())
+        self.assertEqual(prefetcher.stats["passes"], 1)
+        self.assertIsNotNone(self.cache.get("AAPL"))
+
+    def test_start_from_environment_without_watchlist(self):
+        """Test that no worker starts when no watchlist is configured"""
+        with patch.dict(os.environ, {prefetch.WATCHLIST_ENV: ""}):
+            self.assertIsNone(prefetch.start_from_environment())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+import unittest
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+import rate_limiter
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Test cases for the token bucket"""
+
+    def test_starts_full_and_drains(self):
+        """Test that a new bucket allows a burst of `capacity` requests"""
+        bucket = rate_limiter.TokenBucket(rate=2, capacity=3)
+        now = bucket.updated_at
+        for _ in range(3):
+            self.assertEqual(bucket.wait_time(now=now), 0.0)
+            bucket.consume()
+        self.assertAlmostEqual(bucket.wait_time(now=now), 0.5)
+
+    def test_refills_over_time(self):
+        """Test that tokens accrue at `rate` per second up to capacity"""
+        bucket = rate_limiter.TokenBucket(rate=10)
+        now = bucket.updated_at
+        bucket.tokens = 0
+        self.assertAlmostEqual(bucket.wait_time(now=now), 0.1)
+        self.assertEqual(bucket.wait_time(now=now + 0.1), 0.0)
+        bucket.wait_time(now=now + 100)
+        self.assertEqual(bucket.tokens, 10)
+
+    def test_rejects_invalid_rates(self):
+        """Test that non-positive rates and fractional capacities are rejected"""
+        with self.assertRaises(ValueError):
+            rate_limiter.TokenBucket(rate=0)
+        with self.assertRaises(ValueError):
+            rate_limiter.TokenBucket(rate=1, capacity=0.5)
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test cases for the global and per-host rate limiter"""
+
+    def test_global_budget_spans_hosts(self):
+        """Test that requests to different hosts draw from the same global budget"""
+        limiter = rate_limiter.RateLimiter(global_rate=3)
+        urls = ["https://www.sec.gov/a", "https://data.sec.gov/b", "https://www.sec.gov/c", "https://data.sec.gov/d"]
+        waits = [limiter.try_acquire(url) for url in urls]
+        self.assertEqual(waits[:3], [0.0, 0.0, 0.0])
+        self.assertGreater(waits[3], 0)
+
+    def test_host_budget_is_enforced(self):
+        """Test that a slower host bucket throttles its host without affecting others"""
+        limiter = rate_limiter.RateLimiter(global_rate=10, host_rates={"data.sec.gov": 1})
+        self.assertEqual(limiter.try_acquire("https://data.sec.gov/a"), 0.0)
+        self.assertGreater(limiter.try_acquire("https://data.sec.gov/b"), 0)
+        self.assertEqual(limiter.try_acquire("https://www.sec.gov/c"), 0.0)
+
+    def test_rejected_request_takes_no_tokens(self):
+        """Test that a request refused by one bucket is not charged to the other"""
+        limiter = rate_limiter.RateLimiter(global_rate=10, host_rates={"data.sec.gov": 1})
+        limiter.try_acquire("https://data.sec.gov/a")
+        tokens_before = limiter.global_bucket.tokens
+        limiter.try_acquire("https://data.sec.gov/b")
+        self.assertAlmostEqual(limiter.global_bucket.tokens, tokens_before, places=2)
+
+    def test_acquire_blocks_until_a_token_is_free(self):
+        """Test that acquire waits for a refill instead of failing"""
+        limiter = rate_limiter.RateLimiter(global_rate=20, global_capacity=1)
+        start = time.monotonic()
+        self.assertTrue(limiter.acquire("https://www.sec.gov/a"))
+        self.assertTrue(limiter.acquire("https://www.sec.gov/b"))
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+
+    def test_acquire_gives_up_when_wait_exceeds_timeout(self):
+        """Test that acquire returns False without sleeping past its timeout"""
+        limiter = rate_limiter.RateLimiter(global_rate=0.1, global_capacity=1)
+        limiter.try_acquire("https://www.sec.gov/a")
+        start = time.monotonic()
+        self.assertFalse(limiter.acquire("https://www.sec.gov/b", timeout=0.1))
+        self.assertLess(time.monotonic() - start, 0.1)
+
+    def test_stats_count_waits_and_timeouts(self):
+        """Test that only acquires that slept or gave up are counted"""
+        limiter = rate_limiter.RateLimiter(global_rate=20, global_capacity=1)
+        limiter.acquire("https://www.sec.gov/a")
+        limiter.acquire("https://www.sec.gov/b")
+        limiter.acquire("https://www.sec.gov/c", timeout=0)
+
+        stats = limiter.stats()
+        self.assertEqual(stats["waits"], 1)
+        self.assertGreater(stats["wait_seconds"], 0)
+        self.assertEqual(stats["timeouts"], 1)
+
+    def test_acquire_async_shares_the_budget(self):
+        """Test that coroutines wait on the same buckets as threads"""
+        limiter = rate_limiter.RateLimiter(global_rate=20, global_capacity=1)
+        self.assertTrue(limiter.acquire("https://www.sec.gov/a"))
+        start = time.monotonic()
+        self.assertTrue(asyncio.run(limiter.acquire_async("https://www.sec.gov/b")))
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+        self.assertFalse(asyncio.run(limiter.acquire_async("https://www.sec.gov/c", timeout=0.01)))
+
+    def test_concurrent_callers_never_exceed_budget(self):
+        """Test that the limiter is thread-safe"""
+        limiter = rate_limiter.RateLimiter(global_rate=0.001, global_capacity=5, default_host_rate=100)
+        granted = []
+
+        def worker(i):
+            granted.append(limiter.try_acquire(f"https://www.sec.gov/{i}") == 0)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sum(granted), 5)
+
+    def test_app_helpers_use_process_wide_limiter(self):
+        """Test that the app's rate limit helpers delegate to the shared limiter"""
+        limiter = rate_limiter.RateLimiter(global_rate=0.001, global_capacity=1)
+        with patch('app.get_rate_limiter', return_value=limiter):
+            self.assertFalse(app.check_rate_limit("https://www.sec.gov/a"))
+            self.assertTrue(app.check_rate_limit("https://www.sec.gov/b"))
+            self.assertFalse(app.wait_for_rate_limit("https://www.sec.gov/c", timeout=0.1))
+
+
+class TestSharedRateLimiter(unittest.TestCase):
+    """Test cases for the rate limiter shared between processes through SQLite"""
+
+    def setUp(self):
+        """Set up test environment before each test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "rate_limit.sqlite3")
+        self.limiters = []
+
+    def tearDown(self):
+        """Clean up after each test"""
+        for limiter in self.limiters:
+            limiter.close()
+        shutil.rmtree(self.temp_dir)
+
+    def make_limiter(self, **kwargs):
+        limiter = rate_limiter.SharedRateLimiter(self.db_path, **kwargs)
+        self.limiters.append(limiter)
+        return limiter
+
+    def test_instances_share_one_budget(self):
+        """Test that limiters on the same file, as in separate workers, draw from the same buckets"""
+        first = self.make_limiter(global_rate=0.001, global_capacity=2, default_host_rate=100)
+        second = self.make_limiter(global_rate=0.001, global_capacity=2, default_host_rate=100)
+
+        self.assertEqual(first.try_acquire("https://www.sec.gov/a"), 0)
+        self.assertEqual(second.try_acquire("https://www.sec.gov/b"), 0)
+        self.assertGreater(first.try_acquire("https://www.sec.gov/c"), 0)
+        self.assertGreater(second.try_acquire("https://www.sec.gov/d"), 0)
+
+    def test_host_buckets_are_shared(self):
+        """Test that per-host budgets are shared as well as the global one"""
+        first = self.make_limiter(global_rate=100, host_rates={"data.sec.gov": 0.001})
+        second = self.make_limiter(global_rate=100, host_rates={"data.sec.gov": 0.001})
+
+        self.assertEqual(first.try_acquire("https://data.sec.gov/a"), 0)
+        self.assertGreater(second.try_acquire("https://data.sec.gov/b"), 0)
+        self.assertEqual(second.try_acquire("https://www.sec.gov/c"), 0)
+
+    def test_reconnects_after_fork(self):
+        """Test that a connection inherited from another process is replaced, not reused"""
+        limiter = self.make_limiter(global_rate=0.001, global_capacity=2, default_host_rate=100)
+        self.assertEqual(limiter.try_acquire("https://www.sec.gov/a"), 0)
+        inherited = limiter._connection
+        limiter._pid = -1
+
+        self.assertEqual(limiter.try_acquire("https://www.sec.gov/b"), 0)
+        self.assertIsNot(limiter._connection, inherited)
+        self.assertGreater(limiter.try_acquire("https://www.sec.gov/c"), 0)
+        inherited.close()
+
+    def test_default_limiter_is_shared_when_configured(self):
+        """Test that $HAYSTACK_RATE_LIMIT_DB selects the shared limiter"""
+        with patch.dict(os.environ, {rate_limiter.SHARED_DB_ENV: self.db_path}), \
+                patch('rate_limiter._default_limiter', None):
+            limiter = rate_limiter.get_rate_limiter()
+            self.limiters.append(limiter)
+            self.assertIsInstance(limiter, rate_limiter.SharedRateLimiter)
+            self.assertEqual(limiter.db_path, self.db_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,18 @@
 import unittest
 import json
 import os
+import shutil
 import sys
+import tempfile
 from unittest.mock import patch, MagicMock, mock_open
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import app
+import filing_index
+import http_session
+import ticker_index
 
 
 class TestEdgarScraper(unittest.TestCase):
@@ -15,7 +20,12 @@ class TestEdgarScraper(unittest.TestCase):
 
     def setUp(self):
         """Set up test environment before each test"""
-        self.scraper = app.EdgarScraper()
+        # Isolate the ticker index from the process-wide one and its on-disk copy
+        self.temp_dir = tempfile.mkdtemp()
+        self.ticker_index = ticker_index.TickerIndex(cache_file=os.path.join(self.temp_dir, "company_tickers.json"))
+        self.validator_cache = http_session.ValidatorCache(cache_dir=os.path.join(self.temp_dir, "http"))
+        self.filing_index = filing_index.FilingIndex(os.path.join(self.temp_dir, "filings.sqlite3"))
+        self.scraper = app.EdgarScraper(ticker_index=self.ticker_index, validator_cache=self.validator_cache, filing_index=self.filing_index)
 
         # Sample data for tests
         self.sample_cik = "0000320193"  # Apple Inc.
@@ -92,11 +102,16 @@ class TestEdgarScraper(unittest.TestCase):
         </html>
         """
 
-    @patch('app.requests.get')
+    def tearDown(self):
+        """Clean up after each test"""
+        self.filing_index.close()
+        shutil.rmtree(self.temp_dir)
+
+    @patch('app.requests.Session.get')
     def test_search_company_success(self, mock_get):
         """Test successful company search by ticker"""
         # Configure mock
-        mock_response = MagicMock()
+        mock_response = MagicMock(status_code=200, headers={})
         mock_response.json.return_value = self.sample_company_tickers
         mock_get.return_value = mock_response
 
@@ -108,14 +123,15 @@ class TestEdgarScraper(unittest.TestCase):
         self.assertIsNone(error)
         mock_get.assert_called_once_with(
             "https://www.sec.gov/files/company_tickers.json",
-            headers=self.scraper.headers
+            headers=self.scraper.headers,
+            timeout=http_session.REQUEST_TIMEOUT
         )
 
-    @patch('app.requests.get')
+    @patch('app.requests.Session.get')
     def test_search_company_not_found(self, mock_get):
         """Test company search with non-existent ticker"""
         # Configure mock
-        mock_response = MagicMock()
+        mock_response = MagicMock(status_code=200, headers={})
         mock_response.json.return_value = self.sample_company_tickers
         mock_get.return_value = mock_response
 
@@ -126,7 +142,7 @@ class TestEdgarScraper(unittest.TestCase):
         self.assertIsNone(cik)
         self.assertIn("not found", error)
 
-    @patch('app.requests.get')
+    @patch('app.requests.Session.get')
     def test_search_company_request_error(self, mock_get):
         """Test company search with request error"""
         # Configure mock to raise an exception
@@ -139,7 +155,7 @@ class TestEdgarScraper(unittest.TestCase):
         self.assertIsNone(cik)
         self.assertIn("Error searching for company", error)
 
-    @patch('app.requests.get')
+    @patch('app.requests.Session.get')
     def test_get_recent_10k_url_success(self, mock_get):
         """Test successful retrieval of 10-K URL"""
         # Configure mocks
@@ -160,7 +176,7 @@ class TestEdgarScraper(unittest.TestCase):
         self.assertIsNone(error)
         self.assertEqual(mock_get.call_count, 2)
 
-    @patch('app.requests.get')
+    @patch('app.requests.Session.get')
     def test_get_recent_10k_url_no_filings(self, mock_get):
         """Test 10-K URL retrieval with no filings"""
         # Configure mock
@@ -175,7 +191,7 @@ class TestEdgarScraper(unittest.TestCase):
         self.assertIsNone(url)
         self.assertIn("No recent filings found", error)
 
-    @patch('app.requests.get')
+    @patch('app.requests.Session.get')
     def test_get_recent_10k_url_no_10k(self, mock_get):
         """Test 10-K URL retrieval with no 10-K filing"""
         # Configure mock
@@ -198,7 +214,7 @@ class TestEdgarScraper(unittest.TestCase):
         self.assertIsNone(url)
         self.assertIn("No 10-K filing found", error)
 
-    @patch('app.requests.get')
+    @patch('app.requests.Session.get')
     def test_extract_financial_data_success(self, mock_get):
         """Test successful extraction of financial data"""
         # Configure mock
@@ -230,7 +246,7 @@ class TestEdgarScraper(unittest.TestCase):
         self.assertAlmostEqual(metrics["return_on_equity"], 196.96, places=2)  # (net_income / equity) * 100
         self.assertAlmostEqual(metrics["debt_to_assets_ratio"], 0.86, places=2)  # total_liabilities / total_assets
 
-    @patch('app.requests.get')
+    @patch('app.requests.Session.get')
     def test_extract_financial_data_request_error(self, mock_get):
         """Test financial data extraction with request error"""
         # Configure mock to raise an exception
@@ -0,0 +1,207 @@
+import unittest
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import patch, AsyncMock, MagicMock
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+import async_scraper
+import cache_backend
+import single_flight
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Test cases for coalescing concurrent calls"""
+
+    def _run_concurrently(self, count, target):
+        """Starts `count` threads on target(i) together and returns their results by index"""
+        results = [None] * count
+        barrier = threading.Barrier(count)
+
+        def run(i):
+            barrier.wait()
+            try:
+                results[i] = target(i)
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Test that callers for the same key all get the single execution's result"""
+        flight = single_flight.SingleFlight()
+        calls = []
+
+        def slow(value):
+            calls.append(value)
+            time.sleep(0.2)
+            return {"value": value}
+
+        results = self._run_concurrently(8, lambda i: flight.do("AAPL", slow, 42))
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(flight.coalesced, 7)
+        self.assertFalse(flight.in_flight("AAPL"))
+
+    def test_different_keys_run_independently(self):
+        """Test that distinct keys do not wait on each other"""
+        flight = single_flight.SingleFlight()
+
+        def slow(value):
+            time.sleep(0.2)
+            return value
+
+        start = time.monotonic()
+        results = self._run_concurrently(4, lambda i: flight.do(i, slow, i))
+
+        self.assertEqual(results, [0, 1, 2, 3])
+        self.assertLess(time.monotonic() - start, 0.6)
+
+    def test_exception_is_shared(self):
+        """Test that every waiter sees the failure and the key is released"""
+        flight = single_flight.SingleFlight()
+
+        def failing():
+            time.sleep(0.1)
+            raise RuntimeError("boom")
+
+        results = self._run_concurrently(4, lambda i: flight.do("AAPL", failing))
+
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        self.assertEqual(flight.do("AAPL", lambda: "recovered"), "recovered")
+
+    def test_sequential_calls_run_again(self):
+        """Test that a completed call does not answer later ones"""
+        flight = single_flight.SingleFlight()
+        counter = iter(range(10))
+
+        self.assertEqual(flight.do("k", lambda: next(counter)), 0)
+        self.assertEqual(flight.do("k", lambda: next(counter)), 1)
+
+    def test_concurrent_coroutines_share_one_execution(self):
+        """Test that coroutines for the same key all get the single execution's result"""
+        flight = single_flight.SingleFlight()
+        calls = []
+
+        async def slow(value):
+            calls.append(value)
+            await asyncio.sleep(0.1)
+            return {"value": value}
+
+        async def run():
+            return await asyncio.gather(*(flight.do_async("AAPL", slow, 42) for _ in range(8)))
+
+        results = asyncio.run(run())
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(flight.coalesced, 7)
+        self.assertFalse(flight.in_flight("AAPL"))
+
+    def test_coroutine_waits_on_thread_without_blocking_the_loop(self):
+        """Test that a coroutine joins a thread's execution while other coroutines keep running"""
+        flight = single_flight.SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocking():
+            started.set()
+            release.wait()
+            return "from thread"
+
+        thread = threading.Thread(target=lambda: flight.do("AAPL", blocking))
+        thread.start()
+        started.wait()
+
+        async def run():
+            waiting = asyncio.ensure_future(flight.do_async("AAPL", AsyncMock(return_value="from coroutine")))
+            # The loop stays responsive while the coroutine waits on the thread
+            await asyncio.sleep(0.05)
+            self.assertFalse(waiting.done())
+            release.set()
+            return await waiting
+
+        self.assertEqual(asyncio.run(run()), "from thread")
+        thread.join()
+        self.assertEqual(flight.coalesced, 1)
+
+
+class TestAnalyzeTickerCoalescing(unittest.TestCase):
+    """Test cases for single-flight analyze_ticker"""
+
+    def setUp(self):
+        """Set up test environment before each test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = cache_backend.SQLiteStore(os.path.join(self.temp_dir, "analyses.sqlite3"))
+        self.cache = cache_backend.TieredCache(store=self.store)
+
+    def tearDown(self):
+        """Clean up after each test"""
+        self.store.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_concurrent_requests_run_pipeline_once(self):
+        """Test that simultaneous requests for one uncached ticker scrape it once"""
+        scraper = MagicMock()
+        scraper.search_company.return_value = ("0000320193", None)
+        scraper.get_recent_10k_url.return_value = (
+            "https://www.sec.gov/Archives/edgar/data/320193/000032019322000108/aapl-20220924_htm.xml", None
+        )
+
+        def extract(url):
+            time.sleep(0.2)
+            return {"revenue": 1}, None
+
+        scraper.extract_financial_data.side_effect = extract
+        results = []
+
+        with patch('app.get_analysis_cache', return_value=self.cache):
+            threads = [threading.Thread(target=lambda: results.append(app.analyze_ticker("aapl", scraper=scraper))) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(scraper.extract_financial_data.call_count, 1)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(metrics["revenue"] == 1 and error is None for metrics, error in results))
+
+    def test_concurrent_async_requests_run_pipeline_once(self):
+        """Test that simultaneous coroutines for one uncached ticker scrape it once"""
+        scraper = MagicMock()
+        scraper.search_company = AsyncMock(return_value=("0000320193", None))
+        scraper.get_recent_10k_url = AsyncMock(return_value=(
+            "https://www.sec.gov/Archives/edgar/data/320193/000032019322000108/aapl-20220924_htm.xml", None
+        ))
+
+        async def extract(url):
+            await asyncio.sleep(0.2)
+            return {"revenue": 1}, None
+
+        scraper.extract_financial_data = AsyncMock(side_effect=extract)
+
+        async def run():
+            return await asyncio.gather(*(async_scraper.analyze_ticker("aapl", scraper) for _ in range(5)))
+
+        with patch('app.get_analysis_cache', return_value=self.cache):
+            results = asyncio.run(run())
+
+        self.assertEqual(scraper.extract_financial_data.call_count, 1)
+        self.assertTrue(all(metrics["revenue"] == 1 and error is None for metrics, error in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
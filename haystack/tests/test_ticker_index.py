@@ -0,0 +1,117 @@
+import unittest
+import json
+import os
+import sys
+import shutil
+import tempfile
+import time
+from unittest.mock import MagicMock
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ticker_index
+
+
+class TestTickerIndex(unittest.TestCase):
+    """Test cases for the ticker/CIK index"""
+
+    def setUp(self):
+        """Set up test environment before each test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.temp_dir, "company_tickers.json")
+        self.index = ticker_index.TickerIndex(cache_file=self.cache_file)
+        self.sample_company_tickers = {
+            "0": {"cik_str": 320193, "ticker": "AAPL", "title": "Apple Inc."},
+            "1": {"cik_str": 789019, "ticker": "MSFT", "title": "Microsoft Corp"},
+            "2": {"cik_str": 1652044, "ticker": "GOOGL", "title": "Alphabet Inc."},
+            "3": {"cik_str": 1652044, "ticker": "GOOG", "title": "Alphabet Inc."}
+        }
+
+    def tearDown(self):
+        """Clean up after each test"""
+        shutil.rmtree(self.temp_dir)
+
+    def _fetcher(self, status_code=200, etag='"v1"'):
+        """Returns a mock fetch function serving the sample ticker list"""
+        response = MagicMock(status_code=status_code, headers={'ETag': etag})
+        response.json.return_value = self.sample_company_tickers
+        return MagicMock(return_value=response)
+
+    def test_lookups_both_directions(self):
+        """Test ticker to CIK and CIK to ticker lookups"""
+        self.index.build(self.sample_company_tickers)
+
+        self.assertEqual(self.index.get_cik("aapl"), "0000320193")
+        self.assertEqual(self.index.get_cik(" MSFT "), "0000789019")
+        self.assertIsNone(self.index.get_cik("NONEXIST"))
+        self.assertEqual(self.index.get_ticker(320193), "AAPL")
+        self.assertEqual(self.index.get_ticker("0001652044"), "GOOGL")  # First listed share class
+        self.assertEqual(self.index.get_cik("GOOG"), "0001652044")
+        self.assertIsNone(self.index.get_ticker("not-a-cik"))
+        self.assertIn("AAPL", self.index)
+
+    def test_loads_once_per_ttl(self):
+        """Test that the ticker list is downloaded only once while fresh"""
+        fetch = self._fetcher()
+        for _ in range(3):
+            self.assertIsNone(self.index.ensure_loaded(fetch, {"User-Agent": "test"}))
+
+        fetch.assert_called_once_with(ticker_index.COMPANY_TICKERS_URL, {"User-Agent": "test"})
+        self.assertEqual(len(self.index), 4)
+
+    def test_persists_to_disk(self):
+        """Test that a new index instance is served from disk without a download"""
+        self.index.ensure_loaded(self._fetcher())
+
+        reloaded = ticker_index.TickerIndex(cache_file=self.cache_file)
+        fetch = self._fetcher()
+        self.assertIsNone(reloaded.ensure_loaded(fetch))
+
+        fetch.assert_not_called()
+        self.assertEqual(reloaded.get_ticker(1652044), "GOOGL")
+        self.assertEqual(reloaded.etag, '"v1"')
+
+    def test_revalidates_with_etag_when_stale(self):
+        """Test that a stale index sends If-None-Match and keeps its data on 304"""
+        self.index.ensure_loaded(self._fetcher())
+        self.index.fetched_at = time.time() - 2 * self.index.ttl
+
+        fetch = self._fetcher(status_code=304)
+        self.assertIsNone(self.index.ensure_loaded(fetch, {"User-Agent": "test"}))
+
+        fetch.assert_called_once_with(ticker_index.COMPANY_TICKERS_URL, {"User-Agent": "test", "If-None-Match": '"v1"'})
+        self.assertTrue(self.index.is_fresh())
+        self.assertEqual(self.index.get_cik("AAPL"), "0000320193")
+
+    def test_keeps_stale_data_when_refresh_fails(self):
+        """Test that a failed refresh falls back to the data already loaded"""
+        self.index.ensure_loaded(self._fetcher())
+        self.index.fetched_at = 0
+
+        self.assertIsNone(self.index.ensure_loaded(MagicMock(return_value=None)))
+        self.assertEqual(self.index.get_cik("MSFT"), "0000789019")
+
+    def test_reports_error_without_any_data(self):
+        """Test that a failed first load is reported as an error"""
+        error = self.index.ensure_loaded(MagicMock(return_value=None))
+        self.assertEqual(error, "Error fetching company tickers")
+
+    def test_ignores_corrupt_disk_copy(self):
+        """Test that an unreadable on-disk copy triggers a download"""
+        with open(self.cache_file, 'w') as f:
+            f.write("{not json")
+
+        fetch = self._fetcher()
+        self.assertIsNone(self.index.ensure_loaded(fetch))
+        fetch.assert_called_once()
+        with open(self.cache_file, 'r') as f:
+            self.assertEqual(json.load(f)['etag'], '"v1"')
+
+    def test_process_wide_index_is_shared(self):
+        """Test that get_ticker_index returns the same instance every time"""
+        self.assertIs(ticker_index.get_ticker_index(), ticker_index.get_ticker_index())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import value_parser
+
+
+class TestParseDisplayValue(unittest.TestCase):
+    """Test cases for human-formatted financial text"""
+
+    def test_formats(self):
+        """Test currency symbols, separators and unit suffixes"""
+        test_cases = [
+            ("$394,328 million", 394328000000),
+            ("$1.5 billion", 1500000000),
+            ("1.5b", 1500000000),
+            ("2.1bn", 2100000000),
+            ("750m", 750000000),
+            ("€12 thousand", 12000),
+            ("$1,234.56", 1234.56),
+            ("(1,234)", -1234),
+            ("-$5 million", -5000000),
+            ("  42  ", 42),
+        ]
+        for text, expected in test_cases:
+            self.assertEqual(value_parser.parse_display_value(text), expected, text)
+
+    def test_letters_elsewhere_are_not_multipliers(self):
+        """Test that a 'b' or 'm' outside the unit suffix is rejected, not multiplied"""
+        for text in ("invalid", "member 5", "5 bananas", "b5", "(5", "1,234 (restated)", "", None):
+            self.assertIsNone(value_parser.parse_display_value(text), text)
+
+
+class TestParseXbrlValue(unittest.TestCase):
+    """Test cases for numeric XBRL fact text"""
+
+    def test_plain_numerics(self):
+        """Test the fast path for instance document numerics, including signs"""
+        self.assertEqual(value_parser.parse_xbrl_value("394328000000"), 394328000000)
+        self.assertEqual(value_parser.parse_xbrl_value("-1234"), -1234)
+        self.assertEqual(value_parser.parse_xbrl_value("6.11"), 6.11)
+        self.assertEqual(value_parser.parse_xbrl_value("1.5E3"), 1500)
+
+    def test_decimals_round_to_reported_precision(self):
+        """Test that decimals drops float noise below the reported precision"""
+        self.assertEqual(value_parser.parse_xbrl_value("394328000000.0000001", "-6"), 394328000000)
+        self.assertEqual(value_parser.parse_xbrl_value("0.1000000001", "2"), 0.1)
+        self.assertEqual(value_parser.parse_xbrl_value("15908118000", "INF"), 15908118000)
+
+    def test_scale(self):
+        """Test that an inline XBRL scale multiplies the displayed number"""
+        self.assertEqual(value_parser.parse_xbrl_value("394,328", "-6", "6"), 394328000000)
+        self.assertIsNone(value_parser.parse_xbrl_value("1", None, "six"))
+
+    def test_non_numeric(self):
+        """Test that nil, text and non-string facts are None"""
+        for text in ("", "   ", "Apple Inc.", "nan", "inf", None, 5):
+            self.assertIsNone(value_parser.parse_xbrl_value(text), text)
+
+    def test_repeated_strings_hit_cache(self):
+        """Test that repeated values are answered from the LRU"""
+        value_parser.parse_xbrl_value.cache_clear()
+        for _ in range(3):
+            value_parser.parse_xbrl_value("99803000000", "-6")
+
+        self.assertEqual(value_parser.cache_info()['xbrl']['hits'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
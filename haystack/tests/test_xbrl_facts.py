@@ -0,0 +1,256 @@
+import unittest
+import os
+import sys
+import tracemalloc
+import xml.etree.ElementTree as ElementTree
+from unittest.mock import MagicMock
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+import ticker_index
+import xbrl_facts
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'aapl-20220924_htm.xml')
+
+
+class TestParseFactIndex(unittest.TestCase):
+    """Test cases for the single-pass XBRL fact index"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Parse the sample instance document once for all tests"""
+        with open(FIXTURE_PATH, 'rb') as f:
+            cls.content = f.read()
+        cls.index = xbrl_facts.parse_fact_index(cls.content)
+
+    def test_facts_are_keyed_by_prefixed_concept(self):
+        """Test that concepts carry the prefix declared in the document"""
+        self.assertIn('us-gaap:Assets', self.index)
+        self.assertIn('dei:EntityRegistrantName', self.index)
+        self.assertNotIn('Assets', self.index)
+        self.assertEqual(self.index.get('us-gaap:Goodwill'), [])
+
+    def test_facts_keep_document_order(self):
+        """Test that repeated concepts list every fact in the order reported"""
+        facts = self.index.get('us-gaap:RevenueFromContractWithCustomerExcludingAssessedTax')
+
+        self.assertEqual([fact.context.id for fact in facts], ['c-5', 'c-2', 'c-1'])
+        self.assertEqual(facts[-1].value, '394328000000')
+
+    def test_contexts_are_resolved(self):
+        """Test that facts carry their period and dimensional qualifiers"""
+        revenue = self.index.get('us-gaap:RevenueFromContractWithCustomerExcludingAssessedTax')
+        assets = self.index.get('us-gaap:Assets')
+
+        self.assertEqual(revenue[0].context.dimensions, (('srt:ProductOrServiceAxis', 'us-gaap:ProductMember'),))
+        self.assertEqual((revenue[2].context.start_date, revenue[2].context.end_date), ('2021-09-26', '2022-09-24'))
+        self.assertEqual(revenue[2].context.dimensions, ())
+        self.assertEqual(assets[1].context.instant, '2022-09-24')
+        self.assertIsNone(assets[1].context.end_date)
+
+    def test_units_and_decimals_are_resolved(self):
+        """Test that unit references become measures and decimals are kept"""
+        eps = self.index.get('us-gaap:EarningsPerShareDiluted')[0]
+        shares = self.index.get('dei:EntityCommonStockSharesOutstanding')[0]
+
+        self.assertEqual(self.index.get('us-gaap:Assets')[0].unit, 'iso4217:USD')
+        self.assertEqual(eps.unit, 'iso4217:USD/xbrli:shares')
+        self.assertEqual(eps.decimals, '2')
+        self.assertEqual(shares.unit, 'xbrli:shares')
+        self.assertEqual(shares.decimals, 'INF')
+
+    def test_contexts_declared_after_facts(self):
+        """Test that facts may precede the contexts and units they reference"""
+        content = (
+            b'<xbrli:xbrl xmlns:xbrli="http://www.xbrl.org/2003/instance" xmlns:gaap="http://fasb.org/us-gaap/2022">'
+            b'<gaap:Assets contextRef="i1" unitRef="u1" decimals="-6">100</gaap:Assets>'
+            b'<xbrli:context id="i1"><xbrli:period><xbrli:instant>2022-12-31</xbrli:instant></xbrli:period></xbrli:context>'
+            b'<xbrli:unit id="u1"><xbrli:measure>iso4217:USD</xbrli:measure></xbrli:unit>'
+            b'</xbrli:xbrl>'
+        )
+        fact = xbrl_facts.parse_fact_index(content).get('gaap:Assets')[0]
+
+        self.assertEqual(fact.context.instant, '2022-12-31')
+        self.assertEqual(fact.unit, 'iso4217:USD')
+
+    def test_malformed_document_raises(self):
+        """Test that a truncated document is reported rather than half-indexed"""
+        with self.assertRaises(ElementTree.ParseError):
+            xbrl_facts.parse_fact_index(self.content[:len(self.content) // 2])
+
+
+class TestFactIndexStreaming(unittest.TestCase):
+    """Test cases for building the fact index from a chunked stream"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Load the sample instance document once for all tests"""
+        with open(FIXTURE_PATH, 'rb') as f:
+            cls.content = f.read()
+
+    def _chunks(self, content, size):
+        """Splits content into chunks of at most `size` bytes"""
+        return (content[i:i + size] for i in range(0, len(content), size))
+
+    def test_stream_matches_whole_document(self):
+        """Test that chunk boundaries do not change the parsed facts"""
+        whole = xbrl_facts.parse_fact_index(self.content)
+        streamed = xbrl_facts.parse_fact_index_stream(self._chunks(self.content, 7))
+
+        self.assertEqual(streamed.facts, whole.facts)
+        self.assertEqual(streamed.contexts, whole.contexts)
+        self.assertEqual(streamed.units, whole.units)
+
+    def test_concept_filter(self):
+        """Test that only the requested concepts are kept"""
+        index = xbrl_facts.parse_fact_index_stream(self._chunks(self.content, 256), concepts={'us-gaap:Assets', 'dei:EntityRegistrantName'})
+
+        self.assertEqual(sorted(index.concepts()), ['dei:EntityRegistrantName', 'us-gaap:Assets'])
+        self.assertEqual(len(index), 3)
+        self.assertIn('c-5', index.contexts)
+
+    def test_truncated_stream_raises(self):
+        """Test that a stream cut off mid-document is reported"""
+        with self.assertRaises(ElementTree.ParseError):
+            xbrl_facts.parse_fact_index_stream(self._chunks(self.content[:-20], 256))
+
+    def test_peak_memory_independent_of_document_size(self):
+        """Test that filtered-out facts are released as the stream is parsed"""
+        def document(fact_count):
+            yield b'<xbrli:xbrl xmlns:xbrli="http://www.xbrl.org/2003/instance" xmlns:us-gaap="http://fasb.org/us-gaap/2022">'
+            yield b'<xbrli:context id="c-1"><xbrli:period><xbrli:instant>2022-12-31</xbrli:instant></xbrli:period></xbrli:context>'
+            for i in range(fact_count):
+                yield b'<us-gaap:OtherAssets contextRef="c-1" unitRef="usd" decimals="-6">%d000000</us-gaap:OtherAssets>' % i
+            yield b'<us-gaap:Assets contextRef="c-1" unitRef="usd" decimals="-6">42</us-gaap:Assets></xbrli:xbrl>'
+
+        def peak(fact_count):
+            tracemalloc.start()
+            try:
+                index = xbrl_facts.parse_fact_index_stream(document(fact_count), concepts={'us-gaap:Assets'})
+                return tracemalloc.get_traced_memory()[1], index
+            finally:
+                tracemalloc.stop()
+
+        small_peak, _ = peak(1000)
+        large_peak, index = peak(50000)
+
+        self.assertEqual(index.get('us-gaap:Assets')[0].value, '42')
+        self.assertLess(large_peak, small_peak * 2)
+
+
+class TestResolveReportingPeriod(unittest.TestCase):
+    """Test cases for picking the filing's own fiscal-period contexts"""
+
+    def _index(self, contexts, facts=b''):
+        """Parses a minimal instance document from context and fact markup"""
+        return xbrl_facts.parse_fact_index(
+            b'<xbrli:xbrl xmlns:xbrli="http://www.xbrl.org/2003/instance" xmlns:xbrldi="http://xbrl.org/2006/xbrldi"'
+            b' xmlns:dei="http://xbrl.sec.gov/dei/2022">' + contexts + facts + b'</xbrli:xbrl>'
+        )
+
+    def _context(self, context_id, period, segment=b''):
+        """Builds context markup for a period given as (start, end) or an instant"""
+        if isinstance(period, tuple):
+            period_xml = b'<xbrli:startDate>%s</xbrli:startDate><xbrli:endDate>%s</xbrli:endDate>' % (period[0].encode(), period[1].encode())
+        else:
+            period_xml = b'<xbrli:instant>%s</xbrli:instant>' % period.encode()
+        return (b'<xbrli:context id="%s"><xbrli:entity>%s</xbrli:entity><xbrli:period>%s</xbrli:period></xbrli:context>'
+                % (context_id.encode(), segment, period_xml))
+
+    def test_sample_filing(self):
+        """Test that the current fiscal year is chosen over comparatives and segments"""
+        with open(FIXTURE_PATH, 'rb') as f:
+            index = xbrl_facts.parse_fact_index(f.read())
+
+        self.assertEqual(xbrl_facts.resolve_reporting_period(index), xbrl_facts.ReportingPeriod('2022-09-24', 'c-1', 'c-3'))
+
+    def test_annual_duration_preferred_over_quarter(self):
+        """Test that the longest duration ending on the period end is chosen"""
+        index = self._index(
+            self._context('q4', ('2022-10-01', '2022-12-31')) + self._context('fy', ('2022-01-01', '2022-12-31')),
+            b'<dei:DocumentPeriodEndDate contextRef="fy">2022-12-31</dei:DocumentPeriodEndDate>'
+        )
+
+        self.assertEqual(xbrl_facts.resolve_reporting_period(index).duration, 'fy')
+
+    def test_falls_back_to_latest_period_end(self):
+        """Test that documents without a usable cover page date use the latest plain context"""
+        segment = b'<xbrli:segment><xbrldi:explicitMember dimension="a:Axis">a:Member</xbrldi:explicitMember></xbrli:segment>'
+        index = self._index(
+            self._context('fy21', ('2021-01-01', '2021-12-31')) + self._context('fy22', ('2022-01-01', '2022-12-31'))
+            + self._context('i22', '2022-12-31') + self._context('seg23', ('2023-01-01', '2023-12-31'), segment),
+            b'<dei:DocumentPeriodEndDate contextRef="fy22">December 31, 2022</dei:DocumentPeriodEndDate>'
+        )
+
+        self.assertEqual(xbrl_facts.resolve_reporting_period(index), xbrl_facts.ReportingPeriod('2022-12-31', 'fy22', 'i22'))
+
+    def test_no_contexts(self):
+        """Test that an empty document resolves to no contexts"""
+        self.assertEqual(xbrl_facts.resolve_reporting_period(self._index(b'')), xbrl_facts.ReportingPeriod(None, None, None))
+
+
+class TestParseFinancialData(unittest.TestCase):
+    """Test cases for computing metrics from a fact index"""
+
+    def setUp(self):
+        """Set up test environment before each test"""
+        with open(FIXTURE_PATH, 'rb') as f:
+            self.content = f.read()
+        self.scraper = app.EdgarScraper(ticker_index=ticker_index.TickerIndex(), validator_cache=MagicMock(), filing_index=MagicMock())
+
+    def test_extract_financial_data_streams_response(self):
+        """Test that the response body is read in chunks rather than through .content"""
+        response = MagicMock()
+        response.iter_content.return_value = iter([self.content[i:i + 100] for i in range(0, len(self.content), 100)])
+        session = MagicMock()
+        session.get.return_value = response
+        scraper = app.EdgarScraper(ticker_index=ticker_index.TickerIndex(), session=session, validator_cache=MagicMock(), filing_index=MagicMock())
+
+        metrics, error = scraper.extract_financial_data("https://www.sec.gov/Archives/sample.xml")
+
+        self.assertIsNone(error)
+        self.assertEqual(metrics['company_name'], "Apple Inc.")
+        self.assertTrue(session.get.call_args.kwargs['stream'])
+        response.close.assert_called_once()
+
+    def test_text_facts(self):
+        """Test that names and dates are read as text"""
+        metrics = self.scraper._parse_financial_data(self.content)
+
+        self.assertEqual(metrics['company_name'], "Apple Inc.")
+        self.assertEqual(metrics['fiscal_year_end'], "2022-09-24")
+        self.assertIsNone(metrics['filing_date'])
+
+    def test_metrics_use_current_period(self):
+        """Test that prior-year and segment facts listed first are not picked"""
+        metrics = self.scraper._parse_financial_data(self.content)
+
+        self.assertEqual(metrics['revenue'], 394328000000)
+        self.assertEqual(metrics['net_income'], 99803000000)
+        self.assertEqual(metrics['operating_income'], 119437000000)
+        self.assertEqual(metrics['total_assets'], 352755000000)
+        self.assertEqual(metrics['total_liabilities'], 302083000000)
+        self.assertEqual(metrics['cash_and_equivalents'], 23646000000)
+        self.assertEqual(metrics['shares_outstanding'], 15908118000)
+        self.assertEqual(metrics['equity'], 50672000000)
+        self.assertAlmostEqual(metrics['profit_margin'], 25.31, places=2)
+
+    def test_missing_intangibles_count_as_zero(self):
+        """Test that tangible assets are computed when no intangibles are reported"""
+        metrics = self.scraper._parse_financial_data(self.content)
+
+        self.assertIsNotNone(metrics['net_tangible_assets_per_share'])
+
+    def test_get_xbrl_value_by_context(self):
+        """Test that an explicit context selects the matching fact"""
+        index = xbrl_facts.parse_fact_index(self.content)
+
+        self.assertEqual(self.scraper._get_xbrl_value(index, 'us-gaap:NetIncomeLoss', 'c-1'), 99803000000)
+        self.assertEqual(self.scraper._get_xbrl_value(index, 'us-gaap:NetIncomeLoss', 'c-2'), 94680000000)
+        self.assertIsNone(self.scraper._get_xbrl_value(index, 'us-gaap:NetIncomeLoss', 'c-9'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+import time
+
+COMPANY_TICKERS_URL = "https://www.sec.gov/files/company_tickers.json"
+DEFAULT_CACHE_FILE = os.path.join('cache', 'company_tickers.json')
+# SEC regenerates company_tickers.json daily
+DEFAULT_TTL = 24 * 60 * 60
+
+
+class TickerIndex:
+    """
+    In-memory ticker <-> CIK index backed by a JSON file on disk.
+
+    The SEC ticker list is downloaded at most once per TTL and revalidated with
+    its ETag, so lookups are dictionary hits instead of a download and a scan.
+    """
+
+    def __init__(self, cache_file=DEFAULT_CACHE_FILE, ttl=DEFAULT_TTL):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.etag = None
+        self.fetched_at = 0
+        self._by_ticker = {}
+        self._by_cik = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._by_ticker)
+
+    def __contains__(self, ticker):
+        return self.get_cik(ticker) is not None
+
+    def is_fresh(self):
+        """Atomically reports whether the index is populated and younger than the TTL."""
+        return bool(self._by_ticker) and time.time() - self.fetched_at < self.ttl
+
+    def get_cik(self, ticker):
+        """Atomically returns the zero-padded CIK for a ticker, or None if unknown."""
+        if not isinstance(ticker, str):
+            return None
+        return self._by_ticker.get(ticker.strip().upper())
+
+    def get_ticker(self, cik):
+        """Atomically returns the primary ticker for a CIK (int or str, padded or not), or None."""
+        try:
+            return self._by_cik.get(str(int(cik)).zfill(10))
+        except (ValueError, TypeError):
+            return None
+
+    def build(self, companies):
+        """
+        Replaces the index contents with the entries of a company_tickers.json payload.
+
+        Args:
+            companies (dict): The parsed payload, keyed by row number.
+        """
+        by_ticker = {}
+        by_cik = {}
+        for company in companies.values():
+            ticker = str(company['ticker']).upper()
+            cik = str(company['cik_str']).zfill(10)
+            by_ticker.setdefault(ticker, cik)
+            # The first row listed for a company is its primary share class
+            by_cik.setdefault(cik, ticker)
+        self._by_ticker = by_ticker
+        self._by_cik = by_cik
+
+    def replace(self, companies):
+        """
+        Replaces the index with a company_tickers.json-style payload from another source, e.g. a bulk snapshot, and saves it.
+
+        Args:
+            companies (dict): Rows of {'cik_str': ..., 'ticker': ...} keyed by row number.
+        """
+        with self._lock:
+            self.build(companies)
+            self.etag = None
+            self.fetched_at = time.time()
+            self._save_to_disk()
+
+    def ensure_loaded(self, fetch_response, headers=None):
+        """
+        Loads the index from memory, disk or the SEC, whichever is the freshest valid source.
+
+        Args:
+            fetch_response (callable): Called as fetch_response(url, headers) and
+                returning a requests.Response, or None on failure.
+            headers (dict): Base request headers, e.g. the SEC User-Agent.
+
+        Returns:
+            str: An error message, or None if the index is usable.
+        """
+        if self.is_fresh():
+            return None
+        with self._lock:
+            if self.is_fresh():
+                return None
+            if not self._by_ticker:
+                self._load_from_disk()
+                if self.is_fresh():
+                    return None
+            return self._refresh(fetch_response, headers or {})
+
+    def _refresh(self, fetch_response, headers):
+        """Revalidates the index against the SEC, keeping stale data if the download fails."""
+        request_headers = dict(headers)
+        if self.etag and self._by_ticker:
+            request_headers['If-None-Match'] = self.etag
+
+        response = fetch_response(COMPANY_TICKERS_URL, request_headers)
+        if response is None:
+            return None if self._by_ticker else "Error fetching company tickers"
+
+        if response.status_code != 304:
+            try:
+                self.build(response.json())
+            except (ValueError, KeyError, AttributeError) as e:
+                print(f"Error parsing company tickers: {e}")
+                return None if self._by_ticker else "Error fetching company tickers"
+            self.etag = response.headers.get('ETag')
+        self.fetched_at = time.time()
+        self._save_to_disk()
+        return None
+
+    def _load_from_disk(self):
+        """Atomically populates the index from the on-disk copy if one exists."""
+        if not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r') as f:
+                cached = json.load(f)
+            self.build(cached['companies'])
+            self.etag = cached.get('etag')
+            self.fetched_at = cached.get('fetched_at', 0)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error loading ticker index from {self.cache_file}: {e}")
+
+    def _save_to_disk(self):
+        """Atomically writes the index to disk via a temporary file."""
+        companies = {
+            str(i): {'cik_str': int(cik), 'ticker': ticker}
+            for i, (ticker, cik) in enumerate(self._by_ticker.items())
+        }
+        directory = os.path.dirname(self.cache_file)
+        # Unique per process and thread, since several workers may refresh the shared file at once
+        temp_file = f"{self.cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(temp_file, 'w') as f:
+                json.dump({'etag': self.etag, 'fetched_at': self.fetched_at, 'companies': companies}, f)
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            print(f"Error saving ticker index to {self.cache_file}: {e}")
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+def get_ticker_index():
+    """Atomically returns the process-wide TickerIndex, creating it on first use."""
+    global _default_index
+    if _default_index is None:
+        with _default_index_lock:
+            if _default_index is None:
+                _default_index = TickerIndex()
+    return _default_index
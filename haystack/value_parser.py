@@ -0,0 +1,94 @@
+import functools
+import re
+
+# Plain XBRL numerics: optional sign, digits, optional fraction and exponent
+_NUMERIC = re.compile(r'[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?')
+# Display text such as "$1.5 billion", "(1,234)", "-€750m" or "1,234.56"
+_DISPLAY = re.compile(
+    r'(?P<open>\()?\s*(?P<sign>[+-])?\s*[$£€]?\s*(?P<number>\d[\d,]*(?:\.\d+)?|\.\d+)\s*'
+    r'(?P<unit>billion|million|thousand|bn|mm|b|m|k)?\s*(?P<close>\))?',
+    re.IGNORECASE
+)
+_MULTIPLIERS = {
+    'billion': 1_000_000_000, 'bn': 1_000_000_000, 'b': 1_000_000_000,
+    'million': 1_000_000, 'mm': 1_000_000, 'm': 1_000_000,
+    'thousand': 1_000, 'k': 1_000,
+}
+# Distinct strings remembered; filings repeat the same values across contexts and a batch repeats concepts
+CACHE_SIZE = 8192
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def parse_display_value(text):
+    """
+    Parses human-formatted financial text such as "$394,328 million" or "1.5b".
+
+    A multiplier applies only as a unit suffix directly after the number, and
+    parentheses or a leading minus make the value negative.
+
+    Args:
+        text (str): The text to parse.
+
+    Returns:
+        float: The value, or None if the text is not a single number.
+    """
+    if not isinstance(text, str):
+        return None
+    match = _DISPLAY.fullmatch(text.strip())
+    if match is None or bool(match.group('open')) != bool(match.group('close')):
+        return None
+    value = float(match.group('number').replace(',', ''))
+    unit = match.group('unit')
+    if unit:
+        value *= _MULTIPLIERS[unit.lower()]
+    if match.group('open') or match.group('sign') == '-':
+        value = -value
+    return value
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def parse_xbrl_value(text, decimals=None, scale=None):
+    """
+    Parses the text of a numeric XBRL fact.
+
+    Plain numerics, which is nearly every fact in an instance document, take a
+    single float() with no substitutions; anything else falls back to
+    parse_display_value.
+
+    Args:
+        text (str): The fact's text content.
+        decimals (str): The fact's `decimals` attribute, e.g. '-6' or 'INF'; the
+            value is rounded to that precision to drop float noise.
+        scale (str): An inline XBRL `scale` attribute, the power of ten the
+            displayed text is multiplied by.
+
+    Returns:
+        float: The value, or None if the text is empty or not numeric.
+    """
+    if not isinstance(text, str):
+        return None
+    text = text.strip()
+    if not text:
+        return None
+    if _NUMERIC.fullmatch(text):
+        value = float(text)
+    else:
+        value = parse_display_value(text)
+        if value is None:
+            return None
+    if scale:
+        try:
+            value *= 10 ** int(scale)
+        except ValueError:
+            return None
+    if decimals and decimals != 'INF':
+        try:
+            value = round(value, int(decimals))
+        except ValueError:
+            pass
+    return value
+
+
+def cache_info():
+    """Atomically returns the LRU statistics of both parsers as a dict."""
+    return {'display': parse_display_value.cache_info()._asdict(), 'xbrl': parse_xbrl_value.cache_info()._asdict()}
@@ -0,0 +1,71 @@
+"""
+Production entry point for preforking WSGI servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Importing this module, which gunicorn does once in the master before forking,
+switches every process to the shared SQLite rate-limit budget and warms the
+ticker index so workers start with it in memory.
+"""
+import fcntl
+import os
+import rate_limiter
+
+# Must be set before the first get_rate_limiter() call in any process
+os.environ.setdefault(rate_limiter.SHARED_DB_ENV, rate_limiter.DEFAULT_SHARED_DB_PATH)
+
+import app
+import prefetch
+from ticker_index import get_ticker_index
+
+# Held by the one worker that runs the watchlist prefetcher
+PREFETCH_LOCK_FILE = os.path.join('cache', 'prefetch.lock')
+
+_prefetch_lock = None
+
+
+def warm_up():
+    """
+    Loads the ticker index from disk or the SEC so forked workers inherit it.
+
+    Returns:
+        str: An error message, or None if the index is usable.
+    """
+    scraper = app.EdgarScraper()
+    # Offline deployments never fetch; the imported snapshot is used however old it is
+    fetch_response = (lambda url, headers: None) if app.OFFLINE_MODE else scraper._fetch_response
+    error = get_ticker_index().ensure_loaded(fetch_response, scraper.headers)
+    if error:
+        print(f"Ticker index warm-up failed: {error}")
+    return error
+
+
+def start_background_tasks(lock_file=PREFETCH_LOCK_FILE):
+    """
+    Starts the watchlist prefetcher in exactly one worker process.
+
+    Workers race for an exclusive lock on `lock_file`; the winner holds it for its
+    lifetime and runs the prefetcher. If that worker exits, the lock is released
+    and the worker started in its place takes over.
+
+    Returns:
+        prefetch.Prefetcher: The prefetcher if this worker runs it, otherwise None.
+    """
+    global _prefetch_lock
+    if _prefetch_lock is not None:
+        return prefetch.start_from_environment()
+    directory = os.path.dirname(lock_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    lock = open(lock_file, 'a')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return None
+    _prefetch_lock = lock
+    return prefetch.start_from_environment()
+
+
+warm_up()
+application = app.app
@@ -0,0 +1,255 @@
+import collections
+import datetime
+import xml.etree.ElementTree as ElementTree
+
+XBRLI_NS = 'http://www.xbrl.org/2003/instance'
+XBRLDI_NS = 'http://xbrl.org/2006/xbrldi'
+
+# A reporting context: the period a fact covers and any dimensional qualifiers (segments)
+Context = collections.namedtuple('Context', ['id', 'start_date', 'end_date', 'instant', 'dimensions'])
+# One reported value for a concept such as 'us-gaap:Assets'
+Fact = collections.namedtuple('Fact', ['concept', 'value', 'context', 'unit', 'decimals'])
+# The contexts of a filing's own fiscal period: flows use `duration`, balances use `instant`
+ReportingPeriod = collections.namedtuple('ReportingPeriod', ['end_date', 'duration', 'instant'])
+
+
+def _split_tag(tag):
+    """Atomically splits an ElementTree '{namespace}local' tag into (namespace, local)."""
+    if tag.startswith('{'):
+        namespace, local = tag[1:].split('}', 1)
+        return namespace, local
+    return '', tag
+
+
+def _child_text(element, namespace, name):
+    """Atomically returns the stripped text of a direct or nested child, or None."""
+    child = element.find(f'.//{{{namespace}}}{name}')
+    if child is None or child.text is None:
+        return None
+    return child.text.strip()
+
+
+def _parse_context(element):
+    """Atomically builds a Context from an xbrli:context element."""
+    dimensions = tuple(
+        (member.get('dimension'), (member.text or '').strip())
+        for member in element.iter()
+        if _split_tag(member.tag)[1] in ('explicitMember', 'typedMember')
+    )
+    return Context(
+        id=element.get('id'),
+        start_date=_child_text(element, XBRLI_NS, 'startDate'),
+        end_date=_child_text(element, XBRLI_NS, 'endDate'),
+        instant=_child_text(element, XBRLI_NS, 'instant'),
+        dimensions=dimensions
+    )
+
+
+def _parse_unit(element):
+    """Atomically returns a unit's measure, e.g. 'iso4217:USD' or 'iso4217:USD/xbrli:shares'."""
+    measures = [(measure.text or '').strip() for measure in element.iter(f'{{{XBRLI_NS}}}measure')]
+    divide = element.find(f'{{{XBRLI_NS}}}divide')
+    if divide is not None and len(measures) == 2:
+        return f"{measures[0]}/{measures[1]}"
+    return '*'.join(measures)
+
+
+class FactIndex:
+    """
+    Every fact of an XBRL instance document, indexed by prefixed concept name.
+
+    Built in a single pass, so looking up a metric is a dict hit rather than a
+    scan of the whole document.
+    """
+
+    def __init__(self):
+        self.facts = {}
+        self.contexts = {}
+        self.units = {}
+        self._by_context = {}
+
+    def __len__(self):
+        return sum(len(facts) for facts in self.facts.values())
+
+    def __contains__(self, concept):
+        return concept in self.facts
+
+    def concepts(self):
+        """Atomically returns the names of all concepts with at least one fact."""
+        return list(self.facts)
+
+    def get(self, concept):
+        """Atomically returns all facts for a concept in document order, or an empty list."""
+        return self.facts.get(concept, [])
+
+    def find(self, concept, context_id):
+        """Atomically returns the first fact for a concept in the given context, or None."""
+        return self._by_context.get((concept, context_id))
+
+    def add(self, fact):
+        """Atomically adds a fact to the index."""
+        self.facts.setdefault(fact.concept, []).append(fact)
+        self._by_context.setdefault((fact.concept, fact.context.id), fact)
+
+
+def _days_between(start_date, end_date):
+    """Atomically returns the number of days between two ISO dates, or 0 if either is unparseable."""
+    try:
+        return (datetime.date.fromisoformat(end_date) - datetime.date.fromisoformat(start_date)).days
+    except (TypeError, ValueError):
+        return 0
+
+
+def resolve_reporting_period(index):
+    """
+    Picks the non-dimensional contexts that cover the filing's own fiscal period.
+
+    The period end is dei:DocumentPeriodEndDate, falling back to the latest date
+    any non-dimensional context ends on. Prior-year comparatives and segment
+    breakdowns share concepts with the headline figures, so lookups should be
+    pinned to these contexts rather than take the first fact in document order.
+
+    Args:
+        index (FactIndex): The parsed instance document.
+
+    Returns:
+        ReportingPeriod: The period end date and the ids of the longest duration
+        context ending on it and the instant context at it; a field is None if
+        the document has no such context.
+    """
+    plain_contexts = [context for context in index.contexts.values() if not context.dimensions]
+
+    period_ends = {context.end_date or context.instant for context in plain_contexts} - {None}
+    # The cover page date may be free text, so also try the end of the context it is reported in
+    candidates = [candidate for fact in index.get('dei:DocumentPeriodEndDate')[:1] for candidate in (fact.value, fact.context.end_date)]
+    end_date = next((candidate for candidate in candidates if candidate in period_ends), max(period_ends, default=None))
+    if end_date is None:
+        return ReportingPeriod(None, None, None)
+
+    durations = [context for context in plain_contexts if context.end_date == end_date]
+    duration = max(durations, key=lambda context: _days_between(context.start_date, context.end_date), default=None)
+    instant = next((context for context in plain_contexts if context.instant == end_date), None)
+    return ReportingPeriod(end_date, duration.id if duration else None, instant.id if instant else None)
+
+
+class FactIndexParser:
+    """
+    Incremental builder of a FactIndex from XBRL instance bytes fed in chunks.
+
+    Each top-level element is dropped from the tree once it has been indexed, so
+    memory grows with the facts kept rather than with the document. Passing
+    `concepts` keeps only facts for those prefixed concept names.
+
+    Usage:
+        parser = FactIndexParser(concepts={'us-gaap:Assets'})
+        for chunk in chunks:
+            parser.feed(chunk)
+        index = parser.close()
+    """
+
+    def __init__(self, concepts=None):
+        self.concepts = frozenset(concepts) if concepts is not None else None
+        self.index = FactIndex()
+        self._parser = ElementTree.XMLPullParser(events=('start-ns', 'start', 'end'))
+        self._prefixes = {}
+        self._raw_facts = []
+        self._root = None
+        self._depth = 0
+
+    def feed(self, data):
+        """
+        Parses the next chunk of the document.
+
+        Raises:
+            xml.etree.ElementTree.ParseError: If the document is not well-formed XML.
+        """
+        self._parser.feed(data)
+        self._drain()
+
+    def close(self):
+        """
+        Finishes parsing and returns the FactIndex.
+
+        Raises:
+            xml.etree.ElementTree.ParseError: If the document is truncated or not well-formed.
+        """
+        self._parser.close()
+        self._drain()
+        # Contexts and units may follow the facts that reference them, so resolve them last
+        for concept, value, context_ref, unit_ref, decimals in self._raw_facts:
+            context = self.index.contexts.get(context_ref) or Context(context_ref, None, None, None, ())
+            self.index.add(Fact(concept, value, context, self.index.units.get(unit_ref, unit_ref), decimals))
+        self._raw_facts = []
+        return self.index
+
+    def _drain(self):
+        """Atomically indexes the elements completed by the data fed so far."""
+        for event, item in self._parser.read_events():
+            if event == 'start-ns':
+                prefix, uri = item
+                # Keep the first prefix declared for a namespace
+                self._prefixes.setdefault(uri, prefix)
+            elif event == 'start':
+                if self._root is None:
+                    self._root = item
+                self._depth += 1
+            else:
+                self._depth -= 1
+                self._handle_element(item)
+                if self._depth == 1:
+                    # A direct child of the root is complete; release it and everything below it
+                    del self._root[:]
+
+    def _handle_element(self, element):
+        """Atomically records a completed context, unit or fact element."""
+        namespace, local = _split_tag(element.tag)
+        if namespace == XBRLI_NS and local == 'context':
+            self.index.contexts[element.get('id')] = _parse_context(element)
+        elif namespace == XBRLI_NS and local == 'unit':
+            self.index.units[element.get('id')] = _parse_unit(element)
+        elif element.get('contextRef') is not None:
+            prefix = self._prefixes.get(namespace)
+            concept = f"{prefix}:{local}" if prefix else local
+            if self.concepts is None or concept in self.concepts:
+                self._raw_facts.append((concept, (element.text or '').strip(), element.get('contextRef'), element.get('unitRef'), element.get('decimals')))
+
+
+def parse_fact_index(content, concepts=None):
+    """
+    Parses an XBRL instance document into a FactIndex in one pass over its elements.
+
+    Args:
+        content (bytes): The instance document.
+        concepts (Iterable[str], optional): Prefixed concept names to keep; all facts if None.
+
+    Returns:
+        FactIndex: The facts keyed by concept name, e.g. 'us-gaap:NetIncomeLoss'.
+
+    Raises:
+        xml.etree.ElementTree.ParseError: If the document is not well-formed XML.
+    """
+    parser = FactIndexParser(concepts)
+    parser.feed(content)
+    return parser.close()
+
+
+def parse_fact_index_stream(chunks, concepts=None):
+    """
+    Parses an XBRL instance document from an iterable of byte chunks, e.g.
+    requests' Response.iter_content(), without holding the whole document.
+
+    Args:
+        chunks (Iterable[bytes]): The document in order.
+        concepts (Iterable[str], optional): Prefixed concept names to keep; all facts if None.
+
+    Returns:
+        FactIndex: The facts keyed by concept name.
+
+    Raises:
+        xml.etree.ElementTree.ParseError: If the document is not well-formed XML.
+    """
+    parser = FactIndexParser(concepts)
+    for chunk in chunks:
+        if chunk:
+            parser.feed(chunk)
+    return parser.close()
@@ -0,0 +1,257 @@
+import hashlib
+import json
+import logging
+import numpy
+import os
+import pandas
+import pickle
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "cache"
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 2
+# Version tag written into the pickles this store replaces
+LEGACY_VERSION = '1.0'
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def encode_column(series):
+    if isinstance(series.dtype, pandas.DatetimeTZDtype):
+        return series.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy(), {"tz": str(series.dt.tz)}
+    values = series.to_numpy()
+    if values.dtype.kind in "biufcmM":
+        return values, {}
+    # Strings and other objects become fixed-width unicode, so loading never needs allow_pickle
+    return series.astype(str).to_numpy(dtype=str), {}
+
+
+def decode_column(values, column):
+    if "tz" in column:
+        return pandas.Series(values).dt.tz_localize("UTC").dt.tz_convert(column["tz"])
+    return values
+
+
+def split_value(data):
+    # Returns (kind, frame, metadata) for the value types the data provider caches
+    if isinstance(data, pandas.DataFrame):
+        return "frame", data, {}
+    if isinstance(data, tuple) and len(data) == 3 and isinstance(data[0], pandas.DataFrame):
+        puts, expiry_date, price_range = data
+        return "option_chain", puts, {"expiry_date": expiry_date, "price_range": [float(bound) for bound in price_range]}
+    if isinstance(data, (int, float, numpy.number)) and not isinstance(data, bool):
+        return "scalar", None, {"value": float(data)}
+    raise TypeError(f"Cannot cache value of type {type(data).__name__}")
+
+
+def join_value(kind, frame, entry):
+    if kind == "frame":
+        return frame
+    if kind == "option_chain":
+        return frame, entry["expiry_date"], tuple(entry["price_range"])
+    return entry["value"]
+
+
+class CacheManager:
+    """Versioned, checksummed store of the provider's cached data: one .npy file per column and a JSON manifest.
+
+    Values are memoized in memory until the manifest entry they came from changes, and
+    each legacy pickle is checked once per manager and migrated if it is newer than its entry.
+    Loaded frames share memory with the read-only column files wherever their dtype allows.
+    """
+
+    def __init__(self, *, directory=DEFAULT_CACHE_DIR, cache_duration=86400, legacy_files=None):
+        self.directory = directory
+        self.cache_duration = cache_duration
+        self.legacy_files = dict(legacy_files or {})
+        self._manifest = None
+        self._manifest_stamp = None
+        self._memory = {}
+        self._verified = set()
+        self._legacy_checked = set()
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.directory, MANIFEST_FILE)
+
+    def _read_manifest(self):
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return {"version": FORMAT_VERSION, "entries": {}}
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._manifest_stamp:
+            return self._manifest
+        try:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to read cache manifest {self.manifest_path}: {e}")
+            return {"version": FORMAT_VERSION, "entries": {}}
+        if manifest.get("version") != FORMAT_VERSION:
+            logger.warning(f"Cache manifest version mismatch in {self.manifest_path}, expected {FORMAT_VERSION}")
+            manifest = {"version": FORMAT_VERSION, "entries": {}}
+        self._manifest, self._manifest_stamp = manifest, stamp
+        return manifest
+
+    def _write_manifest(self, manifest):
+        temp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+    def entry(self, name):
+        entry = self._read_manifest()["entries"].get(name)
+        return self._migrate_legacy(name, entry)
+
+    def age(self, name):
+        entry = self.entry(name)
+        return None if entry is None else time.time() - entry["saved_at"]
+
+    def is_valid(self, name):
+        age = self.age(name)
+        return age is not None and age < self.cache_duration
+
+    def _migrate_legacy(self, name, entry):
+        path = self.legacy_files.get(name)
+        if not path or name in self._legacy_checked:
+            return entry
+        self._legacy_checked.add(name)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return entry
+        if entry is not None and (entry.get("legacy_mtime") == mtime or mtime <= entry["saved_at"]):
+            return entry
+        try:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+        except (OSError, EOFError, pickle.PickleError, AttributeError, ImportError) as e:
+            logger.error(f"Failed to migrate legacy cache {path}: {e}")
+            return entry
+        if isinstance(data, dict) and 'version' in data:
+            if data['version'] != LEGACY_VERSION:
+                logger.warning(f"Cache version mismatch in {path}, expected {LEGACY_VERSION}")
+                return entry
+            data = data.get('data')
+        logger.info(f"Migrating legacy cache {path} into {self.directory}")
+        # The pickle's age carries over, so migration never makes stale data look fresh
+        return self.save(name, data, saved_at=mtime, legacy_mtime=mtime) or entry
+
+    def _column_path(self, file_name):
+        return os.path.join(self.directory, file_name)
+
+    def _verify(self, entry):
+        for column in entry.get("columns", []):
+            path = self._column_path(column["file"])
+            if (path, column["sha256"]) in self._verified:
+                continue
+            if file_checksum(path) != column["sha256"]:
+                raise ValueError(f"Checksum mismatch in {path}")
+            self._verified.add((path, column["sha256"]))
+
+    def columns(self, name):
+        """Returns the entry's columns as read-only memory-mapped arrays, or None if it is missing or corrupt."""
+        entry = self.entry(name)
+        if entry is None or "columns" not in entry:
+            return None
+        try:
+            self._verify(entry)
+            return {
+                column["name"]: numpy.load(self._column_path(column["file"]), mmap_mode="r", allow_pickle=False)
+                for column in entry["columns"]
+            }
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load cached {name} data: {e}")
+            return None
+
+    def load(self, name):
+        entry = self.entry(name)
+        if entry is None:
+            logger.warning(f"No cached {name} data in {self.directory}")
+            return None
+        if time.time() - entry["saved_at"] >= self.cache_duration:
+            logger.info(f"Cached {name} data is outdated")
+            return None
+        memoized = self._memory.get(name)
+        if memoized is not None and memoized[0] == entry["generation"]:
+            return memoized[1]
+        frame = None
+        if "columns" in entry:
+            arrays = self.columns(name)
+            if arrays is None:
+                return None
+            # Only tz-aware and string columns are converted; the rest stay backed by the mmap
+            frame = pandas.DataFrame({
+                column["name"]: decode_column(arrays[column["name"]], column)
+                for column in entry["columns"]
+            }, copy=False)
+        data = join_value(entry["kind"], frame, entry)
+        self._memory[name] = (entry["generation"], data)
+        return data
+
+    def save(self, name, data, saved_at=None, legacy_mtime=None):
+        """Stores a value and returns its manifest entry, or None if it could not be written."""
+        try:
+            kind, frame, entry = split_value(data)
+        except TypeError as e:
+            logger.warning(f"Not caching {name} data: {e}")
+            return None
+        generation = time.time_ns()
+        entry.update({"kind": kind, "generation": generation, "saved_at": time.time() if saved_at is None else saved_at})
+        if legacy_mtime is not None:
+            entry["legacy_mtime"] = legacy_mtime
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if frame is not None:
+                entry["columns"] = [
+                    self._write_column(name, generation, index, column_name, frame[column_name])
+                    for index, column_name in enumerate(frame.columns)
+                ]
+            manifest = self._read_manifest()
+            previous = manifest["entries"].get(name)
+            manifest = {"version": FORMAT_VERSION, "entries": dict(manifest["entries"], **{name: entry})}
+            self._write_manifest(manifest)
+        except OSError as e:
+            logger.warning(f"Failed to save {name} cache to {self.directory}: {e}")
+            return None
+        self._remove_columns(previous)
+        self._memory[name] = (generation, data)
+        return entry
+
+    def _write_column(self, name, generation, index, column_name, series):
+        values, column = encode_column(series)
+        file_name = f"{name}.{generation}.{index}.npy"
+        path = self._column_path(file_name)
+        numpy.save(path, values, allow_pickle=False)
+        column.update({"name": str(column_name), "file": file_name, "dtype": values.dtype.str, "sha256": file_checksum(path)})
+        return column
+
+    def _remove_columns(self, entry):
+        for column in (entry or {}).get("columns", []):
+            try:
+                os.remove(self._column_path(column["file"]))
+            except OSError:
+                pass
+
+    def invalidate(self, name):
+        manifest = self._read_manifest()
+        entry = manifest["entries"].get(name)
+        self._memory.pop(name, None)
+        if entry is None:
+            return
+        entries = {key: value for key, value in manifest["entries"].items() if key != name}
+        try:
+            self._write_manifest({"version": FORMAT_VERSION, "entries": entries})
+        except OSError as e:
+            logger.warning(f"Failed to update cache manifest {self.manifest_path}: {e}")
+            return
+        self._remove_columns(entry)
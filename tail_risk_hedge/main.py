@@ -1,6 +1,7 @@
 import argparse
 import pandas
 import numpy
+import monte_carlo
 import tail_risk_hedge
 import json
 import os
@@ -38,32 +39,43 @@ class ResultPrinter:
 
     @staticmethod
     def print_comparison_results(comparison_df, key_metrics, delimiter_length=100):
+        grouped = comparison_df.groupby('insurance_ratio')
+        crash_protection = pandas.Series(dtype=float)
+        if 'scenario' in comparison_df.columns:
+            crash_data = comparison_df[comparison_df['scenario'] == 'crash']
+            if not crash_data.empty:
+                crash_protection = crash_data.groupby('insurance_ratio')[
+                    'difference_between_portfolio_profit_with_insurance_and_without_insurance'
+                ].mean()
+        summary = {
+            "statistics": grouped[key_metrics].agg(['mean', 'min', 'max', 'std']),
+            "mean_returns": grouped['portfolio_value_percent_change_with_insurance'].mean(),
+            "std_returns": grouped['portfolio_value_percent_change_with_insurance'].std().fillna(0),
+            "crash_protection": crash_protection
+        }
+        ResultPrinter.print_comparison_summary(summary, delimiter_length)
+
+    @staticmethod
+    def print_comparison_summary(summary, delimiter_length=100):
         print("\n" + "=" * delimiter_length)
         print(f"\tCOMPARISON OF INSURANCE RATIOS")
         print("=" * delimiter_length)
-        grouped = comparison_df.groupby('insurance_ratio')
-        summary = grouped[key_metrics].agg(['mean', 'min', 'max', 'std'])
         pandas.set_option('display.float_format', '{:.4f}'.format)
         pandas.set_option('display.width', delimiter_length)
         print("\nSummary Statistics (mean, min, max, std):")
-        print(summary)
-        mean_returns = grouped['portfolio_value_percent_change_with_insurance'].mean()
-        std_returns = grouped['portfolio_value_percent_change_with_insurance'].std().fillna(0)
-        sharpe_ratios = mean_returns / std_returns.replace(0, numpy.inf)
+        print(summary["statistics"])
+        mean_returns = summary["mean_returns"]
+        sharpe_ratios = mean_returns / summary["std_returns"].replace(0, numpy.inf)
         print("\nRisk-Adjusted Returns (higher is better):")
         for ratio, sharpe in sharpe_ratios.items():
             sharpe_val = sharpe if not numpy.isinf(sharpe) else mean_returns[ratio]
             print(f"  Insurance Ratio {ratio:.2%}: {sharpe_val:.4f}")
-        best_ratio = sharpe_ratios.idxmax() if not sharpe_ratios.empty else comparison_df['insurance_ratio'].iloc[0]
+        best_ratio = sharpe_ratios.idxmax() if not sharpe_ratios.empty else summary["statistics"].index[0]
         print(f"\nRecommended insurance ratio: {best_ratio:.2%}")
-        if 'scenario' in comparison_df.columns:
-            crash_data = comparison_df[comparison_df['scenario'] == 'crash']
-            if not crash_data.empty:
-                crash_grouped = crash_data.groupby('insurance_ratio')
-                crash_protection = crash_grouped['difference_between_portfolio_profit_with_insurance_and_without_insurance'].mean()
-                print("\nAverage Crash Protection (higher is better):")
-                for ratio, protection in crash_protection.items():
-                    print(f"  Insurance Ratio {ratio:.2%}: {protection:.2f}")
+        if not summary["crash_protection"].empty:
+            print("\nAverage Crash Protection (higher is better):")
+            for ratio, protection in summary["crash_protection"].items():
+                print(f"  Insurance Ratio {ratio:.2%}: {protection:.2f}")
 
 def load_config(config_path="config.json"):
     if os.path.exists(config_path):
@@ -83,6 +95,7 @@ def parse_arguments():
     parser.add_argument("--max-ratio", type=float, default=config.get('max_ratio', 0.03), help="Maximum insurance ratio for comparison (default: 0.03)")
     parser.add_argument("--ratio-steps", type=int, default=config.get('ratio_steps', 5), help="Number of steps between min and max ratio (default: 5)")
     parser.add_argument("--iterations", type=int, default=config.get('iterations', 10), help="Number of iterations for comparison mode (default: 10)")
+    parser.add_argument("--workers", type=int, default=config.get('workers', os.cpu_count() or 1), help="Worker processes for comparison mode; results do not depend on it (default: number of CPUs)")
     parser.add_argument("--cache-duration", type=int, default=config.get('cache_duration', 86400), help="Cache duration in seconds (default: 86400)")
     parser.add_argument("--risk-free-rate", type=float, default=config.get('risk_free_rate', 0.04), help="Risk-free rate (default: 0.04)")
     parser.add_argument("--time-to-expiry", type=float, default=config.get('time_to_expiry', 2/12), help="Time to option expiry in years (default: 2/12)")
@@ -96,19 +109,9 @@ def run_scenario(data_provider, portfolio_value, insurance_ratio, scenario_type)
         **scenario_data
     )
 
-def run_comparison(data_provider, portfolio_value, insurance_ratios, scenario_type, iterations=1):
-    results = []
-    for _ in range(iterations):
-        scenario_data = data_provider.generate_scenario(scenario_type)
-        for ratio in insurance_ratios:
-            metrics = tail_risk_hedge.calculate_portfolio_metrics(
-                portfolio_value=portfolio_value,
-                insurance_ratio=ratio,
-                **scenario_data
-            )
-            metrics['insurance_ratio'] = ratio
-            results.append(metrics)
-    return pandas.DataFrame(results)
+def run_comparison(data_provider, portfolio_value, insurance_ratios, scenario_type, iterations=1, rng=None):
+    scenarios = monte_carlo.draw_scenarios(data_provider=data_provider, scenario=scenario_type, iterations=iterations, rng=rng)
+    return monte_carlo.to_frame(portfolio_value=portfolio_value, insurance_ratios=insurance_ratios, scenarios=scenarios)
 
 def main():
     args = parse_arguments()
@@ -121,23 +124,21 @@ def main():
         risk_free_rate=args.risk_free_rate,
         time_to_expiry=args.time_to_expiry
     )
-    key_metrics = [
-        'portfolio_value_percent_change_with_insurance',
-        'portfolio_value_percent_change_without_insurance',
-        'difference_between_portfolio_profit_with_insurance_and_without_insurance'
-    ]
     if args.comparison:
         insurance_ratios = numpy.linspace(args.min_ratio, args.max_ratio, args.ratio_steps).tolist()
-        for scenario_type in args.scenarios:
+        seeds = numpy.random.SeedSequence(args.seed).spawn(len(args.scenarios))
+        for scenario_type, seed in zip(args.scenarios, seeds):
             print(f"\n\nRunning {args.iterations} iterations of {scenario_type} scenario with ratios: {insurance_ratios}")
-            comparison_results = run_comparison(
-                data_provider,
-                args.portfolio,
-                insurance_ratios,
-                scenario_type,
-                args.iterations
+            summary = monte_carlo.sweep(
+                data_provider=data_provider,
+                portfolio_value=args.portfolio,
+                insurance_ratios=insurance_ratios,
+                scenario=scenario_type,
+                iterations=args.iterations,
+                seed=seed,
+                workers=args.workers
             )
-            ResultPrinter.print_comparison_results(comparison_results, key_metrics)
+            ResultPrinter.print_comparison_summary(summary)
     else:
         for scenario_type in args.scenarios:
             metrics = run_scenario(data_provider, args.portfolio, args.ratio, scenario_type)
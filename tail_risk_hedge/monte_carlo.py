@@ -0,0 +1,239 @@
+import concurrent.futures
+import datetime
+import functools
+import logging
+import numpy
+import pandas
+import random
+import tail_risk_hedge
+
+logger = logging.getLogger(__name__)
+
+HORIZON_DAYS = 40
+DEFAULT_CHUNK_SIZE = 10000
+KEY_METRICS = [
+    'portfolio_value_percent_change_with_insurance',
+    'portfolio_value_percent_change_without_insurance',
+    'difference_between_portfolio_profit_with_insurance_and_without_insurance'
+]
+
+
+def default_rng():
+    # Derived from the stdlib generator so a seeded data provider keeps batches reproducible
+    return numpy.random.default_rng(random.getrandbits(64))
+
+
+def _draw_prices_at_end(*, closes, start_index, scenario, rng):
+    iterations = len(start_index)
+    price_at_start = closes[start_index]
+    end_index = numpy.minimum(start_index + rng.integers(1, HORIZON_DAYS, size=iterations, endpoint=True), len(closes) - 1)
+    price_at_end = closes[end_index]
+    crash_draw = price_at_start * rng.uniform(0.6, 0.9, size=iterations)
+    stable_draw = price_at_start * rng.uniform(0.95, 1.1, size=iterations)
+    if scenario != "stable":
+        forced_crash = price_at_end > price_at_start * 0.9
+    else:
+        forced_crash = numpy.zeros(iterations, dtype=bool)
+    out_of_band = (price_at_end > price_at_start * 1.2) | (price_at_end < price_at_start * 0.9)
+    return numpy.where(forced_crash, crash_draw, numpy.where(out_of_band, stable_draw, price_at_end))
+
+
+def market_inputs(*, data_provider, scenario):
+    # Everything sampling needs from the provider, fetched once so batches can be drawn in other processes
+    closes = data_provider.historical_data["Close"].to_numpy(dtype=float)
+    if len(closes) - HORIZON_DAYS < 0:
+        raise ValueError("Insufficient historical data")
+    # One chain lookup per run; the chain is today's, whichever historical start price is drawn
+    reference_price = float(numpy.median(closes))
+    puts, expiry_date = data_provider._fetch_option_chain(reference_price)
+    market = {"closes": closes, "strikes": None, "option_prices": None, "volatility": None, "expiry_date": expiry_date}
+    if puts is None or puts.empty:
+        logger.info("Generating synthetic put options data")
+        market["volatility"] = data_provider._estimate_implied_volatility(
+            option_price=1.0,
+            price_at_start=reference_price,
+            strike_price=reference_price * 0.8,
+            time_to_expiry=data_provider.time_to_expiry,
+            risk_free_rate=data_provider.risk_free_rate,
+            scenario=scenario
+        )
+        market["expiry_date"] = (datetime.datetime.now() + datetime.timedelta(days=60)).strftime("%Y-%m-%d")
+        return market
+    last_price = puts["lastPrice"].to_numpy(dtype=float)
+    bid = puts["bid"].to_numpy(dtype=float) if "bid" in puts else numpy.full(len(puts), 0.5)
+    market["strikes"] = puts["strike"].to_numpy(dtype=float)
+    market["option_prices"] = numpy.where(last_price > 0, last_price, bid)
+    return market
+
+
+def _draw_puts(*, market, price_at_start, rng):
+    iterations = len(price_at_start)
+    if market["strikes"] is None:
+        strike_price = price_at_start * rng.uniform(0.7, 0.9, size=iterations)
+        option_price = numpy.clip(market["volatility"] * price_at_start * 0.01, 0.5, 10)
+        return strike_price, option_price
+    chosen = rng.integers(0, len(market["strikes"]), size=iterations)
+    return market["strikes"][chosen], market["option_prices"][chosen]
+
+
+def sample_scenarios(*, market, scenario, iterations, rng):
+    closes = market["closes"]
+    start_index = rng.integers(0, len(closes) - HORIZON_DAYS, size=iterations, endpoint=True)
+    price_at_start = closes[start_index]
+    strike_price, option_price = _draw_puts(market=market, price_at_start=price_at_start, rng=rng)
+    price_at_end = _draw_prices_at_end(closes=closes, start_index=start_index, scenario=scenario, rng=rng)
+    return {
+        "price_at_start": price_at_start,
+        "price_at_end": price_at_end,
+        "strike_price": strike_price,
+        "option_price": option_price,
+        "expiry_date": market["expiry_date"]
+    }
+
+
+def draw_scenarios(*, data_provider, scenario, iterations, rng=None):
+    return sample_scenarios(
+        market=market_inputs(data_provider=data_provider, scenario=scenario),
+        scenario=scenario,
+        iterations=iterations,
+        rng=rng if rng is not None else default_rng()
+    )
+
+
+def evaluate_ratios(*, portfolio_value, insurance_ratios, scenarios):
+    ratios = numpy.asarray(insurance_ratios, dtype=float)
+    # Scenarios run down axis 0 and ratios across axis 1
+    outcomes = tail_risk_hedge.calculate_portfolio_outcomes(
+        portfolio_value=portfolio_value,
+        insurance_ratio=ratios,
+        price_at_start=scenarios["price_at_start"][:, None],
+        price_at_end=scenarios["price_at_end"][:, None],
+        strike_price=scenarios["strike_price"][:, None],
+        option_price=scenarios["option_price"][:, None]
+    )
+    outcomes["insurance_ratios"] = ratios
+    outcomes["crash"] = outcomes["crash"][:, 0]
+    return outcomes
+
+
+def describe(values, mask=None):
+    # Per-ratio count, mean, sum of squared deviations, min and max of a scenarios x ratios array
+    if mask is not None:
+        values = values[mask]
+    count = values.shape[0]
+    if count == 0:
+        empty = numpy.full(values.shape[1], numpy.nan)
+        return {"count": 0, "mean": empty, "m2": numpy.zeros(values.shape[1]), "min": empty, "max": empty}
+    mean = values.mean(axis=0)
+    return {
+        "count": count,
+        "mean": mean,
+        "m2": ((values - mean) ** 2).sum(axis=0),
+        "min": values.min(axis=0),
+        "max": values.max(axis=0)
+    }
+
+
+def combine(first, second):
+    # Chan et al.'s pairwise update, so chunks can be described separately and merged exactly
+    if first["count"] == 0:
+        return second
+    if second["count"] == 0:
+        return first
+    count = first["count"] + second["count"]
+    delta = second["mean"] - first["mean"]
+    return {
+        "count": count,
+        "mean": first["mean"] + delta * second["count"] / count,
+        "m2": first["m2"] + second["m2"] + delta ** 2 * first["count"] * second["count"] / count,
+        "min": numpy.minimum(first["min"], second["min"]),
+        "max": numpy.maximum(first["max"], second["max"])
+    }
+
+
+def describe_outcomes(outcomes, key_metrics=KEY_METRICS):
+    shape = outcomes["portfolio_end_with_insurance"].shape
+    described = {metric: describe(numpy.broadcast_to(outcomes[metric], shape)) for metric in key_metrics}
+    described['crash_protection'] = describe(
+        outcomes['difference_between_portfolio_profit_with_insurance_and_without_insurance'], mask=outcomes["crash"]
+    )
+    return described
+
+
+def combine_descriptions(first, second):
+    return {metric: combine(first[metric], second[metric]) for metric in first}
+
+
+def summarize(*, insurance_ratios, described):
+    index = pandas.Index(insurance_ratios, name='insurance_ratio')
+    columns = {}
+    for metric, stats in described.items():
+        if metric == 'crash_protection':
+            continue
+        # Sample standard deviation, matching pandas' groupby().std()
+        std = numpy.sqrt(stats["m2"] / (stats["count"] - 1)) if stats["count"] > 1 else numpy.full(len(index), numpy.nan)
+        columns[(metric, 'mean')] = stats["mean"]
+        columns[(metric, 'min')] = stats["min"]
+        columns[(metric, 'max')] = stats["max"]
+        columns[(metric, 'std')] = std
+    statistics = pandas.DataFrame(columns, index=index)
+    crash = described['crash_protection']
+    return {
+        "statistics": statistics,
+        "mean_returns": statistics[(KEY_METRICS[0], 'mean')].rename(None),
+        "std_returns": statistics[(KEY_METRICS[0], 'std')].rename(None).fillna(0),
+        "crash_protection": pandas.Series(crash["mean"], index=index) if crash["count"] else pandas.Series(dtype=float)
+    }
+
+
+def _describe_chunk(task):
+    market, portfolio_value, insurance_ratios, scenario, iterations, seed_sequence = task
+    scenarios = sample_scenarios(
+        market=market, scenario=scenario, iterations=iterations, rng=numpy.random.default_rng(seed_sequence)
+    )
+    outcomes = evaluate_ratios(portfolio_value=portfolio_value, insurance_ratios=insurance_ratios, scenarios=scenarios)
+    return describe_outcomes(outcomes)
+
+
+def sweep(*, data_provider, portfolio_value, insurance_ratios, scenario, iterations, seed, workers=1, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Iterations are cut into fixed chunks, each with its own stream spawned from `seed`, and merged in
+    # chunk order, so the result depends on seed and chunk_size but never on the number of workers
+    if iterations < 1:
+        raise ValueError("Iterations must be positive")
+    if chunk_size < 1:
+        raise ValueError("Chunk size must be positive")
+    market = market_inputs(data_provider=data_provider, scenario=scenario)
+    seed_sequence = seed if isinstance(seed, numpy.random.SeedSequence) else numpy.random.SeedSequence(seed)
+    sizes = [min(chunk_size, iterations - start) for start in range(0, iterations, chunk_size)]
+    tasks = [
+        (market, portfolio_value, insurance_ratios, scenario, size, child)
+        for size, child in zip(sizes, seed_sequence.spawn(len(sizes)))
+    ]
+    if workers > 1 and len(tasks) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            described = list(executor.map(_describe_chunk, tasks))
+    else:
+        described = [_describe_chunk(task) for task in tasks]
+    return summarize(insurance_ratios=insurance_ratios, described=functools.reduce(combine_descriptions, described))
+
+
+def run(*, data_provider, portfolio_value, insurance_ratios, scenario, iterations, rng=None):
+    scenarios = draw_scenarios(data_provider=data_provider, scenario=scenario, iterations=iterations, rng=rng)
+    outcomes = evaluate_ratios(portfolio_value=portfolio_value, insurance_ratios=insurance_ratios, scenarios=scenarios)
+    return summarize(insurance_ratios=insurance_ratios, described=describe_outcomes(outcomes))
+
+
+def to_frame(*, portfolio_value, insurance_ratios, scenarios):
+    # One row per scenario and ratio, scenario-major, with the columns of calculate_portfolio_metrics
+    ratios = numpy.asarray(insurance_ratios, dtype=float)
+    frame = tail_risk_hedge.calculate_portfolio_metrics_array(
+        portfolio_value=portfolio_value,
+        insurance_ratio=ratios,
+        price_at_start=scenarios["price_at_start"][:, None],
+        price_at_end=scenarios["price_at_end"][:, None],
+        strike_price=scenarios["strike_price"][:, None],
+        option_price=scenarios["option_price"][:, None],
+        expiry_date=scenarios["expiry_date"]
+    )
+    frame["insurance_ratio"] = numpy.tile(ratios, len(scenarios["price_at_start"]))
+    return frame
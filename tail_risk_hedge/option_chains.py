@@ -0,0 +1,54 @@
+import bisect
+import datetime
+import time
+
+# A complete chain lists every strike the exchange offers, so it answers any strike band
+FULL_CHAIN = (0.0, float("inf"))
+
+
+class OptionChainStore:
+    """In-memory put chains keyed by expiry date, with strikes sorted for bisect range lookups.
+
+    Each chain records the strike band it is known to cover: a chain fetched whole covers
+    every band, while a chain restored from a band-filtered cache covers only that band.
+    """
+
+    def __init__(self, *, max_age=86400):
+        self.max_age = max_age
+        self._chains = {}
+
+    def __len__(self):
+        return len(self._chains)
+
+    def add(self, *, expiry_date, puts, covered_range=FULL_CHAIN, fetched_at=None):
+        ordered = puts.sort_values("strike", kind="stable").reset_index(drop=True)
+        self._chains[expiry_date] = {
+            "puts": ordered,
+            "strikes": ordered["strike"].tolist(),
+            "covered_range": (float(covered_range[0]), float(covered_range[1])),
+            "fetched_at": time.time() if fetched_at is None else fetched_at
+        }
+
+    def _is_fresh(self, chain):
+        return time.time() - chain["fetched_at"] < self.max_age
+
+    def closest_expiry(self, target_date):
+        expiries = [expiry_date for expiry_date, chain in self._chains.items() if self._is_fresh(chain)]
+        if not expiries:
+            return None
+        return min(expiries, key=lambda expiry_date: abs((datetime.date.fromisoformat(expiry_date) - target_date).days))
+
+    def lookup(self, *, expiry_date, low, high):
+        # Puts with low <= strike <= high, or None if the stored chain cannot answer for that band
+        chain = self._chains.get(expiry_date)
+        if chain is None or not self._is_fresh(chain):
+            return None
+        covered_low, covered_high = chain["covered_range"]
+        if low < covered_low or high > covered_high:
+            return None
+        start = bisect.bisect_left(chain["strikes"], low)
+        end = bisect.bisect_right(chain["strikes"], high)
+        return chain["puts"].iloc[start:end]
+
+    def covered_range(self, expiry_date):
+        return self._chains[expiry_date]["covered_range"]
@@ -1,6 +1,8 @@
+import cache_manager
 import datetime
 import functools
 import numpy
+import option_chains
 import os
 import pandas
 import pickle
@@ -60,9 +62,7 @@ def backoff_retries(max_retries=3, base_delay=1, cache_type=None):
     return decorator
 
 class YahooFinanceDataProvider:
-    CACHE_VERSION = '1.0'
-
-    def __init__(self, *, ticker="SPY", seed=None, cache_file="price_cache.pkl", put_options_cache_file="put_options_cache.pkl", vix_cache_file="vix_cache.pkl", cache_duration=86400, risk_free_rate=0.04, time_to_expiry=2/12):
+    def __init__(self, *, ticker="SPY", seed=None, cache_file="price_cache.pkl", put_options_cache_file="put_options_cache.pkl", vix_cache_file="vix_cache.pkl", cache_dir=cache_manager.DEFAULT_CACHE_DIR, cache_duration=86400, risk_free_rate=0.04, time_to_expiry=2/12):
         if seed is not None:
             random.seed(seed)
         self.ticker = ticker
@@ -70,55 +70,31 @@ class YahooFinanceDataProvider:
         self.cache_duration = cache_duration
         self.risk_free_rate = risk_free_rate
         self.time_to_expiry = time_to_expiry
+        # Legacy pickles, migrated into the cache directory when found
         self.cache_files = {
             'historical': cache_file,
             'put_options': put_options_cache_file,
             'vix': vix_cache_file
         }
+        self.cache = cache_manager.CacheManager(directory=cache_dir, cache_duration=cache_duration, legacy_files=self.cache_files)
         self.historical_data = self._load_cached_data('historical', self._fetch_historical_data)
+        self.option_chains = option_chains.OptionChainStore(max_age=cache_duration)
         self.put_options_cache = self._load_cached_data('put_options', default_value=None)
+        if self.put_options_cache is not None:
+            self._remember_option_chain(self.put_options_cache)
         self.vix_cache = self._load_cached_data('vix', default_value=None)
 
     def _load_cached_data(self, cache_type, fetch_function=None, default_value=None):
-        cache_file = self.cache_files[cache_type]
-        if not os.path.exists(cache_file):
-            logger.warning(f"Cache file {cache_file} does not exist")
-            return default_value if fetch_function is None else fetch_function()
-        if not self._is_cache_valid(cache_file):
-            logger.info(f"Cache file {cache_file} is outdated")
-            return default_value if fetch_function is None else fetch_function()
-        try:
-            with open(cache_file, "rb") as f:
-                cache_data = pickle.load(f)
-                # Handle legacy cache (no version field)
-                if not isinstance(cache_data, dict) or 'version' not in cache_data:
-                    data = cache_data
-                else:
-                    if cache_data.get('version') != self.CACHE_VERSION:
-                        logger.warning(f"Cache version mismatch in {cache_file}, expected {self.CACHE_VERSION}")
-                        raise ValueError("Invalid cache version")
-                    data = cache_data['data']
-                if cache_type == 'historical' and (data is None or data.empty):
-                    logger.error(f"No valid historical data in {cache_file}")
-                    raise ValueError("No historical data available")
-                return data
-        except (FileNotFoundError, pickle.PickleError, ValueError, KeyError) as e:
-            logger.error(f"Failed to load cache from {cache_file}: {e}")
+        data = self.cache.load(cache_type)
+        if cache_type == 'historical' and data is not None and data.empty:
+            logger.error(f"No valid historical data in {self.cache.directory}")
+            data = None
+        if data is None:
             return default_value if fetch_function is None else fetch_function()
+        return data
 
-    def _is_cache_valid(self, cache_file):
-        if not os.path.exists(cache_file):
-            return False
-        cache_age = time.time() - os.path.getmtime(cache_file)
-        return cache_age < self.cache_duration
-
-    def _save_cache(self, data, cache_file):
-        try:
-            cache_data = {'version': self.CACHE_VERSION, 'data': data}
-            with open(cache_file, "wb") as f:
-                pickle.dump(cache_data, f)
-        except OSError as e:
-            logger.warning(f"Failed to save cache to {cache_file}: {e}")
+    def _save_cache(self, data, cache_type):
+        self.cache.save(cache_type, data)
 
     def _generate_synthetic_historical_data(self):
         logger.info("Generating synthetic historical data as fallback")
@@ -163,7 +139,7 @@ class YahooFinanceDataProvider:
         volatility = self._fetch_vix_data()
         if volatility is not None:
             self.vix_cache = volatility
-            self._save_cache(volatility, self.cache_files['vix'])
+            self._save_cache(volatility, 'vix')
             return volatility if scenario != "crash" else volatility * 1.5
         logger.warning("Using default volatility due to unavailable VIX data")
         return 0.2 if scenario != "crash" else 0.3
@@ -194,23 +170,30 @@ class YahooFinanceDataProvider:
                 closest_date = exp_date
         return pandas.Timestamp(closest_date).strftime("%Y-%m-%d")
 
+    def _remember_option_chain(self, cache):
+        puts, expiry_date, covered_range = cache
+        age = self.cache.age('put_options') or 0
+        self.option_chains.add(expiry_date=expiry_date, puts=puts, covered_range=covered_range, fetched_at=time.time() - age)
+
     @backoff_retries(cache_type='put_options')
     def _fetch_option_chain(self, price_at_start):
+        low, high = price_at_start * 0.7, price_at_start * 0.9
+        target_date = (datetime.datetime.now() + datetime.timedelta(days=60)).date()
+        expiry_date = self.option_chains.closest_expiry(target_date)
+        if expiry_date is not None:
+            puts = self.option_chains.lookup(expiry_date=expiry_date, low=low, high=high)
+            if puts is not None:
+                return puts, expiry_date
         time.sleep(0.1)  # Throttle requests
-        cache = self._load_cached_data('put_options')
-        if cache and price_at_start * 0.7 <= cache[2][1] and price_at_start * 0.9 >= cache[2][0]:
-            return cache[0], cache[1]
         if not self.ticker_data.options:
             raise ValueError("No options data available for ticker")
-        target_date = (datetime.datetime.now() + datetime.timedelta(days=60)).date()
         expiry_date = self.get_closest_expiration_date(self.ticker_data.options, target_date)
         option_chain = self.ticker_data.option_chain(expiry_date)
-        puts = option_chain.puts
-        out_of_the_money_puts = puts[(puts["strike"] <= price_at_start * 0.9) & (puts["strike"] >= price_at_start * 0.7)]
-        price_range = (price_at_start * 0.7, price_at_start * 0.9)
-        self.put_options_cache = (out_of_the_money_puts, expiry_date, price_range)
-        self._save_cache(self.put_options_cache, self.cache_files['put_options'])
-        return out_of_the_money_puts, expiry_date
+        # Keep the whole chain so later scenarios at other prices are answered from memory
+        self.option_chains.add(expiry_date=expiry_date, puts=option_chain.puts)
+        self.put_options_cache = (option_chain.puts, expiry_date, option_chains.FULL_CHAIN)
+        self._save_cache(self.put_options_cache, 'put_options')
+        return self.option_chains.lookup(expiry_date=expiry_date, low=low, high=high), expiry_date
 
     def get_start_index(self):
         length = len(self.historical_data)
@@ -257,6 +240,111 @@ class YahooFinanceDataProvider:
             "expiry_date": expiry_date
         }
 
+def _require(*, invalid, message):
+    if numpy.any(invalid):
+        raise ValueError(message)
+
+def calculate_equity_value_array(portfolio_value, equity_ratio):
+    portfolio_value = numpy.asarray(portfolio_value, dtype=float)
+    _require(invalid=portfolio_value < 0, message="Portfolio value cannot be negative")
+    return portfolio_value * equity_ratio
+
+def calculate_insurance_budget_array(portfolio_value, insurance_ratio):
+    portfolio_value = numpy.asarray(portfolio_value, dtype=float)
+    insurance_ratio = numpy.asarray(insurance_ratio, dtype=float)
+    _require(invalid=portfolio_value < 0, message="Portfolio value cannot be negative")
+    _require(invalid=insurance_ratio < 0, message="Insurance ratio cannot be negative")
+    return portfolio_value * insurance_ratio
+
+def calculate_number_of_contracts_array(insurance_budget, option_price):
+    insurance_budget = numpy.asarray(insurance_budget, dtype=float)
+    option_price = numpy.asarray(option_price, dtype=float)
+    _require(invalid=insurance_budget < 0, message="Insurance budget cannot be negative")
+    _require(invalid=option_price <= 0, message="Option price must be positive")
+    return numpy.floor(insurance_budget / (option_price * 100)).astype(numpy.int64)
+
+def calculate_option_payoff_array(strike_price, price_at_end):
+    strike_price = numpy.asarray(strike_price, dtype=float)
+    price_at_end = numpy.asarray(price_at_end, dtype=float)
+    _require(invalid=strike_price < 0, message="Strike price cannot be negative")
+    _require(invalid=price_at_end < 0, message="Price at end cannot be negative")
+    return numpy.maximum(0, strike_price - price_at_end)
+
+def calculate_price_change_array(price_at_start, price_at_end):
+    price_at_start = numpy.asarray(price_at_start, dtype=float)
+    price_at_end = numpy.asarray(price_at_end, dtype=float)
+    _require(invalid=price_at_end <= 0, message="Price at end must be positive")
+    return (price_at_end - price_at_start) / price_at_start
+
+def calculate_portfolio_outcomes(*, portfolio_value, insurance_ratio, price_at_start, price_at_end, strike_price, option_price):
+    # Arguments broadcast against each other; results keep the broadcast shape of their inputs, unrounded
+    insurance_ratio = numpy.asarray(insurance_ratio, dtype=float)
+    equity_start = calculate_equity_value_array(portfolio_value, 1 - insurance_ratio)
+    insurance_budget = calculate_insurance_budget_array(portfolio_value, insurance_ratio)
+    contracts = calculate_number_of_contracts_array(insurance_budget, option_price)
+    price_change = calculate_price_change_array(price_at_start, price_at_end)
+    equity_end = equity_start * (1 + price_change)
+    option_payoff = calculate_option_payoff_array(strike_price, price_at_end)
+    portfolio_end_with_insurance = equity_end + option_payoff * contracts * 100
+    portfolio_end_without_insurance = portfolio_value * (1 + price_change)
+    return {
+        "crash": numpy.asarray(price_at_end) < numpy.asarray(strike_price),
+        "price_change": price_change,
+        "equity_start": equity_start,
+        "equity_end": equity_end,
+        "insurance_budget": insurance_budget,
+        "contracts": contracts,
+        "portfolio_end_with_insurance": portfolio_end_with_insurance,
+        "portfolio_end_without_insurance": portfolio_end_without_insurance,
+        "portfolio_value_percent_change_with_insurance": (portfolio_end_with_insurance - portfolio_value) / portfolio_value,
+        "portfolio_value_percent_change_without_insurance": (portfolio_end_without_insurance - portfolio_value) / portfolio_value,
+        "difference_between_portfolio_profit_with_insurance_and_without_insurance": portfolio_end_with_insurance - portfolio_end_without_insurance
+    }
+
+def calculate_portfolio_metrics_array(*, portfolio_value, insurance_ratio, price_at_start, price_at_end, strike_price, option_price, expiry_date):
+    outcomes = calculate_portfolio_outcomes(
+        portfolio_value=portfolio_value,
+        insurance_ratio=insurance_ratio,
+        price_at_start=price_at_start,
+        price_at_end=price_at_end,
+        strike_price=strike_price,
+        option_price=option_price
+    )
+    shape = numpy.broadcast_shapes(*(numpy.shape(value) for value in outcomes.values()), numpy.shape(expiry_date))
+    shape = shape if shape else (1,)
+
+    def column(values, decimals=2):
+        values = numpy.broadcast_to(values, shape).ravel()
+        return values.round(decimals) if decimals is not None else values
+
+    contracts = column(outcomes["contracts"], decimals=None)
+    return pandas.DataFrame({
+        "scenario": numpy.where(column(outcomes["crash"], decimals=None), "crash", "stable"),
+        "price_value_at_start": column(price_at_start),
+        "price_value_at_end": column(price_at_end),
+        "price_value_percent_change": column(outcomes["price_change"]),
+        "equity_at_start": column(outcomes["equity_start"]),
+        "equity_at_end": column(outcomes["equity_end"]),
+        "insurance_strategy_cost": column(outcomes["insurance_budget"]),
+        "insurance_strategy_cost_as_percentage_of_portfolio": column(insurance_ratio, decimals=None),
+        "number_of_contracts": contracts,
+        "put_option_price": column(option_price),
+        "option_strategy": [
+            f"buy {count} put contracts at {strike} strike price to expire on {expiry}"
+            for count, strike, expiry in zip(contracts, column(strike_price, decimals=None), column(numpy.asarray(expiry_date, dtype=object), decimals=None))
+        ],
+        "portfolio_value_at_start": column(portfolio_value, decimals=None),
+        "portfolio_value_at_end_with_insurance": column(outcomes["portfolio_end_with_insurance"]),
+        "portfolio_value_at_end_without_insurance": column(outcomes["portfolio_end_without_insurance"]),
+        "portfolio_value_percent_change_with_insurance": column(outcomes["portfolio_value_percent_change_with_insurance"]),
+        "portfolio_value_percent_change_without_insurance": column(outcomes["portfolio_value_percent_change_without_insurance"]),
+        "portfolio_profit_loss_with_insurance": column(outcomes["portfolio_end_with_insurance"] - portfolio_value),
+        "portfolio_profit_loss_without_insurance": column(outcomes["portfolio_end_without_insurance"] - portfolio_value),
+        "difference_between_portfolio_profit_with_insurance_and_without_insurance": column(
+            outcomes["difference_between_portfolio_profit_with_insurance_and_without_insurance"]
+        ),
+    })
+
 def calculate_equity_value(portfolio_value, equity_ratio):
     if portfolio_value < 0:
         raise ValueError("Portfolio value cannot be negative")
@@ -289,6 +377,7 @@ def calculate_price_change(price_at_start, price_at_end):
     return (price_at_end - price_at_start) / price_at_start
 
 def calculate_portfolio_metrics(*, portfolio_value, insurance_ratio, price_at_start, price_at_end, strike_price, option_price, expiry_date):
+    # Scalar twin of calculate_portfolio_metrics_array, kept free of NumPy so single scenarios stay cheap
     if portfolio_value < 0:
         raise ValueError("Portfolio value cannot be negative")
     if insurance_ratio < 0:
@@ -328,4 +417,4 @@ def calculate_portfolio_metrics(*, portfolio_value, insurance_ratio, price_at_st
         "difference_between_portfolio_profit_with_insurance_and_without_insurance": round(
             portfolio_end_with_insurance - portfolio_end_without_insurance, 2
         ),
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,204 @@
+import unittest
+import unittest.mock
+import cache_manager
+import json
+import numpy
+import os
+import pandas
+import pickle
+import random
+import shutil
+import tempfile
+import time
+
+
+def random_history(length=30):
+    closes = numpy.random.uniform(50, 500, length)
+    return pandas.DataFrame({
+        "Date": pandas.date_range("2024-05-02", periods=length, freq="B", tz="America/New_York"),
+        "Open": closes * numpy.random.uniform(0.99, 1.01, length),
+        "Close": closes
+    })
+
+
+def random_puts(length=5):
+    return pandas.DataFrame({
+        "contractSymbol": [f"SPY240621P00{random.randint(100, 999)}000" for _ in range(length)],
+        "strike": numpy.random.uniform(300, 450, length),
+        "lastPrice": numpy.random.uniform(0, 10, length),
+        "volume": numpy.random.choice([numpy.nan, 10.0], length),
+        "inTheMoney": numpy.zeros(length, dtype=bool)
+    })
+
+
+class TestCacheManager(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.temp_dir, "cache")
+        self.legacy_files = {
+            'historical': os.path.join(self.temp_dir, "price_cache.pkl"),
+            'put_options': os.path.join(self.temp_dir, "put_options_cache.pkl"),
+            'vix': os.path.join(self.temp_dir, "vix_cache.pkl")
+        }
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def make_cache(self, cache_duration=86400):
+        return cache_manager.CacheManager(directory=self.cache_dir, cache_duration=cache_duration, legacy_files=self.legacy_files)
+
+    def test_round_trips_each_cached_type(self):
+        history = random_history()
+        chain = (random_puts(), "2030-01-18", (random.uniform(300, 350), random.uniform(400, 450)))
+        vix = random.uniform(0.1, 0.5)
+        self.cache.save('historical', history)
+        self.cache.save('put_options', chain)
+        self.cache.save('vix', vix)
+        fresh = self.make_cache()
+        pandas.testing.assert_frame_equal(fresh.load('historical'), history, check_dtype=False)
+        self.assertEqual(fresh.load('historical')["Date"].dtype, history["Date"].dtype)
+        puts, expiry_date, price_range = fresh.load('put_options')
+        numpy.testing.assert_array_equal(puts["strike"], chain[0]["strike"])
+        self.assertEqual(puts["contractSymbol"].tolist(), chain[0]["contractSymbol"].tolist())
+        self.assertEqual((expiry_date, price_range), chain[1:])
+        self.assertEqual(fresh.load('vix'), vix)
+
+    def test_files_load_without_pickle(self):
+        self.cache.save('put_options', (random_puts(), "2030-01-18", (300.0, 400.0)))
+        with open(self.cache.manifest_path) as f:
+            manifest = json.load(f)
+        for column in manifest["entries"]["put_options"]["columns"]:
+            numpy.load(os.path.join(self.cache_dir, column["file"]), allow_pickle=False)
+
+    def test_columns_are_memory_mapped(self):
+        history = random_history()
+        self.cache.save('historical', history)
+        columns = self.make_cache().columns('historical')
+        self.assertIsInstance(columns["Close"], numpy.memmap)
+        numpy.testing.assert_array_equal(columns["Close"], history["Close"].to_numpy())
+
+    def test_loaded_numeric_columns_share_the_mapped_files(self):
+        history = random_history()
+        self.cache.save('historical', history)
+        loaded = self.make_cache().load('historical')
+        values = loaded["Close"].to_numpy()
+        while values is not None and not isinstance(values, numpy.memmap):
+            values = values.base
+        self.assertIsInstance(values, numpy.memmap)
+        self.assertEqual(loaded["Date"].dtype, history["Date"].dtype)
+
+    def test_loads_are_memoized(self):
+        self.cache.save('historical', random_history())
+        fresh = self.make_cache()
+        first = fresh.load('historical')
+        with unittest.mock.patch('numpy.load') as mock_load:
+            self.assertIs(fresh.load('historical'), first)
+            mock_load.assert_not_called()
+
+    def test_memo_follows_other_writers(self):
+        self.cache.save('vix', 0.2)
+        other = self.make_cache()
+        self.assertEqual(other.load('vix'), 0.2)
+        self.cache.save('vix', 0.3)
+        self.assertEqual(other.load('vix'), 0.3)
+
+    def test_checksum_mismatch_is_a_miss(self):
+        self.cache.save('historical', random_history())
+        with open(self.cache.manifest_path) as f:
+            column = json.load(f)["entries"]["historical"]["columns"][-1]
+        path = os.path.join(self.cache_dir, column["file"])
+        with open(path, "r+b") as f:
+            f.seek(-8, os.SEEK_END)
+            f.write(os.urandom(8))
+        fresh = self.make_cache()
+        with unittest.mock.patch('cache_manager.logger.error') as mock_log:
+            self.assertIsNone(fresh.load('historical'))
+            mock_log.assert_called()
+
+    def test_expired_entries_are_misses(self):
+        self.cache.save('vix', 0.2, saved_at=time.time() - 100)
+        self.assertIsNone(self.make_cache(cache_duration=50).load('vix'))
+        self.assertEqual(self.make_cache(cache_duration=200).load('vix'), 0.2)
+        self.assertFalse(self.make_cache(cache_duration=50).is_valid('vix'))
+
+    def test_manifest_version_mismatch_is_ignored(self):
+        self.cache.save('vix', 0.2)
+        with open(self.cache.manifest_path) as f:
+            manifest = json.load(f)
+        manifest["version"] = cache_manager.FORMAT_VERSION + 1
+        with open(self.cache.manifest_path, "w") as f:
+            json.dump(manifest, f)
+        self.assertIsNone(self.make_cache().load('vix'))
+
+    def test_migrates_legacy_pickles(self):
+        history = random_history()
+        with open(self.legacy_files['historical'], "wb") as f:
+            pickle.dump({'version': cache_manager.LEGACY_VERSION, 'data': history}, f)
+        with open(self.legacy_files['vix'], "wb") as f:
+            pickle.dump(0.25, f)
+        pandas.testing.assert_frame_equal(self.cache.load('historical'), history, check_dtype=False)
+        self.assertEqual(self.cache.load('vix'), 0.25)
+        with open(self.cache.manifest_path) as f:
+            self.assertCountEqual(json.load(f)["entries"], ['historical', 'vix'])
+
+    def test_rewritten_legacy_pickle_is_migrated_again(self):
+        with open(self.legacy_files['vix'], "wb") as f:
+            pickle.dump(0.25, f)
+        self.assertEqual(self.cache.load('vix'), 0.25)
+        with open(self.legacy_files['vix'], "wb") as f:
+            pickle.dump(0.35, f)
+        os.utime(self.legacy_files['vix'], (time.time() + 1, time.time() + 1))
+        self.assertEqual(self.make_cache().load('vix'), 0.35)
+
+    def test_legacy_pickle_is_checked_once(self):
+        with open(self.legacy_files['vix'], "wb") as f:
+            pickle.dump(0.25, f)
+        self.assertEqual(self.cache.load('vix'), 0.25)
+        with unittest.mock.patch('os.path.getmtime') as mock_getmtime:
+            self.cache.entry('vix')
+            self.cache.is_valid('vix')
+            mock_getmtime.assert_not_called()
+
+    def test_newer_entry_wins_over_legacy_pickle(self):
+        with open(self.legacy_files['vix'], "wb") as f:
+            pickle.dump(0.25, f)
+        os.utime(self.legacy_files['vix'], (time.time() - 10, time.time() - 10))
+        self.cache.save('vix', 0.3)
+        self.assertEqual(self.make_cache().load('vix'), 0.3)
+
+    def test_legacy_age_is_kept(self):
+        with open(self.legacy_files['vix'], "wb") as f:
+            pickle.dump(0.25, f)
+        os.utime(self.legacy_files['vix'], (time.time() - 1000, time.time() - 1000))
+        self.assertIsNone(self.make_cache(cache_duration=100).load('vix'))
+
+    def test_corrupt_legacy_pickle_is_skipped(self):
+        with open(self.legacy_files['vix'], "wb") as f:
+            f.write(b"not a pickle")
+        with unittest.mock.patch('cache_manager.logger.error') as mock_log:
+            self.assertIsNone(self.cache.load('vix'))
+            mock_log.assert_called()
+
+    def test_invalidate_removes_entry_and_files(self):
+        self.cache.save('historical', random_history())
+        self.cache.invalidate('historical')
+        self.assertIsNone(self.cache.load('historical'))
+        self.assertEqual(os.listdir(self.cache_dir), [cache_manager.MANIFEST_FILE])
+
+    def test_overwrite_removes_previous_columns(self):
+        self.cache.save('historical', random_history())
+        self.cache.save('historical', random_history())
+        with open(self.cache.manifest_path) as f:
+            files = [column["file"] for column in json.load(f)["entries"]["historical"]["columns"]]
+        self.assertCountEqual(os.listdir(self.cache_dir), files + [cache_manager.MANIFEST_FILE])
+
+    def test_unsupported_values_are_not_cached(self):
+        with unittest.mock.patch('cache_manager.logger.warning') as mock_log:
+            self.assertIsNone(self.cache.save('put_options', (None, None)))
+            mock_log.assert_called()
+        self.assertIsNone(self.cache.load('put_options'))
+
+
+if __name__ == "__main__":
+    unittest.main()
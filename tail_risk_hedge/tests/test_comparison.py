@@ -2,6 +2,8 @@ import unittest
 import unittest.mock
 import pandas
 import os
+import shutil
+import tempfile
 import main
 import tail_risk_hedge
 
@@ -14,10 +16,12 @@ class TestComparisonMode(unittest.TestCase):
             'put_options': "test_put_options_cache.pkl",
             'vix': "test_vix_cache.pkl"
         }
+        self.cache_dir = tempfile.mkdtemp()
         self.data_provider = tail_risk_hedge.YahooFinanceDataProvider(
             cache_file=self.cache_files['price'],
             put_options_cache_file=self.cache_files['put_options'],
             vix_cache_file=self.cache_files['vix'],
+            cache_dir=self.cache_dir,
             seed=42
         )
         self.key_metrics = [
@@ -30,6 +34,7 @@ class TestComparisonMode(unittest.TestCase):
         for cache_file in self.cache_files.values():
             if os.path.exists(cache_file):
                 os.remove(cache_file)
+        shutil.rmtree(self.cache_dir)
 
     def _create_mock_comparison_data(self, iterations=2):
         data = []
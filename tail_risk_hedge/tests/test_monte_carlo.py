@@ -0,0 +1,207 @@
+import unittest
+import unittest.mock
+import main
+import numpy
+import pandas
+import random
+import monte_carlo
+import tail_risk_hedge
+
+
+class StubDataProvider:
+    def __init__(self, *, closes, puts=None, volatility=0.2):
+        self.historical_data = pandas.DataFrame({"Close": closes})
+        self.puts = puts
+        self.volatility = volatility
+        self.time_to_expiry = 2 / 12
+        self.risk_free_rate = 0.04
+        self.chain_requests = []
+
+    def _fetch_option_chain(self, price_at_start):
+        self.chain_requests.append(price_at_start)
+        return self.puts, "2030-01-18"
+
+    def _estimate_implied_volatility(self, **kwargs):
+        return self.volatility if kwargs["scenario"] != "crash" else self.volatility * 1.5
+
+
+def random_closes(length=252):
+    return 100 * numpy.exp(numpy.cumsum(numpy.random.default_rng(random.randint(0, 2**32)).normal(0, 0.01, length)))
+
+
+class TestMonteCarlo(unittest.TestCase):
+    def setUp(self):
+        self.portfolio_value = random.uniform(10000, 1000000)
+        self.insurance_ratios = sorted(random.uniform(0.001, 0.05) for _ in range(5))
+        self.rng = numpy.random.default_rng(random.randint(0, 2**32))
+
+    def test_evaluate_ratios_matches_scalar_metrics(self):
+        provider = StubDataProvider(closes=random_closes())
+        scenarios = monte_carlo.draw_scenarios(data_provider=provider, scenario="crash", iterations=20, rng=self.rng)
+        outcomes = monte_carlo.evaluate_ratios(
+            portfolio_value=self.portfolio_value, insurance_ratios=self.insurance_ratios, scenarios=scenarios
+        )
+        for i in range(20):
+            for j, ratio in enumerate(self.insurance_ratios):
+                expected = tail_risk_hedge.calculate_portfolio_metrics(
+                    portfolio_value=self.portfolio_value,
+                    insurance_ratio=ratio,
+                    price_at_start=scenarios["price_at_start"][i],
+                    price_at_end=scenarios["price_at_end"][i],
+                    strike_price=scenarios["strike_price"][i],
+                    option_price=scenarios["option_price"][i],
+                    expiry_date=scenarios["expiry_date"]
+                )
+                self.assertEqual(outcomes["contracts"][i, j], expected["number_of_contracts"])
+                self.assertEqual(outcomes["crash"][i], expected["scenario"] == "crash")
+                for metric in monte_carlo.KEY_METRICS:
+                    value = numpy.broadcast_to(outcomes[metric], outcomes["contracts"].shape)[i, j]
+                    self.assertAlmostEqual(value, expected[metric], delta=0.006)
+
+    def test_stable_scenarios_stay_in_band(self):
+        provider = StubDataProvider(closes=random_closes())
+        scenarios = monte_carlo.draw_scenarios(data_provider=provider, scenario="stable", iterations=1000, rng=self.rng)
+        change = scenarios["price_at_end"] / scenarios["price_at_start"]
+        self.assertTrue(((change >= 0.9) & (change <= 1.2)).all())
+        self.assertTrue(((scenarios["option_price"] >= 0.5) & (scenarios["option_price"] <= 10)).all())
+        self.assertEqual(len(provider.chain_requests), 1)
+
+    def test_crash_scenarios_end_at_or_below_band(self):
+        provider = StubDataProvider(closes=random_closes())
+        scenarios = monte_carlo.draw_scenarios(data_provider=provider, scenario="crash", iterations=1000, rng=self.rng)
+        self.assertTrue((scenarios["price_at_end"] <= scenarios["price_at_start"] * 1.1).all())
+
+    def test_puts_are_sampled_from_option_chain(self):
+        puts = pandas.DataFrame({"strike": [80.0, 85.0, 90.0], "lastPrice": [1.5, 0.0, 2.5], "bid": [1.4, 0.7, 2.4]})
+        provider = StubDataProvider(closes=random_closes(), puts=puts)
+        scenarios = monte_carlo.draw_scenarios(data_provider=provider, scenario="stable", iterations=500, rng=self.rng)
+        self.assertCountEqual(numpy.unique(scenarios["strike_price"]), [80.0, 85.0, 90.0])
+        self.assertTrue((scenarios["option_price"][scenarios["strike_price"] == 85.0] == 0.7).all())
+        self.assertEqual(scenarios["expiry_date"], "2030-01-18")
+
+    def test_insufficient_history(self):
+        provider = StubDataProvider(closes=random_closes(length=monte_carlo.HORIZON_DAYS - 1))
+        with self.assertRaises(ValueError):
+            monte_carlo.draw_scenarios(data_provider=provider, scenario="stable", iterations=10, rng=self.rng)
+
+    def test_invalid_inputs(self):
+        scenarios = {
+            "price_at_start": numpy.array([100.0]),
+            "price_at_end": numpy.array([90.0]),
+            "strike_price": numpy.array([85.0]),
+            "option_price": numpy.array([1.0])
+        }
+        test_cases = [
+            ({"portfolio_value": -1, "insurance_ratios": [0.01]}, scenarios),
+            ({"portfolio_value": 1000, "insurance_ratios": [-0.01]}, scenarios),
+            ({"portfolio_value": 1000, "insurance_ratios": [0.01]}, dict(scenarios, option_price=numpy.array([0.0]))),
+            ({"portfolio_value": 1000, "insurance_ratios": [0.01]}, dict(scenarios, price_at_end=numpy.array([0.0])))
+        ]
+        for kwargs, case in test_cases:
+            with self.subTest(kwargs=kwargs):
+                with self.assertRaises(ValueError):
+                    monte_carlo.evaluate_ratios(scenarios=case, **kwargs)
+
+    def test_combined_chunks_match_whole_batch(self):
+        values = self.rng.normal(size=(1000, len(self.insurance_ratios)))
+        mask = values[:, 0] > 0
+        whole = monte_carlo.describe(values, mask=mask)
+        combined = monte_carlo.combine(
+            monte_carlo.describe(values[:400], mask=mask[:400]),
+            monte_carlo.describe(values[400:], mask=mask[400:])
+        )
+        self.assertEqual(combined["count"], whole["count"])
+        for key in ("mean", "m2", "min", "max"):
+            numpy.testing.assert_allclose(combined[key], whole[key])
+
+    def test_summary_matches_pandas(self):
+        provider = StubDataProvider(closes=random_closes())
+        scenarios = monte_carlo.draw_scenarios(data_provider=provider, scenario="crash", iterations=200, rng=self.rng)
+        outcomes = monte_carlo.evaluate_ratios(
+            portfolio_value=self.portfolio_value, insurance_ratios=self.insurance_ratios, scenarios=scenarios
+        )
+        summary = monte_carlo.summarize(
+            insurance_ratios=self.insurance_ratios, described=monte_carlo.describe_outcomes(outcomes)
+        )
+        metric = 'portfolio_value_percent_change_with_insurance'
+        frame = pandas.DataFrame(outcomes[metric], columns=self.insurance_ratios)
+        numpy.testing.assert_allclose(summary["statistics"][(metric, 'std')], frame.std())
+        numpy.testing.assert_allclose(summary["mean_returns"], frame.mean())
+        crash = outcomes['difference_between_portfolio_profit_with_insurance_and_without_insurance'][outcomes["crash"]]
+        numpy.testing.assert_allclose(summary["crash_protection"], crash.mean(axis=0))
+
+    def test_to_frame_has_one_row_per_scenario_and_ratio(self):
+        provider = StubDataProvider(closes=random_closes())
+        scenarios = monte_carlo.draw_scenarios(data_provider=provider, scenario="stable", iterations=3, rng=self.rng)
+        frame = monte_carlo.to_frame(portfolio_value=self.portfolio_value, insurance_ratios=self.insurance_ratios, scenarios=scenarios)
+        self.assertEqual(len(frame), 3 * len(self.insurance_ratios))
+        self.assertEqual(frame["insurance_ratio"].tolist(), self.insurance_ratios * 3)
+        self.assertTrue(frame["option_strategy"].str.startswith("buy ").all())
+
+    def test_sweep_is_identical_for_any_worker_count(self):
+        provider = StubDataProvider(closes=random_closes())
+        seed = random.randint(0, 2**32)
+        summaries = [
+            monte_carlo.sweep(
+                data_provider=provider,
+                portfolio_value=self.portfolio_value,
+                insurance_ratios=self.insurance_ratios,
+                scenario="crash",
+                iterations=2500,
+                seed=seed,
+                workers=workers,
+                chunk_size=1000
+            )
+            for workers in (1, 2, 3)
+        ]
+        for summary in summaries[1:]:
+            pandas.testing.assert_frame_equal(summary["statistics"], summaries[0]["statistics"], check_exact=True)
+            pandas.testing.assert_series_equal(summary["crash_protection"], summaries[0]["crash_protection"], check_exact=True)
+
+    def test_sweep_seeds_give_independent_streams(self):
+        provider = StubDataProvider(closes=random_closes())
+        kwargs = {
+            "data_provider": provider,
+            "portfolio_value": self.portfolio_value,
+            "insurance_ratios": self.insurance_ratios,
+            "scenario": "stable",
+            "iterations": 300,
+            "chunk_size": 100
+        }
+        first = monte_carlo.sweep(seed=1, **kwargs)["statistics"]
+        pandas.testing.assert_frame_equal(monte_carlo.sweep(seed=1, **kwargs)["statistics"], first, check_exact=True)
+        self.assertFalse(monte_carlo.sweep(seed=2, **kwargs)["statistics"].equals(first))
+
+    def test_sweep_rejects_bad_sizes(self):
+        provider = StubDataProvider(closes=random_closes())
+        for iterations, chunk_size in ((0, 10), (10, 0)):
+            with self.subTest(iterations=iterations, chunk_size=chunk_size):
+                with self.assertRaises(ValueError):
+                    monte_carlo.sweep(
+                        data_provider=provider,
+                        portfolio_value=self.portfolio_value,
+                        insurance_ratios=self.insurance_ratios,
+                        scenario="stable",
+                        iterations=iterations,
+                        seed=1,
+                        chunk_size=chunk_size
+                    )
+
+    @unittest.mock.patch('builtins.print')
+    def test_print_comparison_summary(self, mock_print):
+        provider = StubDataProvider(closes=random_closes())
+        summary = monte_carlo.run(
+            data_provider=provider,
+            portfolio_value=self.portfolio_value,
+            insurance_ratios=self.insurance_ratios,
+            scenario="crash",
+            iterations=100,
+            rng=self.rng
+        )
+        main.ResultPrinter.print_comparison_summary(summary)
+        printed = [str(call.args[0]) for call in mock_print.call_args_list if call.args]
+        self.assertTrue(any(line.startswith("\nRecommended insurance ratio") for line in printed))
+
+
+if __name__ == "__main__":
+    unittest.main()
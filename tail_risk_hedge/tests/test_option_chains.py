@@ -0,0 +1,134 @@
+import unittest
+import unittest.mock
+import cache_manager
+import datetime
+import numpy
+import option_chains
+import os
+import pandas
+import random
+import shutil
+import tail_risk_hedge
+import tempfile
+import time
+
+
+def random_puts(length=40):
+    strikes = numpy.round(numpy.random.uniform(200, 600, length))
+    return pandas.DataFrame({
+        "strike": strikes,
+        "lastPrice": numpy.random.uniform(0.1, 10, length),
+        "bid": numpy.random.uniform(0.1, 10, length)
+    })
+
+
+def expiry_in(days):
+    return (datetime.date.today() + datetime.timedelta(days=days)).isoformat()
+
+
+class TestOptionChainStore(unittest.TestCase):
+    def setUp(self):
+        self.store = option_chains.OptionChainStore(max_age=3600)
+        self.puts = random_puts()
+        self.expiry_date = expiry_in(60)
+
+    def test_lookup_matches_boolean_filter(self):
+        self.store.add(expiry_date=self.expiry_date, puts=self.puts)
+        for _ in range(20):
+            low = random.uniform(150, 600)
+            high = low * random.uniform(1, 1.5)
+            expected = self.puts[(self.puts["strike"] >= low) & (self.puts["strike"] <= high)]
+            result = self.store.lookup(expiry_date=self.expiry_date, low=low, high=high)
+            self.assertCountEqual(result["strike"].tolist(), expected["strike"].tolist())
+            self.assertTrue(result["strike"].is_monotonic_increasing)
+
+    def test_band_edges_are_inclusive(self):
+        self.store.add(expiry_date=self.expiry_date, puts=pandas.DataFrame({"strike": [300.0, 350.0, 400.0], "lastPrice": [1.0, 2.0, 3.0]}))
+        result = self.store.lookup(expiry_date=self.expiry_date, low=300.0, high=350.0)
+        self.assertEqual(result["strike"].tolist(), [300.0, 350.0])
+
+    def test_band_outside_covered_range_is_a_miss(self):
+        self.store.add(expiry_date=self.expiry_date, puts=self.puts, covered_range=(300, 400))
+        self.assertIsNotNone(self.store.lookup(expiry_date=self.expiry_date, low=300, high=400))
+        self.assertIsNone(self.store.lookup(expiry_date=self.expiry_date, low=290, high=400))
+        self.assertIsNone(self.store.lookup(expiry_date=self.expiry_date, low=300, high=410))
+
+    def test_stale_and_unknown_chains_are_misses(self):
+        self.store.add(expiry_date=self.expiry_date, puts=self.puts, fetched_at=time.time() - 7200)
+        self.assertIsNone(self.store.lookup(expiry_date=self.expiry_date, low=300, high=400))
+        self.assertIsNone(self.store.lookup(expiry_date=expiry_in(30), low=300, high=400))
+        self.assertIsNone(self.store.closest_expiry(datetime.date.today()))
+
+    def test_closest_expiry(self):
+        for days in (20, 55, 90):
+            self.store.add(expiry_date=expiry_in(days), puts=self.puts)
+        self.assertEqual(self.store.closest_expiry(datetime.date.today() + datetime.timedelta(days=60)), expiry_in(55))
+
+
+class TestProviderOptionChains(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.temp_dir, "cache")
+        closes = numpy.random.uniform(400, 500, 100)
+        cache = cache_manager.CacheManager(directory=self.cache_dir)
+        cache.save('historical', pandas.DataFrame({"Open": closes, "High": closes, "Low": closes, "Close": closes}))
+        cache.save('vix', 0.2)
+        self.puts = random_puts()
+        self.expiry_date = expiry_in(60)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def make_provider(self):
+        return tail_risk_hedge.YahooFinanceDataProvider(
+            cache_file=os.path.join(self.temp_dir, "price_cache.pkl"),
+            put_options_cache_file=os.path.join(self.temp_dir, "put_options_cache.pkl"),
+            vix_cache_file=os.path.join(self.temp_dir, "vix_cache.pkl"),
+            cache_dir=self.cache_dir,
+            seed=42
+        )
+
+    def mock_ticker(self, provider):
+        provider.ticker_data = unittest.mock.Mock()
+        provider.ticker_data.options = [self.expiry_date]
+        provider.ticker_data.option_chain.return_value.puts = self.puts
+        return provider.ticker_data
+
+    def test_hits_skip_disk_throttle_and_network(self):
+        provider = self.make_provider()
+        ticker = self.mock_ticker(provider)
+        provider._fetch_option_chain(450.0)
+        with unittest.mock.patch('tail_risk_hedge.time.sleep') as mock_sleep, \
+                unittest.mock.patch('numpy.load') as mock_load:
+            for _ in range(100):
+                price = random.uniform(300, 600)
+                puts, expiry_date = provider._fetch_option_chain(price)
+                self.assertEqual(expiry_date, self.expiry_date)
+                self.assertTrue(((puts["strike"] >= price * 0.7) & (puts["strike"] <= price * 0.9)).all())
+            mock_sleep.assert_not_called()
+            mock_load.assert_not_called()
+        ticker.option_chain.assert_called_once_with(self.expiry_date)
+
+    def test_chain_is_restored_from_cache(self):
+        provider = self.make_provider()
+        self.mock_ticker(provider)
+        provider._fetch_option_chain(450.0)
+        restored = self.make_provider()
+        ticker = self.mock_ticker(restored)
+        puts, expiry_date = restored._fetch_option_chain(random.uniform(300, 600))
+        self.assertEqual(expiry_date, self.expiry_date)
+        ticker.option_chain.assert_not_called()
+
+    def test_band_filtered_legacy_cache_only_answers_its_band(self):
+        cache = cache_manager.CacheManager(directory=self.cache_dir)
+        cache.save('put_options', (self.puts, self.expiry_date, (315.0, 405.0)))
+        provider = self.make_provider()
+        ticker = self.mock_ticker(provider)
+        provider._fetch_option_chain(450.0)
+        ticker.option_chain.assert_not_called()
+        provider._fetch_option_chain(500.0)
+        ticker.option_chain.assert_called_once_with(self.expiry_date)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,8 +3,11 @@ import unittest.mock
 import yfinance
 import tail_risk_hedge
 import os
+import shutil
+import tempfile
 import time
 import re
+import numpy
 import pandas
 
 
@@ -13,10 +16,12 @@ class TestYahooFinanceDataProvider(unittest.TestCase):
         self.cache_file = "test_cache.pkl"
         self.put_options_cache_file = "test_put_options_cache.pkl"
         self.vix_cache_file = "test_vix_cache.pkl"
+        self.cache_dir = tempfile.mkdtemp()
         self.data_provider = tail_risk_hedge.YahooFinanceDataProvider(
             cache_file=self.cache_file,
             put_options_cache_file=self.put_options_cache_file,
             vix_cache_file=self.vix_cache_file,
+            cache_dir=self.cache_dir,
             seed=42
         )
 
@@ -24,6 +29,7 @@ class TestYahooFinanceDataProvider(unittest.TestCase):
         for cache_file in [self.cache_file, self.put_options_cache_file, self.vix_cache_file]:
             if os.path.exists(cache_file):
                 os.remove(cache_file)
+        shutil.rmtree(self.cache_dir)
 
     @unittest.mock.patch('yfinance.Ticker')
     def test_backoff_retries(self, mock_ticker):
@@ -106,10 +112,12 @@ class TestTailRiskHedge(unittest.TestCase):
         self.cache_file = "test_price_cache.pkl"
         self.put_options_cache_file = "test_put_options_cache.pkl"
         self.vix_cache_file = "test_vix_cache.pkl"
+        self.cache_dir = tempfile.mkdtemp()
         self.data_provider = tail_risk_hedge.YahooFinanceDataProvider(
             cache_file=self.cache_file,
             put_options_cache_file=self.put_options_cache_file,
             vix_cache_file=self.vix_cache_file,
+            cache_dir=self.cache_dir,
             seed=42
         )
 
@@ -117,6 +125,7 @@ class TestTailRiskHedge(unittest.TestCase):
         for cache_file in [self.cache_file, self.put_options_cache_file, self.vix_cache_file]:
             if os.path.exists(cache_file):
                 os.remove(cache_file)
+        shutil.rmtree(self.cache_dir)
 
     def test_calculate_equity_value(self):
         result = tail_risk_hedge.calculate_equity_value(100000, 0.99)
@@ -169,21 +178,16 @@ class TestTailRiskHedge(unittest.TestCase):
 
     def test_vix_cache_usage(self):
         volatility = self.data_provider._get_vix_volatility(scenario="stable")
-        self.data_provider._save_cache(volatility, self.vix_cache_file)
-        os.utime(self.vix_cache_file, (time.time(), time.time()))
+        self.data_provider._save_cache(volatility, 'vix')
         cached_vol = self.data_provider._load_cached_data('vix')
         self.assertEqual(cached_vol, volatility, "VIX cache not used correctly")
 
     def test_vix_cache_refresh(self):
         initial_vol = 0.2
-        self.data_provider._save_cache(initial_vol, self.vix_cache_file)
-        os.utime(
-            self.vix_cache_file,
-            (time.time() - 2 * self.data_provider.cache_duration, time.time() - 2 * self.data_provider.cache_duration)
-        )
+        self.data_provider.cache.save('vix', initial_vol, saved_at=time.time() - 2 * self.data_provider.cache_duration)
         new_vol = self.data_provider._get_vix_volatility(scenario="stable")
-        self.assertTrue(os.path.exists(self.vix_cache_file), "VIX cache not created")
-        self.assertLess(time.time() - os.path.getmtime(self.vix_cache_file), 60, "VIX cache not refreshed")
+        self.assertIsNotNone(self.data_provider.cache.age('vix'), "VIX cache not created")
+        self.assertLess(self.data_provider.cache.age('vix'), 60, "VIX cache not refreshed")
         cached_vol = self.data_provider._load_cached_data('vix')
         self.assertEqual(cached_vol, new_vol, "VIX cache not updated with new volatility")
 
@@ -195,17 +199,14 @@ class TestTailRiskHedge(unittest.TestCase):
 
     def test_cache_usage(self):
         data = self.data_provider._fetch_historical_data()
-        self.data_provider._save_cache(data, self.cache_file)
-        os.utime(self.cache_file, (time.time(), time.time()))
+        self.data_provider._save_cache(data, 'historical')
         self.assertTrue(self.data_provider._load_historical_data().equals(data))
 
     def test_cache_refresh(self):
         data = self.data_provider._fetch_historical_data()
-        self.data_provider._save_cache(data, self.cache_file)
-        os.utime(self.cache_file, (time.time() - 2 * self.data_provider.cache_duration, time.time() - 2 * self.data_provider.cache_duration))
+        self.data_provider.cache.save('historical', data, saved_at=time.time() - 2 * self.data_provider.cache_duration)
         self.data_provider._load_historical_data()
-        self.assertTrue(os.path.exists(self.cache_file))
-        self.assertLess(time.time() - os.path.getmtime(self.cache_file), 60)
+        self.assertLess(self.data_provider.cache.age('historical'), 60)
 
     def test_fetch_option_chain(self):
         price = self.data_provider.historical_data["Close"].iloc[-1]
@@ -247,5 +248,85 @@ class TestTailRiskHedge(unittest.TestCase):
         with self.assertRaises(ValueError):
             tail_risk_hedge.calculate_portfolio_metrics(portfolio_value=-100000, insurance_ratio=0.01, **scenario)
 
+class TestArrayCalculations(unittest.TestCase):
+    def setUp(self):
+        self.rng = numpy.random.default_rng(20240521)
+        self.size = int(self.rng.integers(5, 50, endpoint=True))
+        self.price_at_start = self.rng.uniform(50, 500, self.size)
+        self.price_at_end = self.price_at_start * self.rng.uniform(0.5, 1.3, self.size)
+        self.strike_price = self.price_at_start * self.rng.uniform(0.7, 0.9, self.size)
+        self.option_price = self.rng.uniform(0.5, 10, self.size)
+
+    def test_array_helpers_match_scalar_helpers(self):
+        budget = self.rng.uniform(0, 5000, self.size)
+        contracts = tail_risk_hedge.calculate_number_of_contracts_array(budget, self.option_price)
+        payoff = tail_risk_hedge.calculate_option_payoff_array(self.strike_price, self.price_at_end)
+        change = tail_risk_hedge.calculate_price_change_array(self.price_at_start, self.price_at_end)
+        for i in range(self.size):
+            self.assertEqual(contracts[i], int(budget[i] / (self.option_price[i] * 100)))
+            self.assertEqual(payoff[i], max(0, self.strike_price[i] - self.price_at_end[i]))
+            self.assertEqual(change[i], (self.price_at_end[i] - self.price_at_start[i]) / self.price_at_start[i])
+
+    def test_array_helpers_broadcast(self):
+        ratios = self.rng.uniform(0, 0.05, 4)
+        budget = tail_risk_hedge.calculate_insurance_budget_array(numpy.array([[100000], [200000]]), ratios)
+        self.assertEqual(budget.shape, (2, 4))
+        numpy.testing.assert_allclose(budget[1], 2 * budget[0])
+
+    def test_array_validation_rejects_any_bad_element(self):
+        test_cases = [
+            (tail_risk_hedge.calculate_equity_value_array, ([100, -1], 0.99)),
+            (tail_risk_hedge.calculate_insurance_budget_array, (100, [0.01, -0.01])),
+            (tail_risk_hedge.calculate_number_of_contracts_array, ([1000, -1], 1)),
+            (tail_risk_hedge.calculate_number_of_contracts_array, (1000, [1, 0])),
+            (tail_risk_hedge.calculate_option_payoff_array, ([400, -400], 350)),
+            (tail_risk_hedge.calculate_option_payoff_array, (400, [350, -10])),
+            (tail_risk_hedge.calculate_price_change_array, (500, [525, 0]))
+        ]
+        for function, args in test_cases:
+            with self.subTest(function=function.__name__, args=args):
+                with self.assertRaises(ValueError):
+                    function(*args)
+
+    def test_metrics_array_rows_match_scalar_metrics(self):
+        portfolio_value = float(self.rng.uniform(10000, 1000000))
+        insurance_ratio = float(self.rng.uniform(0, 0.05))
+        frame = tail_risk_hedge.calculate_portfolio_metrics_array(
+            portfolio_value=portfolio_value,
+            insurance_ratio=insurance_ratio,
+            price_at_start=self.price_at_start,
+            price_at_end=self.price_at_end,
+            strike_price=self.strike_price,
+            option_price=self.option_price,
+            expiry_date="2030-01-18"
+        )
+        self.assertEqual(len(frame), self.size)
+        for i in range(self.size):
+            metrics = tail_risk_hedge.calculate_portfolio_metrics(
+                portfolio_value=portfolio_value,
+                insurance_ratio=insurance_ratio,
+                price_at_start=self.price_at_start[i],
+                price_at_end=self.price_at_end[i],
+                strike_price=self.strike_price[i],
+                option_price=self.option_price[i],
+                expiry_date="2030-01-18"
+            )
+            self.assertEqual(frame.iloc[i].to_dict(), metrics)
+            self.assertIsInstance(metrics["number_of_contracts"], int)
+            self.assertEqual(metrics["scenario"], "stable" if self.price_at_end[i] >= self.strike_price[i] else "crash")
+
+    @unittest.mock.patch('tail_risk_hedge.pandas.DataFrame')
+    def test_scalar_metrics_do_not_build_a_frame(self, mock_frame):
+        tail_risk_hedge.calculate_portfolio_metrics(
+            portfolio_value=100000,
+            insurance_ratio=0.01,
+            price_at_start=float(self.price_at_start[0]),
+            price_at_end=float(self.price_at_end[0]),
+            strike_price=float(self.strike_price[0]),
+            option_price=float(self.option_price[0]),
+            expiry_date="2030-01-18"
+        )
+        mock_frame.assert_not_called()
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file